@@ -1,20 +1,37 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body, Depends
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Body, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import uvicorn
 import os
+import multiprocessing
+import asyncio
+import signal
 from datetime import datetime
 import json
 
 # Import our custom modules
 from ocr.receipt_processor import process_receipt_image
+from ocr.worker_pool import OCRWorkerPool, OCRPoolSaturated, OCRPoolUnavailable, OCRJobTimeout
+from ocr.jobs import OCRJobManager, init_worker
+from ocr.batch import process_receipt_batch
+from ocr.cache import OCRResultCache, receipt_cache_key
+from categorization.bulk import bulk_format, categorize_stream
+from categorization.cache import CategoryCache
+from categorization.model import CATEGORY_MODEL_PATH, CategoryModel
 from tax.calculator import calculate_income_tax, calculate_sales_tax, calculate_property_tax
+from tax.grid import TaxGridError, evaluate_grid, income_axis, stream_grid_float32, stream_grid_json
+from tax.tables import UnknownTaxYear, tax_tables
 from models.models import (
     ReceiptData, 
+    OCRJob,
     TransactionCategory,
+    CategoryCorrection,
     IncomeTaxRequest,
+    TaxGridRequest,
+    TaxGridFormat,
     SalesTaxRequest,
     PropertyTaxRequest,
     TaxResult,
@@ -46,15 +63,63 @@ haptic_feedback = HapticFeedbackManager()
 # Mock user settings (in a real app, this would be stored in a database)
 user_settings = UserSettings()
 
+# Worker processes for OCR so receipt processing never blocks the event loop
+ocr_progress_queue = multiprocessing.Queue()
+ocr_pool = OCRWorkerPool(initializer=init_worker, initargs=(ocr_progress_queue,))
+
+# Results of previously processed images, keyed by image content
+ocr_cache = OCRResultCache()
+ocr_jobs = OCRJobManager(ocr_pool, ocr_progress_queue, cache=ocr_cache)
+
+# Categories of previously seen transactions and the user's corrections,
+# which the category model learns from
+category_cache = CategoryCache(model=CategoryModel(CATEGORY_MODEL_PATH))
+
+@app.on_event("startup")
+async def start_ocr_pool():
+    ocr_pool.start()
+    ocr_jobs.start()
+
+@app.on_event("startup")
+async def watch_tax_tables():
+    # Fail at startup, rather than on every tax request, when the default
+    # year's tables are missing
+    try:
+        tax_tables.get()
+    except UnknownTaxYear as e:
+        raise RuntimeError(f"Check TAX_DEFAULT_YEAR and TAX_TABLES_DIR: {e}") from e
+    
+    # Reload changed tax table files on SIGHUP, without restarting workers
+    if hasattr(signal, "SIGHUP"):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, tax_tables.reload)
+
+@app.on_event("shutdown")
+async def stop_ocr_pool():
+    ocr_jobs.stop()
+    ocr_pool.shutdown()
+    ocr_cache.close()
+    category_cache.close()
+
+def ocr_pool_http_error(error: Exception) -> HTTPException:
+    """
+    Map OCR worker pool errors to the HTTP status a client should act on.
+    """
+    if isinstance(error, OCRPoolSaturated):
+        return HTTPException(status_code=429, detail=str(error), headers={"Retry-After": "1"})
+    if isinstance(error, OCRJobTimeout):
+        return HTTPException(status_code=504, detail=str(error))
+    return HTTPException(status_code=503, detail=str(error))
+
 @app.get("/")
 async def root():
     return {"message": "FinTech Backend API is running"}
 
 # OCR Endpoints
 @app.post("/api/ocr/process-receipt", response_model=ReceiptData)
-async def process_receipt(file: UploadFile = File(...)):
+async def process_receipt(file: UploadFile = File(...), merchant: Optional[str] = Form(None)):
     """
     Process a receipt image using OCR and extract relevant information.
+    If the merchant is already known, OCR reuses the languages its earlier receipts needed.
     """
     try:
         # Ensure the file is an image
@@ -64,8 +129,12 @@ async def process_receipt(file: UploadFile = File(...)):
         # Read the file content
         contents = await file.read()
         
-        # Process the image with our OCR module
-        receipt_data = process_receipt_image(contents)
+        # Process the image with our OCR module in a worker process, unless
+        # the same image has been processed before
+        receipt_data = await ocr_cache.get_or_compute(
+            receipt_cache_key(contents, merchant),
+            lambda: ocr_pool.run(process_receipt_image, contents, None, merchant)
+        )
         
         # Provide haptic feedback for successful processing
         if user_settings.vibration_feedback:
@@ -77,6 +146,13 @@ async def process_receipt(file: UploadFile = File(...)):
             voice_explanation.explain_screen("receipt_details", ["merchant", "date", "total", "category"])
         
         return receipt_data
+    except HTTPException:
+        raise
+    except (OCRPoolSaturated, OCRPoolUnavailable, OCRJobTimeout) as e:
+        if user_settings.vibration_feedback:
+            haptic_feedback.error()
+        
+        raise ocr_pool_http_error(e)
     except Exception as e:
         # Provide haptic feedback for error
         if user_settings.vibration_feedback:
@@ -84,6 +160,83 @@ async def process_receipt(file: UploadFile = File(...)):
         
         raise HTTPException(status_code=500, detail=f"Error processing receipt: {str(e)}")
 
+# Upper bound on the number of images accepted in one batch upload
+OCR_BATCH_MAX_FILES = int(os.environ.get("OCR_BATCH_MAX_FILES", "100"))
+
+@app.post("/api/ocr/process-receipts")
+async def process_receipts(files: List[UploadFile] = File(...)):
+    """
+    Process a batch of receipt images in parallel, streaming one NDJSON line per
+    receipt as soon as it finishes. Failed receipts are reported inline.
+    """
+    if len(files) > OCR_BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {OCR_BATCH_MAX_FILES} files can be uploaded at once")
+    if not ocr_pool.running:
+        raise ocr_pool_http_error(OCRPoolUnavailable("OCR worker pool is not running"))
+    
+    images = []
+    for file in files:
+        contents = await file.read()
+        is_image = file.content_type and file.content_type.startswith("image/")
+        images.append((file.filename, contents if is_image else None))
+    
+    async def stream_results():
+        async for result in process_receipt_batch(ocr_pool, images, cache=ocr_cache):
+            yield json.dumps(jsonable_encoder(result)) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.post("/api/ocr/jobs", response_model=OCRJob, status_code=202)
+async def submit_receipt_job(file: UploadFile = File(...)):
+    """
+    Queue a receipt for OCR and return its job ID without waiting for the result.
+    """
+    if not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    
+    contents = await file.read()
+    try:
+        return ocr_jobs.submit(contents)
+    except (OCRPoolSaturated, OCRPoolUnavailable) as e:
+        raise ocr_pool_http_error(e)
+
+@app.get("/api/ocr/jobs/{job_id}", response_model=OCRJob)
+async def get_receipt_job(job_id: str):
+    """
+    Get the status of a receipt job, including its result once it has finished.
+    """
+    job = ocr_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@app.get("/api/ocr/jobs/{job_id}/events")
+async def stream_receipt_job_events(job_id: str):
+    """
+    Stream a receipt job's progress through each OCR stage as server-sent events.
+    """
+    if ocr_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return StreamingResponse(
+        ocr_jobs.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+@app.get("/api/ocr/pool")
+async def get_ocr_pool_stats():
+    """
+    Get the OCR worker pool configuration and counters.
+    """
+    return ocr_pool.stats()
+
+@app.get("/api/ocr/cache")
+async def get_ocr_cache_stats():
+    """
+    Get the OCR result cache's hit, miss and eviction counters.
+    """
+    return ocr_cache.stats()
+
 @app.post("/api/ocr/categorize-transaction")
 async def categorize_transaction(transaction_data: Dict[str, Any] = Body(...)):
     """
@@ -96,8 +249,7 @@ async def categorize_transaction(transaction_data: Dict[str, Any] = Body(...)):
         description = transaction_data.get("description", "")
         
         # Use our categorization logic
-        from categorization.categorizer import categorize_transaction
-        category = categorize_transaction(merchant, amount, description)
+        category = category_cache.categorize(merchant, amount, description)
         
         # Provide haptic feedback for successful categorization
         if user_settings.vibration_feedback:
@@ -111,6 +263,54 @@ async def categorize_transaction(transaction_data: Dict[str, Any] = Body(...)):
         
         raise HTTPException(status_code=500, detail=f"Error categorizing transaction: {str(e)}")
 
+@app.post("/api/ocr/categorize-transactions")
+async def categorize_transactions(request: Request, format: Optional[str] = None):
+    """
+    Categorize a streamed NDJSON or CSV body of transactions, such as a bank
+    statement export, streaming one NDJSON result per row in input order.
+    The format is taken from the ``format`` parameter or the Content-Type.
+    """
+    fmt = bulk_format(request.headers.get("content-type"), format)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Body must be NDJSON (application/x-ndjson) or CSV (text/csv)")
+    
+    async def stream_results():
+        async for result in categorize_stream(request.stream(), fmt, cache=category_cache):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@app.get("/api/ocr/category-corrections")
+async def get_category_corrections():
+    """
+    Get the categories the user has set for merchants, by normalized merchant name.
+    """
+    return category_cache.corrections()
+
+@app.post("/api/ocr/category-corrections", response_model=CategoryCorrection)
+async def set_category_correction(correction: CategoryCorrection):
+    """
+    Categorize all of a merchant's transactions as the given category from now on.
+    """
+    category_cache.set_correction(correction.merchant, correction.category.value)
+    return correction
+
+@app.delete("/api/ocr/category-corrections")
+async def delete_category_correction(merchant: str):
+    """
+    Go back to categorizing a merchant's transactions by keywords.
+    """
+    if not category_cache.remove_correction(merchant):
+        raise HTTPException(status_code=404, detail="No correction for this merchant")
+    return {"success": True}
+
+@app.get("/api/ocr/category-cache")
+async def get_category_cache_stats():
+    """
+    Get the category cache's hit, miss and eviction counters.
+    """
+    return category_cache.stats()
+
 # Tax Calculation Endpoints
 @app.post("/api/tax/income", response_model=TaxResult)
 async def calculate_income_tax_endpoint(request: IncomeTaxRequest):
@@ -123,7 +323,8 @@ async def calculate_income_tax_endpoint(request: IncomeTaxRequest):
             filing_status=request.filing_status,
             state=request.state,
             deduction_type=request.deduction_type,
-            custom_deduction=request.custom_deduction
+            custom_deduction=request.custom_deduction,
+            tax_year=request.tax_year
         )
         
         # Provide haptic feedback for successful calculation
@@ -131,6 +332,11 @@ async def calculate_income_tax_endpoint(request: IncomeTaxRequest):
             haptic_feedback.success()
         
         return result
+    except UnknownTaxYear as e:
+        if user_settings.vibration_feedback:
+            haptic_feedback.error()
+        
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         # Provide haptic feedback for error
         if user_settings.vibration_feedback:
@@ -138,6 +344,28 @@ async def calculate_income_tax_endpoint(request: IncomeTaxRequest):
         
         raise HTTPException(status_code=500, detail=f"Error calculating income tax: {str(e)}")
 
+@app.post("/api/tax/income-grid")
+async def calculate_income_tax_grid(request: TaxGridRequest):
+    """
+    Calculate income tax for every combination of the given incomes, filing
+    statuses, states and deduction types in one pass, streaming the results
+    as columns in JSON or, with ``format`` float32, as binary.
+    """
+    try:
+        incomes = income_axis(request.incomes, request.income_range)
+        grid = await asyncio.get_running_loop().run_in_executor(None, lambda: evaluate_grid(
+            incomes, request.filing_statuses, request.states, request.deduction_types,
+            request.custom_deduction, request.columns, tax_year=request.tax_year
+        ))
+    except TaxGridError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnknownTaxYear as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    if request.format == TaxGridFormat.FLOAT32:
+        return StreamingResponse(stream_grid_float32(grid), media_type="application/octet-stream")
+    return StreamingResponse(stream_grid_json(grid), media_type="application/json")
+
 @app.post("/api/tax/sales", response_model=TaxResult)
 async def calculate_sales_tax_endpoint(request: SalesTaxRequest):
     """
@@ -147,7 +375,8 @@ async def calculate_sales_tax_endpoint(request: SalesTaxRequest):
         result = calculate_sales_tax(
             purchase_amount=request.purchase_amount,
             state=request.state,
-            is_essential=request.is_essential
+            is_essential=request.is_essential,
+            tax_year=request.tax_year
         )
         
         # Provide haptic feedback for successful calculation
@@ -155,6 +384,11 @@ async def calculate_sales_tax_endpoint(request: SalesTaxRequest):
             haptic_feedback.success()
         
         return result
+    except UnknownTaxYear as e:
+        if user_settings.vibration_feedback:
+            haptic_feedback.error()
+        
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         # Provide haptic feedback for error
         if user_settings.vibration_feedback:
@@ -171,7 +405,8 @@ async def calculate_property_tax_endpoint(request: PropertyTaxRequest):
         result = calculate_property_tax(
             property_value=request.property_value,
             state=request.state,
-            county=request.county
+            county=request.county,
+            tax_year=request.tax_year
         )
         
         # Provide haptic feedback for successful calculation
@@ -179,6 +414,11 @@ async def calculate_property_tax_endpoint(request: PropertyTaxRequest):
             haptic_feedback.success()
         
         return result
+    except UnknownTaxYear as e:
+        if user_settings.vibration_feedback:
+            haptic_feedback.error()
+        
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         # Provide haptic feedback for error
         if user_settings.vibration_feedback:
@@ -186,6 +426,21 @@ async def calculate_property_tax_endpoint(request: PropertyTaxRequest):
         
         raise HTTPException(status_code=500, detail=f"Error calculating property tax: {str(e)}")
 
+@app.get("/api/tax/tables")
+async def get_tax_tables_stats():
+    """
+    Get the tax years that have tables, the ones loaded, and the registry's
+    load, reload and eviction counters.
+    """
+    return tax_tables.stats()
+
+@app.post("/api/tax/tables/reload")
+async def reload_tax_tables():
+    """
+    Reload the tables of every loaded tax year whose file changed.
+    """
+    return {"reloaded": tax_tables.reload()}
+
 # User Settings Endpoints
 @app.get("/api/settings", response_model=UserSettings)
 async def get_user_settings():
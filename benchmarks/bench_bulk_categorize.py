@@ -0,0 +1,95 @@
+"""
+Measure rows/second and peak memory of bulk transaction categorization on
+streamed NDJSON and CSV bodies.
+
+Usage: python benchmarks/bench_bulk_categorize.py [--rows 100000] [--chunk-bytes 65536] [--seed S]
+
+Bodies are generated while they are streamed, as an upload would arrive,
+and results are consumed as they are produced, so the peak memory shown
+is what categorization itself holds. Peak memory is traced in a separate
+run from the timed one, and is also shown for a tenth of the rows to show
+that it does not grow with the size of the body.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization.bulk import categorize_stream
+from categorization.categorizer import CATEGORY_KEYWORDS
+from tests.transactions import synthetic_transactions
+
+def body_rows(rows, fmt, seed):
+    """
+    Yield the lines of a body of ``rows`` synthetic transactions.
+    """
+    rng = random.Random(seed)
+    if fmt == "csv":
+        yield "id,merchant,amount,description\n"
+    produced = 0
+    while produced < rows:
+        for merchant, amount, description in synthetic_transactions(min(1000, rows - produced), CATEGORY_KEYWORDS, rng):
+            produced += 1
+            if fmt == "csv":
+                out = io.StringIO()
+                csv.writer(out, lineterminator="\n").writerow([produced, merchant, amount, description])
+                yield out.getvalue()
+            else:
+                yield json.dumps({"id": produced, "merchant": merchant, "amount": amount,
+                                  "description": description}) + "\n"
+
+async def body_chunks(rows, fmt, chunk_bytes, seed):
+    buffer = []
+    size = 0
+    for line in body_rows(rows, fmt, seed):
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_bytes:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+            await asyncio.sleep(0)
+    if buffer:
+        yield "".join(buffer).encode()
+
+async def consume(rows, fmt, chunk_bytes, seed):
+    count = errors = 0
+    async for result in categorize_stream(body_chunks(rows, fmt, chunk_bytes, seed), fmt):
+        # Serialize as the endpoint does
+        json.dumps(result)
+        count += 1
+        errors += result["status"] != "ok"
+    return count, errors
+
+def peak_memory_mb(rows, fmt, chunk_bytes, seed):
+    tracemalloc.start()
+    asyncio.run(consume(rows, fmt, chunk_bytes, seed))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="transactions per body")
+    parser.add_argument("--chunk-bytes", type=int, default=64 * 1024, help="size of the body chunks streamed in")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'format':<8} {'rows':>8} {'rows/s':>10} {'errors':>7} {'peak MB':>8} {'peak MB (rows/10)':>18}")
+    for fmt in ("ndjson", "csv"):
+        started = time.perf_counter()
+        count, errors = asyncio.run(consume(args.rows, fmt, args.chunk_bytes, args.seed))
+        elapsed = time.perf_counter() - started
+        peak = peak_memory_mb(args.rows, fmt, args.chunk_bytes, args.seed)
+        small_peak = peak_memory_mb(args.rows // 10, fmt, args.chunk_bytes, args.seed)
+        print(f"{fmt:<8} {count:>8} {count / elapsed:>10.0f} {errors:>7} {peak:>8.1f} {small_peak:>18.1f}")
+
+if __name__ == "__main__":
+    main()
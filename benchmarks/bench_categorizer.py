@@ -0,0 +1,65 @@
+"""
+Compare transaction categorization throughput against the previous
+implementation, which searched the text once per keyword, as the keyword
+lists grow, and check that both pick the same category. The batch
+categorizer is measured on the same transactions.
+
+Usage: python benchmarks/bench_categorizer.py [--transactions N] [--sizes 300,1000,5000] [--seed S]
+
+Keyword lists are grown to each size with random words added to random
+categories. Transactions mix merchants and descriptions that hit the
+keywords with ones that hit none.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization import categorizer
+from categorization.batch import categorize_batch
+from categorization.categorizer import build_keyword_index, categorize_transaction
+from tests.transactions import grow_keywords, legacy_categorize_transaction, synthetic_transactions
+
+def throughput(categorize, transactions):
+    started = time.perf_counter()
+    for merchant, amount, description in transactions:
+        categorize(merchant, amount, description)
+    return len(transactions) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=5000, help="synthetic transactions per size")
+    parser.add_argument("--sizes", default="300,1000,5000", help="comma-separated keyword counts")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    default_index = categorizer.KEYWORD_INDEX
+    print(f"{'keywords':>8} {'legacy/s':>12} {'current/s':>12} {'batch/s':>12} {'speedup':>8} {'mismatches':>10}")
+    try:
+        for size in (int(size) for size in args.sizes.split(",")):
+            keywords = grow_keywords(size, rng)
+            transactions = synthetic_transactions(args.transactions, keywords, rng)
+            categorizer.KEYWORD_INDEX = build_keyword_index(keywords)
+
+            merchants, amounts, descriptions = zip(*transactions)
+            started = time.perf_counter()
+            batch_categories = categorize_batch(merchants, amounts, descriptions)
+            batch = len(transactions) / (time.perf_counter() - started)
+
+            mismatches = 0
+            for transaction, batch_category in zip(transactions, batch_categories):
+                expected = legacy_categorize_transaction(keywords, *transaction)
+                mismatches += categorize_transaction(*transaction) != expected or batch_category != expected
+            legacy = throughput(lambda *transaction: legacy_categorize_transaction(keywords, *transaction),
+                                transactions)
+            current = throughput(categorize_transaction, transactions)
+            print(f"{size:>8} {legacy:>12.0f} {current:>12.0f} {batch:>12.0f} {current / legacy:>7.1f}x {mismatches:>10}")
+    finally:
+        categorizer.KEYWORD_INDEX = default_index
+
+if __name__ == "__main__":
+    main()
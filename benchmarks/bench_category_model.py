@@ -0,0 +1,71 @@
+"""
+Measure how fast the category model learns corrections and categorizes
+transactions, and how often its confident predictions are right.
+
+Usage: python benchmarks/bench_category_model.py [--corrections 10000] [--queries 10000] [--seed S]
+
+Each category gets its own random vocabulary. Corrections and queries are
+merchants of two or three words from one category's vocabulary, with a
+store number and sometimes a word shared by all categories, so queries are
+mostly merchants the model has not seen whole.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization.model import CategoryModel
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+SHARED_WORDS = ["store", "inc", "online", "payment", "pos"]
+
+def random_merchant(vocabulary, rng):
+    words = rng.sample(vocabulary, rng.randint(2, 3))
+    if rng.random() < 0.3:
+        words.append(rng.choice(SHARED_WORDS))
+    return f"{' '.join(words)} #{rng.randint(1, 9999)}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corrections", type=int, default=10000, help="corrections learned")
+    parser.add_argument("--queries", type=int, default=10000, help="transactions categorized")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    model = CategoryModel()
+    vocabularies = {
+        category: ["".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 8))) for _ in range(200)]
+        for category in model.categories
+    }
+    def transactions(count):
+        categories = [rng.choice(model.categories) for _ in range(count)]
+        return [(random_merchant(vocabularies[category], rng), category) for category in categories]
+    corrections = transactions(args.corrections)
+    queries = transactions(args.queries)
+
+    started = time.perf_counter()
+    for merchant, category in corrections:
+        model.learn(merchant, "", category)
+    learn = (time.perf_counter() - started) / len(corrections)
+
+    started = time.perf_counter()
+    predictions = [model.predict(merchant) for merchant, _ in queries]
+    predict = (time.perf_counter() - started) / len(queries)
+
+    started = time.perf_counter()
+    model.predict_many([merchant for merchant, _ in queries], [""] * len(queries))
+    predict_many = (time.perf_counter() - started) / len(queries)
+
+    confident = [(prediction.category, category) for prediction, (_, category) in zip(predictions, queries)
+                 if prediction.confidence >= model.min_confidence]
+    correct = sum(predicted == category for predicted, category in confident)
+    print(f"model of {model.n_features} features x {len(model.categories)} categories: {model.counts.nbytes / 2 ** 20:.1f} MiB")
+    print(f"learn {learn * 1e6:.1f} us, predict {predict * 1e6:.1f} us, predict_many {predict_many * 1e6:.1f} us per transaction")
+    print(f"confident on {len(confident) / len(queries):.1%} of queries, {correct / max(len(confident), 1):.1%} of those correct")
+
+if __name__ == "__main__":
+    main()
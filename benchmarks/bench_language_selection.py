@@ -0,0 +1,76 @@
+"""
+Compare OCR with all receipt languages against OCR with the languages picked
+by script detection, over a directory of receipt images.
+
+Usage: python benchmarks/bench_language_selection.py <image_dir> [--backend NAME]
+
+Accuracy is reported as the similarity of the subset text to the
+all-language text, and as agreement on the parsed merchant and total.
+"""
+import argparse
+import difflib
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.receipt_processor import (
+    OCR_LANGUAGES,
+    create_ocr_backend,
+    detect_languages,
+    extract_text,
+    parse_receipt_text,
+    preprocess_image,
+)
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp"}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir", type=Path)
+    parser.add_argument("--backend", default=None, help="OCR backend (default: OCR_BACKEND or auto)")
+    args = parser.parse_args()
+
+    backend = create_ocr_backend(args.backend)
+    paths = sorted(p for p in args.image_dir.iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        sys.exit(f"No images found in {args.image_dir}")
+
+    full_times, subset_times, similarities = [], [], []
+    merchant_matches = total_matches = 0
+    print(f"{'image':<30} {'languages':<16} {'all (ms)':>9} {'subset (ms)':>12} {'similarity':>10}")
+    for path in paths:
+        image = preprocess_image(path.read_bytes())
+
+        started = time.perf_counter()
+        full_text = extract_text(image, backend=backend, languages=OCR_LANGUAGES)
+        full_times.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        languages = detect_languages(image, backend=backend)
+        subset_text = extract_text(image, backend=backend, languages=languages)
+        subset_times.append(time.perf_counter() - started)
+
+        similarity = difflib.SequenceMatcher(None, full_text, subset_text).ratio()
+        similarities.append(similarity)
+        full, subset = parse_receipt_text(full_text), parse_receipt_text(subset_text)
+        merchant_matches += full.merchant == subset.merchant
+        total_matches += full.total == subset.total
+
+        print(f"{path.name[:30]:<30} {languages:<16} {full_times[-1] * 1000:>9.1f} "
+              f"{subset_times[-1] * 1000:>12.1f} {similarity:>10.3f}")
+
+    count = len(paths)
+    print()
+    print(f"receipts:             {count}")
+    print(f"mean latency, all:    {statistics.mean(full_times) * 1000:.1f} ms")
+    print(f"mean latency, subset: {statistics.mean(subset_times) * 1000:.1f} ms (including detection)")
+    print(f"speedup:              {sum(full_times) / sum(subset_times):.2f}x")
+    print(f"mean text similarity: {statistics.mean(similarities):.3f}")
+    print(f"merchant agreement:   {merchant_matches / count:.1%}")
+    print(f"total agreement:      {total_matches / count:.1%}")
+
+if __name__ == "__main__":
+    main()
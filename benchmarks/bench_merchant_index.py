@@ -0,0 +1,94 @@
+"""
+Measure lookup latency and accuracy of the fuzzy merchant index as the
+number of known merchant names grows.
+
+Usage: python benchmarks/bench_merchant_index.py [--names 100000] [--queries 5000] [--seed S]
+
+Known names are one to three random words, some of them words many
+merchants share ("store", "foods"). Queries are known names with OCR
+noise (letters read as digits, store numbers, extra words), and an equal
+number of names made of words no known name has, which should not match
+anything.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization.merchants import MerchantIndex
+
+CONSONANTS = "bcdfghjklmnprstvwyz"
+VOWELS = "aeiou"
+COMMON_WORDS = ["store", "mart", "foods", "india", "cafe", "bazaar", "pharmacy", "super", "traders", "kitchen"]
+SUFFIXES = ["MKT", "STORE", "#{}", "INC", "PVT LTD", "{}"]
+OCR_NOISE = {"o": "0", "l": "1", "i": "1", "s": "5", "b": "8"}
+
+def random_word(rng, common=0.2):
+    if rng.random() < common:
+        return rng.choice(COMMON_WORDS)
+    return "".join(rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4)))
+
+def random_names(count, rng):
+    names = set()
+    while len(names) < count:
+        names.add(" ".join(random_word(rng) for _ in range(rng.randint(1, 3))))
+    return sorted(names)
+
+def noisy(name, rng):
+    """
+    The name as a receipt or bank statement might print it after OCR.
+    """
+    chars = [OCR_NOISE[char] if char in OCR_NOISE and rng.random() < 0.3 else char for char in name.lower()]
+    text = "".join(chars).upper()
+    if rng.random() < 0.7:
+        text += " " + rng.choice(SUFFIXES).format(rng.randint(1, 9999))
+    return text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--names", type=int, default=100000, help="known merchant names")
+    parser.add_argument("--queries", type=int, default=5000, help="noisy lookups of known names")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = random_names(args.names, rng)
+    started = time.perf_counter()
+    index = MerchantIndex(names)
+    build = time.perf_counter() - started
+
+    known_words = {word for name in names for word in name.split()}
+    targets = [rng.choice(names) for _ in range(args.queries)]
+    queries = [(noisy(name, rng), name) for name in targets]
+    unrelated = []
+    while len(unrelated) < args.queries:
+        words = [random_word(rng, common=0) for _ in range(rng.randint(1, 3))]
+        if not known_words.intersection(words):
+            unrelated.append((noisy(" ".join(words), rng), None))
+
+    latencies = []
+    correct = wrong = false_matches = 0
+    for query, expected in queries + unrelated:
+        started = time.perf_counter()
+        match = index.lookup(query)
+        latencies.append(time.perf_counter() - started)
+        if expected is None:
+            false_matches += match is not None
+        elif match is not None and match.name == expected:
+            correct += 1
+        elif match is not None:
+            wrong += 1
+
+    latencies.sort()
+    mean = sum(latencies) / len(latencies)
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{len(index)} names indexed in {build:.1f}s")
+    print(f"lookup mean {mean * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms")
+    print(f"noisy known names: {correct / len(queries):.1%} found, {wrong / len(queries):.1%} matched another name")
+    print(f"unrelated names: {false_matches / len(unrelated):.1%} matched a known name")
+
+if __name__ == "__main__":
+    main()
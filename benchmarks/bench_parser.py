@@ -0,0 +1,44 @@
+"""
+Compare receipt text parsing throughput against the previous implementation,
+which rescanned every line once per date, total and item pattern, and check
+that both extract the same fields (except dates only the new parser reads).
+
+Usage: python benchmarks/bench_parser.py [--receipts N] [--seed S]
+
+A corpus of synthetic OCR texts is generated with Indian and US date
+formats, rupee amounts, tax lines, item lines and OCR noise.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.text_parser import scan_receipt_text
+from tests.receipt_texts import legacy_parse_receipt_text, matches_legacy, synthetic_texts
+
+def throughput(parse, texts):
+    started = time.perf_counter()
+    for text in texts:
+        parse(text)
+    return len(texts) / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=5000, help="synthetic receipts to parse")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = synthetic_texts(args.receipts, args.seed)
+    mismatches = sum(not matches_legacy(text) for text in texts)
+
+    legacy = throughput(legacy_parse_receipt_text, texts)
+    current = throughput(scan_receipt_text, texts)
+    print(f"{'parser':<10} {'receipts/s':>12}")
+    print(f"{'legacy':<10} {legacy:>12.0f}")
+    print(f"{'current':<10} {current:>12.0f}")
+    print(f"speedup {current / legacy:.2f}x, {mismatches} mismatches in {len(texts)} receipts")
+
+if __name__ == "__main__":
+    main()
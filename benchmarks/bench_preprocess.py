@@ -0,0 +1,63 @@
+"""
+Show per-stage preprocessing timings with and without resolution
+normalization (reduced decode, crop to the receipt, scale to OCR_TARGET_DPI).
+
+Usage: python benchmarks/bench_preprocess.py [image ...] [--repeat N]
+
+Without images, a synthetic 12 MP JPEG photo of a receipt on a dark table
+is used.
+"""
+import argparse
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+import cv2
+import numpy as np
+
+from ocr.receipt_processor import preprocess_image
+
+STAGES = ["decode", "normalize", "threshold", "deskew"]
+
+def synthetic_photo(width=4000, height=3000):
+    photo = np.full((height, width, 3), 60, np.uint8)
+    left, right = int(width * 0.3), int(width * 0.7)
+    photo[100:height - 100, left:right] = 235
+    for line in range(60):
+        y = 200 + line * 44
+        cv2.putText(photo, f"ITEM {line:02d}      {line * 3.17:8.2f}", (left + 60, y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1.1, (20, 20, 20), 3)
+    return cv2.imencode(".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+def time_stages(image_bytes, target_dpi, repeat):
+    timings = defaultdict(list)
+    shape = None
+    for _ in range(repeat):
+        run = {}
+        shape = preprocess_image(image_bytes, lambda stage, elapsed: run.__setitem__(stage, elapsed),
+                                 target_dpi=target_dpi).shape
+        for stage, elapsed in run.items():
+            timings[stage].append(elapsed)
+    return {stage: min(values) * 1000 for stage, values in timings.items()}, shape
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", type=Path)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    inputs = [(path.name, path.read_bytes()) for path in args.images] or [("synthetic 12 MP", synthetic_photo())]
+    for name, image_bytes in inputs:
+        print(name)
+        print(f"  {'mode':<12} {'output':>12} " + " ".join(f"{stage:>10}" for stage in STAGES) + f" {'total':>10}")
+        for mode, target_dpi in (("full", 0), ("normalized", None)):
+            timings, shape = time_stages(image_bytes, target_dpi, args.repeat)
+            cells = " ".join(f"{timings.get(stage, 0.0):>10.1f}" for stage in STAGES)
+            output = f"{shape[1]}x{shape[0]}"
+            print(f"  {mode:<12} {output:>12} {cells} {sum(timings.values()):>10.1f}")
+        print("  (milliseconds, best of %d)" % args.repeat)
+
+if __name__ == "__main__":
+    main()
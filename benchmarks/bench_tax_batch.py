@@ -0,0 +1,60 @@
+"""
+Compare income tax throughput of the batch engine with calling
+calculate_income_tax once per scenario, and check that both give the
+same results.
+
+Usage: python benchmarks/bench_tax_batch.py [--scenarios 200000] [--scalar 20000] [--seed S]
+
+Scenarios are random incomes up to $1M under every filing status, a mix
+of known and unknown states, and standard or itemized deductions. The
+scalar calculator is timed on the first ``--scalar`` scenarios only.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.models import DeductionType, FilingStatus
+from tax.batch import calculate_income_tax_batch
+from tax.calculator import STATE_INCOME_TAX_RATES, calculate_income_tax
+
+def random_scenarios(count, rng):
+    states = list(STATE_INCOME_TAX_RATES) + ["WY", "OR"]
+    scenarios = []
+    for _ in range(count):
+        deduction_type = rng.choice(list(DeductionType))
+        custom_deduction = rng.uniform(0, 50000) if deduction_type == DeductionType.ITEMIZED and rng.random() < 0.8 else None
+        scenarios.append((rng.uniform(0, 1000000), rng.choice(list(FilingStatus)), rng.choice(states),
+                          deduction_type, custom_deduction))
+    return scenarios
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=200000, help="scenarios computed by the batch engine")
+    parser.add_argument("--scalar", type=int, default=20000, help="scenarios computed one by one")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scenarios = random_scenarios(args.scenarios, rng)
+    columns = [list(column) for column in zip(*scenarios)]
+
+    started = time.perf_counter()
+    batch = calculate_income_tax_batch(*columns)
+    batch_seconds = time.perf_counter() - started
+
+    scalar = scenarios[:args.scalar]
+    started = time.perf_counter()
+    results = [calculate_income_tax(*scenario) for scenario in scalar]
+    scalar_seconds = time.perf_counter() - started
+
+    mismatches = sum(batch.result(row) != result for row, result in enumerate(results))
+    print(f"batch:  {len(batch) / batch_seconds:12,.0f} scenarios/s ({batch_seconds:.3f}s for {len(batch)})")
+    print(f"scalar: {len(scalar) / scalar_seconds:12,.0f} scenarios/s ({scalar_seconds:.3f}s for {len(scalar)})")
+    print(f"mismatches: {mismatches} of {len(scalar)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from categorization import categorizer
+from categorization.model import CategoryModel
+
+def keyword_counts(texts: Sequence[str]) -> np.ndarray:
+    """
+    Texts x groups matrix of how many of each group's keywords are in each
+    text, for the groups of the categorizer's keyword index.
+    """
+    index = categorizer.refresh_keywords()
+    text_indexes, keyword_ids = index.find_many(texts)
+    # Sparse presence matrix times the keyword -> group matrix: each found
+    # keyword adds its row of the group matrix to its text's counts
+    counts = np.zeros((len(texts), len(index.groups)), np.int32)
+    np.add.at(counts, text_indexes, index.group_matrix()[keyword_ids])
+    return counts
+
+def categories_from_counts(counts: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """
+    Pick each row's category from its keyword group counts, as
+    categorizer.category_from_counts does for one transaction.
+    """
+    category_count = categorizer.CATEGORY_COUNT
+    category_names = np.array(categorizer.KEYWORD_INDEX.groups[:category_count] + ["Other"], dtype=object)
+    category_counts = counts[:, :category_count]
+    # argmax picks the first category on a tie, as the scalar loop does
+    best = np.argmax(category_counts, axis=1) if category_count else np.zeros(len(counts), np.int64)
+    matched = category_counts.max(axis=1, initial=0) > 0
+    categories = category_names[np.where(matched, best, category_count)]
+
+    income = (amounts > 500) & (counts[:, categorizer.INCOME] > 0)
+    bill = counts[:, categorizer.BILL] > 0
+    utility_bill = bill & (counts[:, categorizer.UTILITY_BILL] > 0)
+    housing_bill = bill & (counts[:, categorizer.HOUSING_BILL] > 0)
+    return np.select([income, utility_bill, housing_bill], ["Income", "Utilities", "Housing"], categories)
+
+def categorize_batch(merchants: Sequence[str], amounts: Sequence[float],
+                     descriptions: Optional[Sequence[str]] = None,
+                     model: Optional[CategoryModel] = None) -> np.ndarray:
+    """
+    Categorize many transactions at once, giving the same categories as
+    calling categorize_transaction on each of them.
+
+    Each distinct merchant and description is scanned for keywords once,
+    the category scores of all of them come from one product with the
+    keyword -> category matrix, and the income and bill rules are applied
+    as masks over the whole batch. Transactions that match no keyword are
+    scanned again with their merchant's canonical name, as in the scalar
+    function, and, if a ``model`` is given, its predictions replace the
+    rules wherever it is confident enough. Returns an array of category
+    names.
+    """
+    if descriptions is None:
+        descriptions = [""] * len(merchants)
+    if not len(merchants) == len(amounts) == len(descriptions):
+        raise ValueError("merchants, amounts and descriptions must have the same length")
+
+    # Backfills repeat the same merchants and descriptions, so transactions
+    # are deduplicated before scanning
+    pair_ids: Dict[Tuple[str, str], int] = {}
+    inverse = np.fromiter(
+        (pair_ids.setdefault((merchant, description), len(pair_ids))
+         for merchant, description in zip(merchants, descriptions)),
+        np.int64, len(merchants)
+    )
+    pairs = list(pair_ids)
+    texts = [f"{merchant} {description}".lower() for merchant, description in pairs]
+    counts = keyword_counts(texts)[inverse]
+    amounts = np.asarray(amounts, np.float64)
+    categories = categories_from_counts(counts, amounts)
+
+    # Rescan the distinct transactions that came out as "Other" and whose
+    # merchant has a canonical name
+    other = np.unique(inverse[categories == "Other"])
+    canonical_names: Dict[str, Optional[str]] = {}
+    rescanned = {}
+    for pair_id in other.tolist():
+        merchant = pairs[pair_id][0]
+        if merchant not in canonical_names:
+            canonical_names[merchant] = categorizer.canonical_merchant(merchant)
+        if canonical_names[merchant] is not None:
+            rescanned[pair_id] = f"{canonical_names[merchant].lower()} {texts[pair_id]}"
+    if rescanned:
+        rescanned_counts = keyword_counts(list(rescanned.values()))
+        lookup = np.full(len(pairs), -1, np.int64)
+        lookup[list(rescanned)] = np.arange(len(rescanned))
+        rows = np.flatnonzero(lookup[inverse] >= 0)
+        counts[rows] = rescanned_counts[lookup[inverse[rows]]]
+        categories[rows] = categories_from_counts(counts[rows], amounts[rows])
+
+    if model is not None:
+        predicted, confidences = model.predict_many([merchant for merchant, _ in pairs],
+                                                    [description for _, description in pairs])
+        confident = (confidences >= model.min_confidence)[inverse]
+        categories[confident] = predicted[inverse[confident]]
+    return categories
@@ -0,0 +1,229 @@
+import asyncio
+import codecs
+import csv
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from categorization.batch import categorize_batch
+from categorization.cache import CategoryCache
+
+# Transactions categorized per chunk, between which other requests get a turn
+BULK_CHUNK_ROWS = int(os.environ.get("CATEGORIZE_BULK_CHUNK_ROWS", "1000"))
+
+# Longest line accepted in a bulk upload, so a body without newlines cannot
+# be buffered whole
+BULK_MAX_LINE_BYTES = int(os.environ.get("CATEGORIZE_BULK_MAX_LINE_BYTES", str(64 * 1024)))
+
+BULK_FORMATS = ("ndjson", "csv")
+
+class BulkFormatError(ValueError):
+    """
+    Raised when a bulk upload cannot be read any further.
+    """
+
+def bulk_format(content_type: Optional[str], requested: Optional[str] = None) -> Optional[str]:
+    """
+    The format of a bulk upload, from the ``format`` parameter or else the
+    Content-Type. Returns None if neither names a supported format.
+    """
+    if requested:
+        requested = requested.lower()
+        return requested if requested in BULK_FORMATS else None
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json"):
+        return "ndjson"
+    if media_type in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = BULK_MAX_LINE_BYTES) -> AsyncIterator[List[str]]:
+    """
+    Split a byte stream into text lines, yielding the complete lines of
+    each chunk together. A partial line is held until the next chunk.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        lines = text.split("\n")
+        pending = lines.pop()
+        if len(pending) > max_line_bytes:
+            raise BulkFormatError(f"Line longer than {max_line_bytes} bytes")
+        if lines:
+            yield lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield [pending]
+
+def transaction_fields(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read the merchant, amount and description of a row, as the single
+    transaction endpoint does. Raises ValueError for an amount that is not a number.
+    """
+    amount = row.get("amount")
+    if amount is None or amount == "":
+        amount = 0
+    elif isinstance(amount, str):
+        amount = float(amount.replace(",", ""))
+    elif not isinstance(amount, (int, float)) or isinstance(amount, bool):
+        raise ValueError(f"Invalid amount: {amount!r}")
+    return {
+        "merchant": str(row.get("merchant") or ""),
+        "amount": amount,
+        "description": str(row.get("description") or ""),
+    }
+
+def categorize_rows(rows: Iterable[Any], start: int, cache: Optional[CategoryCache] = None) -> List[Dict[str, Any]]:
+    """
+    Categorize a chunk of rows, numbered from ``start``, through ``cache``
+    if one is given. Each result has the row's index, its ``id`` if it had
+    one, and either the category or an error.
+    """
+    results = []
+    valid_results = []
+    valid_fields = []
+    for index, row in enumerate(rows, start):
+        result: Dict[str, Any] = {"index": index}
+        results.append(result)
+        if isinstance(row, Exception):
+            result.update(status="error", error=str(row))
+            continue
+        if row.get("id") not in (None, ""):
+            result["id"] = row["id"]
+        try:
+            fields = transaction_fields(row)
+        except ValueError as e:
+            result.update(status="error", error=str(e))
+        else:
+            valid_results.append(result)
+            valid_fields.append(fields)
+
+    if valid_fields:
+        categorize = cache.categorize_many if cache is not None else categorize_batch
+        categories = categorize(
+            [fields["merchant"] for fields in valid_fields],
+            [fields["amount"] for fields in valid_fields],
+            [fields["description"] for fields in valid_fields],
+        )
+        for result, category in zip(valid_results, categories):
+            result.update(status="ok", category=category)
+    return results
+
+def ndjson_rows(lines: List[str]) -> List[Any]:
+    """
+    Parse NDJSON lines into rows, skipping blank lines. A line that is not
+    a JSON object becomes the ValueError to report for it.
+    """
+    rows: List[Any] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = ValueError(f"Invalid JSON: {e}")
+        if not isinstance(row, (dict, Exception)):
+            row = ValueError("Each line must be a JSON object")
+        rows.append(row)
+    return rows
+
+class CSVRows:
+    """
+    Parses CSV lines into rows keyed by the lowercased header. Quoted fields
+    may contain newlines, so lines are joined until their quotes balance,
+    up to ``max_line_bytes`` per record.
+    """
+    def __init__(self, max_line_bytes: int = BULK_MAX_LINE_BYTES):
+        self.header: Optional[List[str]] = None
+        self.max_line_bytes = max_line_bytes
+        self._pending: List[str] = []
+        self._pending_size = 0
+
+    def parse(self, lines: List[str]) -> List[Any]:
+        records: List[Any] = []
+        for line in lines:
+            if self._pending:
+                self._pending.append(line)
+                self._pending_size += len(line) + 1
+                if line.count('"') % 2:
+                    records.append("\n".join(self._pending))
+                    self._pending = []
+                elif self._pending_size > self.max_line_bytes:
+                    # A stray quote would otherwise buffer the rest of the body
+                    records.append(ValueError(f"Quoted field longer than {self.max_line_bytes} bytes"))
+                    self._pending = []
+            elif line.count('"') % 2:
+                self._pending.append(line)
+                self._pending_size = len(line)
+            elif line.strip():
+                records.append(line)
+
+        rows: List[Any] = []
+        position = 0
+        for values in csv.reader(record for record in records if not isinstance(record, Exception)):
+            # Too-long records keep their place among the rows
+            while isinstance(records[position], Exception):
+                rows.append(records[position])
+                position += 1
+            position += 1
+            if self.header is None:
+                self.header = [name.strip().lower() for name in values]
+                continue
+            if len(values) != len(self.header):
+                rows.append(ValueError(f"Expected {len(self.header)} columns, got {len(values)}"))
+                continue
+            rows.append(dict(zip(self.header, values)))
+        rows.extend(records[position:])
+        return rows
+
+    def finish(self) -> List[Any]:
+        if self._pending:
+            self._pending = []
+            return [ValueError("Unterminated quoted field")]
+        return []
+
+async def categorize_stream(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    chunk_rows: int = BULK_CHUNK_ROWS,
+    max_line_bytes: int = BULK_MAX_LINE_BYTES,
+    cache: Optional[CategoryCache] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Categorize the transactions in a streamed NDJSON or CSV body, yielding
+    one result per row in input order. Rows are categorized ``chunk_rows``
+    at a time in a thread, so only a chunk of rows is held in memory and
+    the event loop is not blocked.
+
+    NDJSON rows are objects and CSV rows need a header row; both use the
+    fields ``merchant``, ``amount`` and ``description``, and optionally ``id``,
+    which is echoed back. Rows that cannot be read are reported as errors.
+    Categories are looked up in and added to ``cache`` if one is given.
+    """
+    loop = asyncio.get_running_loop()
+    csv_rows = CSVRows(max_line_bytes) if fmt == "csv" else None
+    pending: List[Any] = []
+    next_index = 0
+
+    async def flush(rows: List[Any]) -> List[Dict[str, Any]]:
+        nonlocal next_index
+        start = next_index
+        next_index += len(rows)
+        return await loop.run_in_executor(None, categorize_rows, rows, start, cache)
+
+    try:
+        async for lines in iter_lines(chunks, max_line_bytes):
+            pending.extend(csv_rows.parse(lines) if csv_rows else ndjson_rows(lines))
+            while len(pending) >= chunk_rows:
+                rows, pending = pending[:chunk_rows], pending[chunk_rows:]
+                for result in await flush(rows):
+                    yield result
+    except BulkFormatError as e:
+        pending.append(e)
+    else:
+        if csv_rows:
+            pending.extend(csv_rows.finish())
+    if pending:
+        for result in await flush(pending):
+            yield result
@@ -0,0 +1,308 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from categorization import categorizer
+from categorization.batch import categorize_batch
+from categorization.model import CategoryModel
+from ocr.script_detection import normalize_merchant
+
+# Categorizations kept in memory
+CATEGORY_CACHE_SIZE = int(os.environ.get("CATEGORY_CACHE_SIZE", "10000"))
+
+# SQLite file the warm set and user corrections are kept in across restarts
+CATEGORY_CACHE_PATH = os.environ.get("CATEGORY_CACHE_PATH")
+
+# New categorizations after which the warm set is written to disk
+CATEGORY_CACHE_SAVE_EVERY = int(os.environ.get("CATEGORY_CACHE_SAVE_EVERY", "1000"))
+
+def category_cache_key(merchant: str, amount: float, description: str = "") -> str:
+    """
+    Key of a transaction's categorization: its normalized merchant and
+    description, and whether the amount is large enough to be income, the
+    only thing about the amount the categorizer looks at.
+    """
+    return f"{normalize_merchant(merchant)}\0{normalize_merchant(description)}\0{int(amount > 500)}"
+
+class DiskCategoryStore:
+    """
+    SQLite file holding the user's category corrections and the warm set of
+    categorizations, tagged with the fingerprint of the keyword lists that
+    produced them.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS corrections (merchant TEXT PRIMARY KEY, category TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS categorizations (key TEXT PRIMARY KEY, category TEXT NOT NULL, position INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def load_corrections(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT merchant, category FROM corrections"))
+
+    def set_correction(self, merchant: str, category: Optional[str]):
+        with self._lock:
+            if category is None:
+                self._conn.execute("DELETE FROM corrections WHERE merchant = ?", (merchant,))
+            else:
+                self._conn.execute("INSERT OR REPLACE INTO corrections (merchant, category) VALUES (?, ?)",
+                                   (merchant, category))
+            self._conn.commit()
+
+    def load_categorizations(self, fingerprint: str) -> List[tuple]:
+        """
+        The saved warm set, least recently used first, or nothing if it was
+        produced by different keyword lists.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+            if row is None or row[0] != fingerprint:
+                return []
+            return self._conn.execute("SELECT key, category FROM categorizations ORDER BY position").fetchall()
+
+    def save_categorizations(self, fingerprint: str, entries: List[tuple]):
+        with self._lock:
+            self._conn.execute("DELETE FROM categorizations")
+            self._conn.executemany(
+                "INSERT INTO categorizations (key, category, position) VALUES (?, ?, ?)",
+                ((key, category, position) for position, (key, category) in enumerate(entries))
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('fingerprint', ?)", (fingerprint,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class CategoryCache:
+    """
+    Bounded LRU memo in front of the categorizer, keyed by normalized
+    merchant and description, with user corrections that override the
+    keyword heuristic for a merchant.
+
+    If a ``model`` is given, it learns from every correction and is
+    consulted before the keyword rules, so corrections also carry over to
+    similar merchants. Categorizations are dropped whenever the
+    categorizer's keyword lists change, even in place, or the model learns
+    something, in this process or another sharing it. If ``path`` is set,
+    corrections are stored in a SQLite file as they are made, and the warm
+    set is written, from a background thread, every ``save_every`` new
+    categorizations and on close and loaded again on startup, unless the
+    keyword lists changed in between.
+    """
+    def __init__(self, max_entries: Optional[int] = None, path: Optional[str] = None,
+                 save_every: int = CATEGORY_CACHE_SAVE_EVERY, model: Optional[CategoryModel] = None):
+        self.max_entries = max_entries if max_entries is not None else CATEGORY_CACHE_SIZE
+        path = path or CATEGORY_CACHE_PATH
+        self.disk = DiskCategoryStore(path) if path else None
+        self.save_every = save_every
+        self.model = model
+
+        self._lock = threading.Lock()
+        self._categories: "OrderedDict[str, str]" = OrderedDict()
+        self._corrections: Dict[str, str] = {}
+        self._unsaved = 0
+        self._saver: Optional[threading.Thread] = None
+
+        # Counters exposed through stats()
+        self.hits = 0
+        self.misses = 0
+        self.correction_hits = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        if self.disk is not None:
+            self._corrections = self.disk.load_corrections()
+        # A new model starts from the corrections made before it existed
+        if model is not None and model.updates == 0:
+            for merchant, category in self._corrections.items():
+                model.learn(merchant, "", category)
+        self._fingerprint = self._current_fingerprint()
+        if self.disk is not None:
+            for key, category in self.disk.load_categorizations(self._fingerprint)[-self.max_entries:]:
+                self._categories[key] = category
+
+    def _current_fingerprint(self) -> str:
+        # What the cached categorizations depend on: the keyword lists, even
+        # if they were edited in place, and, if there is a model, how far it
+        # has learned
+        fingerprint = categorizer.refresh_keywords().fingerprint
+        if self.model is not None:
+            fingerprint += f":{self.model.updates}"
+        return fingerprint
+
+    def _check_fresh_locked(self):
+        fingerprint = self._current_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._categories.clear()
+            self.invalidations += 1
+
+    def _remember_locked(self, key: str, category: str):
+        self._categories[key] = category
+        while len(self._categories) > self.max_entries:
+            self._categories.popitem(last=False)
+            self.evictions += 1
+        self._unsaved += 1
+
+    def _lookup_locked(self, merchant: str, key: str) -> Optional[str]:
+        # ``merchant`` is already normalized
+        correction = self._corrections.get(merchant)
+        if correction is not None:
+            self.correction_hits += 1
+            return correction
+        category = self._categories.get(key)
+        if category is not None:
+            self._categories.move_to_end(key)
+            self.hits += 1
+        return category
+
+    def categorize(self, merchant: str, amount: float, description: str = "") -> str:
+        """
+        Categorize a transaction, as categorize_transaction does, unless the
+        user corrected the merchant's category or it was categorized before.
+        """
+        merchant, description = normalize_merchant(merchant), normalize_merchant(description)
+        key = category_cache_key(merchant, amount, description)
+        with self._lock:
+            self._check_fresh_locked()
+            category = self._lookup_locked(merchant, key)
+            if category is not None:
+                return category
+            self.misses += 1
+
+        category = categorizer.categorize_transaction(merchant, amount, description, self.model)
+        with self._lock:
+            self._remember_locked(key, category)
+        self._maybe_save()
+        return category
+
+    def categorize_many(self, merchants: Sequence[str], amounts: Sequence[float],
+                        descriptions: Sequence[str]) -> List[str]:
+        """
+        Categorize many transactions, running the batch categorizer on the
+        ones that are neither corrected nor cached.
+        """
+        categories: List[Optional[str]] = [None] * len(merchants)
+        missed: Dict[str, List[int]] = {}
+        with self._lock:
+            self._check_fresh_locked()
+            for position, (merchant, amount, description) in enumerate(zip(merchants, amounts, descriptions)):
+                merchant = normalize_merchant(merchant)
+                key = category_cache_key(merchant, amount, description)
+                category = self._lookup_locked(merchant, key)
+                if category is None:
+                    missed.setdefault(key, []).append(position)
+                categories[position] = category
+            self.misses += sum(len(positions) for positions in missed.values())
+
+        if missed:
+            firsts = [positions[0] for positions in missed.values()]
+            computed = categorize_batch(
+                [normalize_merchant(merchants[position]) for position in firsts],
+                [amounts[position] for position in firsts],
+                [normalize_merchant(descriptions[position]) for position in firsts],
+                self.model,
+            )
+            with self._lock:
+                for (key, positions), category in zip(missed.items(), computed):
+                    self._remember_locked(key, category)
+                    for position in positions:
+                        categories[position] = category
+            self._maybe_save()
+        return categories
+
+    def set_correction(self, merchant: str, category: str):
+        """
+        Always categorize the merchant's transactions as ``category``.
+        """
+        merchant = normalize_merchant(merchant)
+        with self._lock:
+            previous = self._corrections.get(merchant)
+            self._corrections[merchant] = category
+        if self.disk is not None:
+            self.disk.set_correction(merchant, category)
+        if self.model is not None and previous != category:
+            if previous is not None:
+                self.model.unlearn(merchant, "", previous)
+            self.model.learn(merchant, "", category)
+
+    def remove_correction(self, merchant: str) -> bool:
+        """
+        Go back to the keyword heuristic for the merchant. Returns False if
+        the merchant had no correction.
+        """
+        merchant = normalize_merchant(merchant)
+        with self._lock:
+            previous = self._corrections.pop(merchant, None)
+        if previous is None:
+            return False
+        if self.disk is not None:
+            self.disk.set_correction(merchant, None)
+        if self.model is not None:
+            self.model.unlearn(merchant, "", previous)
+        return True
+
+    def corrections(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._corrections)
+
+    def _maybe_save(self):
+        # Written from a thread, so categorize does not block the event loop
+        # of the request that happened to fill the batch on the disk write
+        if self.disk is None or self._unsaved < self.save_every:
+            return
+        with self._lock:
+            if self._saver is not None and self._saver.is_alive():
+                return
+            self._saver = threading.Thread(target=self.save, name="category-cache-save", daemon=True)
+            self._saver.start()
+
+    def save(self):
+        """
+        Write the warm set to disk, least recently used first.
+        """
+        if self.disk is None:
+            return
+        with self._lock:
+            entries = list(self._categories.items())
+            fingerprint = self._fingerprint
+            self._unsaved = 0
+        self.disk.save_categorizations(fingerprint, entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache's hit, miss and eviction counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.correction_hits + self.misses
+            return {
+                "entries": len(self._categories),
+                "max_entries": self.max_entries,
+                "corrections": len(self._corrections),
+                "hits": self.hits,
+                "correction_hits": self.correction_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.correction_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "persistent": self.disk is not None,
+                "model_documents": self.model.documents if self.model is not None else None,
+                "model_updates": self.model.updates if self.model is not None else None,
+            }
+
+    def close(self):
+        if self._saver is not None:
+            self._saver.join()
+        if self.disk is not None:
+            self.save()
+            self.disk.close()
+        if self.model is not None:
+            self.model.flush()
@@ -1,6 +1,11 @@
 import re
+import threading
 from typing import List, Dict, Any, Optional
 
+from categorization.keyword_index import KeywordIndex
+from categorization.merchants import MerchantIndex, load_merchant_names
+from categorization.model import CategoryModel
+
 # Define category keywords
 CATEGORY_KEYWORDS = {
     "Food & Dining": [
@@ -59,44 +64,189 @@ CATEGORY_KEYWORDS = {
     ]
 }
 
-def categorize_transaction(merchant: str, amount: float, description: str = "") -> str:
+# Category keywords that describe a kind of business or purchase rather
+# than name a merchant. They are left out of the known merchant names, so
+# "Fuel Doctor" is not recognized as "doctor".
+GENERIC_KEYWORDS = {
+    "restaurant", "cafe", "diner", "bistro", "grill", "steakhouse", "pizzeria", "sushi", "thai",
+    "chinese", "mexican", "italian", "burger", "coffee",
+    "grocery", "supermarket", "market", "food", "produce", "milk", "bread", "eggs", "meat", "vegetable",
+    "gas", "fuel", "petrol", "taxi", "cab", "transit", "metro", "bus", "train", "parking", "toll",
+    "car wash", "auto", "vehicle",
+    "electric", "water", "utility", "power", "energy", "sewage", "waste", "garbage", "internet", "wifi",
+    "broadband", "cable", "tv", "phone", "mobile", "cell",
+    "rent", "mortgage", "lease", "apartment", "condo", "house", "home", "property", "real estate", "hoa",
+    "maintenance", "repair", "furniture", "decor",
+    "movie", "theater", "cinema", "concert", "show", "ticket", "game", "book",
+    "clothing", "apparel", "fashion", "shoes", "accessory", "jewelry", "watch", "electronics", "gadget",
+    "device",
+    "salon", "spa", "hair", "nail", "barber", "beauty", "cosmetic", "makeup", "skincare", "pharmacy",
+    "soap", "shampoo", "toothpaste", "deodorant",
+    "doctor", "physician", "hospital", "clinic", "medical", "health", "dental", "dentist", "vision", "eye",
+    "optometrist", "prescription", "medicine", "drug", "therapy", "counseling", "insurance",
+    "school", "college", "university", "tuition", "education", "course", "class", "training", "workshop",
+    "seminar", "textbook", "supplies", "student", "loan", "scholarship",
+    "bill", "payment", "fee", "subscription", "membership", "due", "invoice", "statement", "account",
+    "service", "charge", "credit card", "debt",
+}
+
+# Words that mark large deposits as income
+INCOME_WORDS = ["salary", "deposit", "payroll", "income", "direct deposit"]
+
+# Bills from utility and housing merchants are categorized by these words
+# rather than by keyword counts
+BILL_WORDS = ["bill", "payment", "monthly", "subscription"]
+UTILITY_BILL_WORDS = ["electric", "water", "gas", "power", "energy"]
+HOUSING_BILL_WORDS = ["rent", "mortgage", "lease", "hoa"]
+
+def build_keyword_index(category_keywords: Dict[str, List[str]]) -> KeywordIndex:
     """
-    Automatically categorize a transaction based on merchant name, amount, and description.
-    
-    Args:
-        merchant: The name of the merchant or store
-        amount: The transaction amount
-        description: Additional description or notes about the transaction
-        
-    Returns:
-        The determined category as a string
+    Compile the category keywords and the income and bill words into one
+    automaton, so a transaction's text is scanned once. The special word
+    lists come after the categories, under lowercase names no category has.
+    """
+    return KeywordIndex({
+        **category_keywords,
+        "income": INCOME_WORDS,
+        "bill": BILL_WORDS,
+        "utility bill": UTILITY_BILL_WORDS,
+        "housing bill": HOUSING_BILL_WORDS,
+    })
+
+def keyword_lists() -> tuple:
+    """
+    Copy of every keyword list the index is built from, to compare with the
+    lists later and tell whether one was changed in place.
+    """
+    return ({category: list(keywords) for category, keywords in CATEGORY_KEYWORDS.items()},
+            list(INCOME_WORDS), list(BILL_WORDS), list(UTILITY_BILL_WORDS), list(HOUSING_BILL_WORDS))
+
+KEYWORD_INDEX = build_keyword_index(CATEGORY_KEYWORDS)
+CATEGORY_COUNT = len(CATEGORY_KEYWORDS)
+INCOME, BILL, UTILITY_BILL, HOUSING_BILL = range(CATEGORY_COUNT, CATEGORY_COUNT + 4)
+_indexed_keywords = keyword_lists()
+
+def reload_keywords():
+    """
+    Rebuild the keyword index after CATEGORY_KEYWORDS has been changed.
+    Cached categorizations made with the old keywords are dropped.
+    """
+    global KEYWORD_INDEX, CATEGORY_COUNT, INCOME, BILL, UTILITY_BILL, HOUSING_BILL, _indexed_keywords
+    _indexed_keywords = keyword_lists()
+    CATEGORY_COUNT = len(CATEGORY_KEYWORDS)
+    INCOME, BILL, UTILITY_BILL, HOUSING_BILL = range(CATEGORY_COUNT, CATEGORY_COUNT + 4)
+    KEYWORD_INDEX = build_keyword_index(CATEGORY_KEYWORDS)
+
+def refresh_keywords() -> KeywordIndex:
+    """
+    Get the keyword index, rebuilding it first if CATEGORY_KEYWORDS or the
+    income and bill words were changed in place since it was built. The
+    comparison is of lists holding the same string objects, so it is cheap
+    enough to run on every categorization.
+    """
+    if (CATEGORY_KEYWORDS, INCOME_WORDS, BILL_WORDS, UTILITY_BILL_WORDS, HOUSING_BILL_WORDS) != _indexed_keywords:
+        reload_keywords()
+    return KEYWORD_INDEX
+
+_merchant_index: Optional[MerchantIndex] = None
+_merchant_index_fingerprint: Optional[str] = None
+_merchant_index_lock = threading.Lock()
+
+def merchant_keywords() -> List[str]:
+    """
+    The category keywords that name merchants, such as "whole foods" or
+    "comcast", without the generic words and the income and bill words.
+    """
+    keywords = []
+    for category_keywords in CATEGORY_KEYWORDS.values():
+        keywords.extend(keyword for keyword in category_keywords
+                        if keyword not in GENERIC_KEYWORDS and keyword not in keywords)
+    return keywords
+
+def get_merchant_index() -> MerchantIndex:
+    """
+    Get the fuzzy index of known merchant names: the category keywords that
+    name merchants and the names in MERCHANT_NAMES_PATH. It is built on
+    first use and rebuilt when the keywords change.
+    """
+    global _merchant_index, _merchant_index_fingerprint
+    index = KEYWORD_INDEX
+    with _merchant_index_lock:
+        if _merchant_index is None or _merchant_index_fingerprint != index.fingerprint:
+            _merchant_index = MerchantIndex(merchant_keywords() + load_merchant_names())
+            _merchant_index_fingerprint = index.fingerprint
+        return _merchant_index
+
+def canonical_merchant(merchant: str) -> Optional[str]:
+    """
+    The known merchant name an OCR'd or abbreviated merchant most likely is,
+    such as "whole foods" for "WH0LE F00DS MKT #1234", or None.
+    """
+    if not merchant:
+        return None
+    match = get_merchant_index().lookup(merchant)
+    return match.name if match else None
+
+def category_from_counts(counts: List[int], amount: float) -> str:
+    """
+    Pick the category from the number of each keyword group's keywords in a
+    transaction's text.
     """
-    # Combine merchant and description for better matching
-    text = f"{merchant} {description}".lower()
-    
     # Check for income (usually large deposits)
-    if amount > 500 and any(word in text for word in ["salary", "deposit", "payroll", "income", "direct deposit"]):
+    if amount > 500 and counts[INCOME]:
         return "Income"
     
-    # Check each category's keywords
+    # The category with the most keywords in the text; the first one on a tie
     max_matches = 0
     best_category = "Other"  # Default category
     
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        matches = sum(1 for keyword in keywords if keyword.lower() in text)
+    for category, matches in zip(KEYWORD_INDEX.groups[:CATEGORY_COUNT], counts):
         if matches > max_matches:
             max_matches = matches
             best_category = category
     
     # Special case for bills - check for common bill merchants
-    if any(bill_word in text for bill_word in ["bill", "payment", "monthly", "subscription"]):
-        if any(utility in text for utility in ["electric", "water", "gas", "power", "energy"]):
+    if counts[BILL]:
+        if counts[UTILITY_BILL]:
             return "Utilities"
-        if any(housing in text for housing in ["rent", "mortgage", "lease", "hoa"]):
+        if counts[HOUSING_BILL]:
             return "Housing"
     
     return best_category
 
+def categorize_transaction(merchant: str, amount: float, description: str = "",
+                           model: Optional[CategoryModel] = None) -> str:
+    """
+    Automatically categorize a transaction based on merchant name, amount, and description.
+    
+    If no keyword matches, the merchant is looked up among known merchant
+    names, so OCR noise like "WH0LE F00DS" still finds its category.
+    
+    Args:
+        merchant: The name of the merchant or store
+        amount: The transaction amount
+        description: Additional description or notes about the transaction
+        model: Model learned from user corrections, used instead of the
+            keyword rules when it is confident enough
+        
+    Returns:
+        The determined category as a string
+    """
+    if model is not None:
+        prediction = model.predict(merchant, description)
+        if prediction is not None and prediction.confidence >= model.min_confidence:
+            return prediction.category
+    
+    # Combine merchant and description for better matching
+    index = refresh_keywords()
+    text = f"{merchant} {description}".lower()
+    category = category_from_counts(index.counts(text), amount)
+    if category == "Other":
+        canonical = canonical_merchant(merchant)
+        if canonical is not None:
+            category = category_from_counts(index.counts(f"{canonical.lower()} {text}"), amount)
+    return category
+
 def get_all_categories() -> List[str]:
     """
     Get a list of all available transaction categories.
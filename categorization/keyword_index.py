@@ -0,0 +1,142 @@
+import hashlib
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+class KeywordIndex:
+    """
+    Aho-Corasick automaton over groups of keywords, built once so that the
+    keywords of every group are found in a single pass over the text instead
+    of one substring search per keyword.
+
+    Keywords are lowercased when the index is built and texts are expected
+    to be lowercase already. A keyword listed in several groups, or twice in
+    one group, counts once for each listing, as a scan over the lists would.
+    """
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.groups = list(groups)
+        self.keywords: List[str] = []
+        keyword_ids: Dict[str, int] = {}
+        listings: List[List[int]] = []
+        for group_index, keywords in enumerate(groups.values()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                keyword_id = keyword_ids.get(keyword)
+                if keyword_id is None:
+                    keyword_id = keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    listings.append([])
+                listings[keyword_id].append(group_index)
+        # Group of every listing of each keyword
+        self.keyword_groups: List[Tuple[int, ...]] = [tuple(listing) for listing in listings]
+        self._root, self._transitions, self._outputs = self._build(self.keywords)
+        self._group_matrix: Optional[np.ndarray] = None
+
+        # Changes whenever a group, a keyword or their order changes
+        digest = hashlib.sha256()
+        for group, keywords in groups.items():
+            digest.update(group.encode() + b"\1")
+            for keyword in keywords:
+                digest.update(keyword.encode() + b"\0")
+        self.fingerprint = digest.hexdigest()
+
+    @staticmethod
+    def _build(keywords: List[str]) -> Tuple[Dict[str, int], List[Dict[str, int]], List[Tuple[int, ...]]]:
+        # Trie of the keywords
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = goto[state][char] = len(goto)
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword_id)
+
+        # Breadth-first pass that turns the trie into a deterministic
+        # automaton: each state takes over the transitions of its failure
+        # state that it has no edge of its own for, and its outputs. The
+        # root's transitions are not copied; a character a state has no
+        # transition for is looked up at the root instead.
+        root = goto[0]
+        transitions: List[Dict[str, int]] = [{} for _ in goto]
+        fail = [0] * len(goto)
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            failure = fail[state]
+            outputs[state].extend(outputs[failure])
+            state_transitions = dict(transitions[failure])
+            for char, child in goto[state].items():
+                fail[child] = transitions[failure].get(char) or root.get(char, 0)
+                state_transitions[char] = child
+                queue.append(child)
+            transitions[state] = state_transitions
+        return root, transitions, [tuple(output) for output in outputs]
+
+    def find(self, text: str) -> Set[int]:
+        """
+        IDs (indexes into ``keywords``) of the distinct keywords found in the text.
+        """
+        root = self._root
+        transitions = self._transitions
+        outputs = self._outputs
+        found: Set[int] = set()
+        state = 0
+        for char in text:
+            state = transitions[state].get(char) or root.get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def counts(self, text: str) -> List[int]:
+        """
+        Number of each group's keywords found in the text, in group order.
+        """
+        counts = [0] * len(self.groups)
+        keyword_groups = self.keyword_groups
+        for keyword_id in self.find(text):
+            for group_index in keyword_groups[keyword_id]:
+                counts[group_index] += 1
+        return counts
+
+    def first_group(self, text: str) -> Optional[str]:
+        """
+        The first group, in group order, with a keyword in the text.
+        """
+        found = self.find(text)
+        if not found:
+            return None
+        return self.groups[min(min(self.keyword_groups[keyword_id]) for keyword_id in found)]
+
+    def find_many(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (text index, keyword ID) of every distinct keyword found in each text:
+        the nonzero entries of a texts x keywords presence matrix.
+        """
+        text_indexes: List[int] = []
+        keyword_ids: List[int] = []
+        for text_index, text in enumerate(texts):
+            found = self.find(text)
+            text_indexes.extend([text_index] * len(found))
+            keyword_ids.extend(found)
+        return np.array(text_indexes, np.int64), np.array(keyword_ids, np.int64)
+
+    def group_matrix(self) -> np.ndarray:
+        """
+        Keywords x groups matrix of how many times each keyword is listed in
+        each group, so that a presence matrix times it gives ``counts``.
+        """
+        if self._group_matrix is None:
+            matrix = np.zeros((len(self.keywords), len(self.groups)), np.int32)
+            for keyword_id, group_indexes in enumerate(self.keyword_groups):
+                for group_index in group_indexes:
+                    matrix[keyword_id, group_index] += 1
+            self._group_matrix = matrix
+        return self._group_matrix
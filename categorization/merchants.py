@@ -0,0 +1,149 @@
+import heapq
+import os
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+# File of extra known merchant names, one per line, added to the merchant
+# keywords the fuzzy merchant index is built from
+MERCHANT_NAMES_PATH = os.environ.get("MERCHANT_NAMES_PATH")
+
+# Similarity (0-1) between each word of a known name and the closest word
+# of a merchant for the merchant to be recognized as that name
+MIN_MERCHANT_SIMILARITY = float(os.environ.get("MERCHANT_MIN_SIMILARITY", "0.75"))
+
+# Most name IDs read from the inverted index per lookup. The query's rarest
+# trigrams are read first; the rest still count when candidates are scored.
+MAX_POSTINGS = int(os.environ.get("MERCHANT_MAX_POSTINGS", "1024"))
+
+# Candidates scored per lookup
+MAX_CANDIDATES = 32
+
+# Known names shorter than this, once folded, are too short to match fuzzily
+MIN_NAME_LENGTH = 4
+
+# Characters OCR confuses, folded to one character inside words that have
+# letters, so "WH0LE F00DS" and "Whole Foods" fold the same way
+OCR_FOLD = str.maketrans({"0": "o", "1": "l", "i": "l", "|": "l", "5": "s", "8": "b", "$": "s"})
+
+WORD = re.compile(r'[a-z0-9|$]+')
+LETTER = re.compile(r'[a-z]')
+
+def fold_merchant(name: str) -> str:
+    """
+    Fold a merchant name for fuzzy matching: lowercase, punctuation removed,
+    OCR-confusable characters folded within words, and words without letters
+    (store numbers, dates) dropped.
+    """
+    words = [word.translate(OCR_FOLD) for word in WORD.findall(name.lower()) if LETTER.search(word)]
+    return " ".join(words)
+
+def word_trigrams(word: str) -> FrozenSet[str]:
+    """
+    Trigrams of a word padded with spaces, so word boundaries count.
+    """
+    padded = f" {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def word_similarity(name_word: FrozenSet[str], words: List[FrozenSet[str]]) -> float:
+    """
+    Dice similarity of a word's trigrams to the closest of ``words``.
+    """
+    return max((2 * len(name_word & word) / (len(name_word) + len(word)) for word in words), default=0.0)
+
+class MerchantMatch(NamedTuple):
+    name: str
+    score: float
+
+class MerchantIndex:
+    """
+    Character-trigram inverted index over known merchant names, for finding
+    the known name in a merchant string garbled by OCR.
+
+    Candidates are found from the query's rarest trigrams, reading at most
+    ``max_postings`` name IDs from the index, and at most MAX_CANDIDATES
+    names with the largest share of their trigrams in the query are scored,
+    so a lookup's cost is bounded however many names there are. A candidate
+    matches when its words are, on average weighted by length, at least
+    ``min_similarity`` similar to the closest words of the query, so extra
+    words like "MKT" or a branch name don't stop a match.
+    """
+    def __init__(self, names: Iterable[str], min_similarity: float = MIN_MERCHANT_SIMILARITY,
+                 max_postings: int = MAX_POSTINGS):
+        self.min_similarity = min_similarity
+        self.max_postings = max_postings
+        self.names: List[str] = []
+        self._trigrams: List[FrozenSet[str]] = []
+        self._words: List[List[FrozenSet[str]]] = []
+        self._postings: Dict[str, List[int]] = {}
+        seen = set()
+        for name in names:
+            folded = fold_merchant(name)
+            if len(folded) < MIN_NAME_LENGTH or folded in seen:
+                continue
+            seen.add(folded)
+            name_id = len(self.names)
+            self.names.append(name)
+            words = [word_trigrams(word) for word in folded.split()]
+            grams = frozenset().union(*words)
+            self._words.append(words)
+            self._trigrams.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(name_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, merchant: str) -> Optional[MerchantMatch]:
+        """
+        The known name that best matches the merchant, with its similarity,
+        or None if none is similar enough.
+        """
+        query_words = [word_trigrams(word) for word in fold_merchant(merchant).split()]
+        if not query_words:
+            return None
+        query = frozenset().union(*query_words)
+        postings = sorted(
+            (posting for posting in map(self._postings.get, query) if posting is not None), key=len
+        )
+        counts: Counter = Counter()
+        budget = self.max_postings
+        skipped = 0
+        for posting in postings:
+            if len(posting) > budget:
+                if not counts:
+                    # Even the rarest trigram is common; use part of it
+                    counts.update(posting[:budget])
+                skipped += 1
+                continue
+            counts.update(posting)
+            budget -= len(posting)
+
+        # Rank by the share of each name's trigrams found so far, leaving out
+        # names that cannot reach min_similarity even with every skipped trigram
+        trigrams = self._trigrams
+        candidates = heapq.nlargest(MAX_CANDIDATES, (
+            (count / len(trigrams[name_id]), name_id) for name_id, count in counts.items()
+            if count + skipped >= self.min_similarity * len(trigrams[name_id])
+        ))
+
+        # Score each candidate by how closely each of its words matches a
+        # word of the query, weighting longer words more
+        best = None
+        best_key = (0.0, 0)
+        for _, name_id in candidates:
+            words = self._words[name_id]
+            score = sum(word_similarity(word, query_words) * len(word) for word in words) / len(trigrams[name_id])
+            # Prefer the most similar name, and the longest one on a tie
+            key = (score, len(trigrams[name_id]))
+            if score >= self.min_similarity and key > best_key:
+                best, best_key = name_id, key
+        if best is None:
+            return None
+        return MerchantMatch(self.names[best], best_key[0])
+
+def load_merchant_names(path: Optional[str] = MERCHANT_NAMES_PATH) -> List[str]:
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
@@ -0,0 +1,190 @@
+import math
+import os
+import re
+import threading
+import zlib
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.models import TransactionCategory
+from ocr.script_detection import normalize_merchant
+
+# .npy file the model's counts are memory-mapped from, so every worker
+# shares one copy and learns from every worker's corrections. Unset keeps
+# the model in memory.
+CATEGORY_MODEL_PATH = os.environ.get("CATEGORY_MODEL_PATH")
+
+# Hashed token features; more features mean fewer collisions and a bigger file
+CATEGORY_MODEL_FEATURES = int(os.environ.get("CATEGORY_MODEL_FEATURES", str(2 ** 16)))
+
+# Smallest posterior probability of the model's best category for it to be
+# used instead of the keyword rules
+MIN_MODEL_CONFIDENCE = float(os.environ.get("CATEGORY_MODEL_MIN_CONFIDENCE", "0.8"))
+
+# Least number of times a transaction's tokens must have been learned in
+# its best category for the model to predict it. Without this the priors
+# alone decide transactions the model knows nothing about, so corrections
+# piled into one category would claim every unseen merchant; and one count
+# can be a hash collision with another merchant's token.
+MIN_MODEL_EVIDENCE = float(os.environ.get("CATEGORY_MODEL_MIN_EVIDENCE", "2"))
+
+# Additive smoothing of the token counts, and of the transaction counts the
+# category priors come from
+SMOOTHING = 0.01
+PRIOR_SMOOTHING = 1.0
+
+TOKEN = re.compile(r'\w+')
+
+class ModelPrediction(NamedTuple):
+    category: str
+    confidence: float
+
+def transaction_tokens(merchant: str, description: str = "") -> List[str]:
+    """
+    Tokens a transaction is classified by: the words of its merchant and
+    description, and its whole normalized merchant name.
+    """
+    merchant = normalize_merchant(merchant)
+    tokens = TOKEN.findall(f"{merchant} {normalize_merchant(description)}")
+    if merchant:
+        tokens.append(f"merchant={merchant}")
+    return tokens
+
+class CategoryModel:
+    """
+    Multinomial naive Bayes over hashed transaction tokens, trained one
+    correction at a time.
+
+    All parameters are counts in one float64 array: a row per hashed
+    feature with its count in each category, then the total token count
+    and the number of training transactions of each category, then a
+    counter of updates. Learning a transaction adds to the rows of its
+    tokens, so it costs O(tokens), and the array can be memory-mapped from
+    ``path`` so worker processes share it. Concurrent updates from several
+    processes are not locked against each other; a lost increment only
+    nudges a count.
+    """
+    def __init__(self, path: Optional[str] = None, n_features: int = CATEGORY_MODEL_FEATURES,
+                 min_confidence: float = MIN_MODEL_CONFIDENCE, min_evidence: float = MIN_MODEL_EVIDENCE):
+        self.categories = [category.value for category in TransactionCategory]
+        self.min_confidence = min_confidence
+        self.min_evidence = min_evidence
+        self.path = path
+        shape = (n_features + 3, len(self.categories))
+        if path and os.path.exists(path):
+            counts = np.load(path, mmap_mode="r+")
+            if counts.ndim != 2 or counts.shape[1] != len(self.categories) or counts.dtype != np.float64:
+                raise ValueError(f"{path} is not a category model for {len(self.categories)} categories")
+        elif path:
+            counts = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=shape)
+        else:
+            counts = np.zeros(shape, np.float64)
+        self.counts = counts
+        self.n_features = counts.shape[0] - 3
+        self._features = counts[:self.n_features]
+        self._tokens = counts[self.n_features]
+        self._documents = counts[self.n_features + 1]
+        self._meta = counts[self.n_features + 2]
+        self._category_ids = {category: i for i, category in enumerate(self.categories)}
+        self._lock = threading.Lock()
+
+    @property
+    def updates(self) -> int:
+        """
+        Number of times the model has learned or unlearned a transaction,
+        by any process sharing it.
+        """
+        return int(self._meta[0])
+
+    @property
+    def documents(self) -> int:
+        return int(self._documents.sum())
+
+    def features(self, merchant: str, description: str = "") -> np.ndarray:
+        """
+        Hashed feature IDs of a transaction's tokens.
+        """
+        n_features = self.n_features
+        return np.fromiter(
+            (zlib.crc32(token.encode()) % n_features for token in transaction_tokens(merchant, description)),
+            np.int64
+        )
+
+    def learn(self, merchant: str, description: str, category: str, weight: float = 1.0):
+        """
+        Add a transaction of ``category`` to the counts, or take one away
+        with a negative ``weight``.
+        """
+        category_id = self._category_ids[category]
+        features = self.features(merchant, description)
+        with self._lock:
+            column = self._features[:, category_id]
+            np.add.at(column, features, weight)
+            if weight < 0:
+                # Taking away more than was learned would leave negative counts
+                column[features] = np.maximum(column[features], 0)
+            self._tokens[category_id] = max(self._tokens[category_id] + weight * len(features), 0)
+            self._documents[category_id] = max(self._documents[category_id] + weight, 0)
+            self._meta[0] += 1
+
+    def unlearn(self, merchant: str, description: str, category: str):
+        self.learn(merchant, description, category, -1.0)
+
+    def _log_priors(self) -> np.ndarray:
+        documents = self._documents
+        return np.log(documents + PRIOR_SMOOTHING) - math.log(documents.sum() + PRIOR_SMOOTHING * len(documents))
+
+    def _log_denominators(self) -> np.ndarray:
+        return np.log(self._tokens + SMOOTHING * self.n_features)
+
+    def predict(self, merchant: str, description: str = "") -> Optional[ModelPrediction]:
+        """
+        The most probable category of a transaction and its posterior
+        probability, or None if its tokens have been learned in that
+        category fewer than ``min_evidence`` times.
+        """
+        if not self._documents.any():
+            return None
+        features = self.features(merchant, description)
+        counts = self._features[features]
+        scores = self._log_priors() + np.log(counts + SMOOTHING).sum(axis=0)
+        scores -= len(features) * self._log_denominators()
+        best = int(np.argmax(scores))
+        if counts[:, best].sum() < self.min_evidence:
+            return None
+        probabilities = np.exp(scores - scores[best])
+        return ModelPrediction(self.categories[best], float(1.0 / probabilities.sum()))
+
+    def predict_many(self, merchants: Sequence[str], descriptions: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict many transactions at once. Returns arrays of the best
+        category of each and its posterior probability, which is 0 for the
+        transactions predict gives None for.
+        """
+        if not self._documents.any():
+            return np.full(len(merchants), "Other", dtype=object), np.zeros(len(merchants))
+        features = [self.features(merchant, description) for merchant, description in zip(merchants, descriptions)]
+        lengths = np.fromiter((len(ids) for ids in features), np.int64, len(features))
+        feature_ids = np.concatenate(features) if features else np.zeros(0, np.int64)
+        text_indexes = np.repeat(np.arange(len(features)), lengths)
+
+        counts = self._features[feature_ids]
+        scores = np.tile(self._log_priors(), (len(features), 1))
+        np.add.at(scores, text_indexes, np.log(counts + SMOOTHING))
+        scores -= lengths[:, None] * self._log_denominators()
+        best = np.argmax(scores, axis=1)
+        probabilities = np.exp(scores - scores[np.arange(len(features)), best][:, None])
+
+        # Count of each transaction's tokens in its best category
+        evidence = np.zeros(len(features))
+        np.add.at(evidence, text_indexes, counts[np.arange(len(feature_ids)), best[text_indexes]])
+        confidences = np.where(evidence >= self.min_evidence, 1.0 / probabilities.sum(axis=1), 0.0)
+        return np.array(self.categories, dtype=object)[best], confidences
+
+    def flush(self):
+        """
+        Write the counts to ``path``, if the model is memory-mapped.
+        """
+        if isinstance(self.counts, np.memmap):
+            self.counts.flush()
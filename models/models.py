@@ -10,7 +10,13 @@ class ReceiptItem(BaseModel):
 
 class ReceiptData(BaseModel):
     merchant: str
+    # Known merchant name the OCR'd merchant was recognized as, such as
+    # "whole foods" for "WH0LE F00DS MKT"; None if it matched none
+    canonical_merchant: Optional[str] = None
     date: datetime
+    # Format the date was read in, such as "%d/%m/%Y"; None if the receipt
+    # had no readable date and the processing time was used instead
+    date_format: Optional[str] = None
     total: float
     subtotal: Optional[float] = None
     tax: Optional[float] = None
@@ -18,6 +24,29 @@ class ReceiptData(BaseModel):
     receipt_type: Optional[str] = "General"
     items: List[ReceiptItem] = []
     raw_text: Optional[str] = None
+    # OCR pass that produced the result ("template", "fast" or "full") and,
+    # for the template and fast passes, their mean word confidence
+    ocr_tier: Optional[str] = None
+    ocr_confidence: Optional[float] = None
+
+class OCRJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class OCRJobStage(BaseModel):
+    name: str
+    elapsed_ms: float
+
+class OCRJob(BaseModel):
+    job_id: str
+    status: OCRJobStatus
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    stages: List[OCRJobStage] = []
+    result: Optional[ReceiptData] = None
+    error: Optional[str] = None
 
 class TransactionCategory(str, Enum):
     FOOD_DINING = "Food & Dining"
@@ -37,6 +66,10 @@ class TransactionCategory(str, Enum):
     INCOME = "Income"
     OTHER = "Other"
 
+class CategoryCorrection(BaseModel):
+    merchant: str
+    category: TransactionCategory
+
 class FilingStatus(str, Enum):
     SINGLE = "single"
     MARRIED_JOINT = "married-joint"
@@ -53,16 +86,45 @@ class IncomeTaxRequest(BaseModel):
     state: str
     deduction_type: DeductionType
     custom_deduction: Optional[float] = None
+    # Tax year whose tables to use; the default year if not given
+    tax_year: Optional[int] = None
+
+class IncomeRange(BaseModel):
+    # Incomes from start to stop, inclusive, every step
+    start: float = 0
+    stop: float
+    step: float
+
+class TaxGridFormat(str, Enum):
+    JSON = "json"
+    FLOAT32 = "float32"
+
+class TaxGridRequest(BaseModel):
+    # Either a list of incomes or a range of them
+    incomes: Optional[List[float]] = None
+    income_range: Optional[IncomeRange] = None
+    filing_statuses: List[FilingStatus] = list(FilingStatus)
+    states: List[str]
+    deduction_types: List[DeductionType] = [DeductionType.STANDARD]
+    custom_deduction: Optional[float] = None
+    tax_year: Optional[int] = None
+    # Result columns to return; all of them if not given
+    columns: Optional[List[str]] = None
+    format: TaxGridFormat = TaxGridFormat.JSON
 
 class SalesTaxRequest(BaseModel):
     purchase_amount: float
     state: str
     is_essential: bool = False
+    # Tax year whose tables to use; the default year if not given
+    tax_year: Optional[int] = None
 
 class PropertyTaxRequest(BaseModel):
     property_value: float
     state: str
     county: Optional[str] = None
+    # Tax year whose tables to use; the default year if not given
+    tax_year: Optional[int] = None
 
 class TaxBreakdown(BaseModel):
     name: str
@@ -74,6 +136,8 @@ class TaxResult(BaseModel):
     state_tax: float = 0
     total_tax: float
     effective_rate: float
+    # Federal rate on the next dollar of income, for income tax results
+    marginal_rate: Optional[float] = None
     breakdown: List[TaxBreakdown]
     insights: Optional[str] = None
 
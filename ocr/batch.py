@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ocr.cache import OCRResultCache, receipt_cache_key
+from ocr.receipt_processor import process_receipt_image
+from ocr.worker_pool import OCRWorkerPool
+
+async def process_receipt_batch(
+    pool: OCRWorkerPool,
+    images: List[Tuple[str, Optional[bytes]]],
+    concurrency: Optional[int] = None,
+    cache: Optional[OCRResultCache] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process many receipt images on the worker pool, yielding one result per
+    image in the order they finish.
+
+    Each result has the image's index and filename and either the receipt
+    data or an error. Images given as None (for example uploads that are not
+    images) are reported as errors without being processed. At most
+    ``concurrency`` images (default: the pool's worker count) are in the pool
+    at once, so a large batch waits its turn instead of filling the pool's
+    queue and being rejected. Results are looked up in and added to ``cache``
+    if one is given.
+    """
+    semaphore = asyncio.Semaphore(concurrency or pool.max_workers)
+
+    async def process(index: int, filename: str, contents: Optional[bytes]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"index": index, "filename": filename}
+        if contents is None:
+            result.update(status="error", error="File must be an image")
+            return result
+        async with semaphore:
+            try:
+                if cache is not None:
+                    receipt_data = await cache.get_or_compute(
+                        receipt_cache_key(contents),
+                        lambda: pool.run(process_receipt_image, contents)
+                    )
+                else:
+                    receipt_data = await pool.run(process_receipt_image, contents)
+            except Exception as e:
+                result.update(status="error", error=str(e) or type(e).__name__)
+            else:
+                result.update(status="ok", receipt=receipt_data)
+        return result
+
+    tasks = [asyncio.ensure_future(process(index, filename, contents))
+             for index, (filename, contents) in enumerate(images)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Stop queueing work if the client goes away mid-batch
+        for task in tasks:
+            task.cancel()
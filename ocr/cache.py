@@ -0,0 +1,223 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from models.models import ReceiptData
+from ocr.receipt_processor import PIPELINE_VERSION
+from ocr.script_detection import normalize_merchant
+
+def receipt_cache_key(image_bytes: bytes, merchant: Optional[str] = None) -> str:
+    """
+    Content address of an image for the current OCR pipeline version and
+    the merchant name given with it, which can change the result.
+    """
+    digest = hashlib.sha256()
+    digest.update(PIPELINE_VERSION.encode())
+    digest.update(b"\0")
+    digest.update(normalize_merchant(merchant or "").encode())
+    digest.update(b"\0")
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+class DiskReceiptCache:
+    """
+    SQLite-backed cache of compressed receipt results, evicting the least
+    recently used entries once the stored data exceeds ``max_bytes``.
+    """
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS receipts "
+            "(key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS receipts_accessed ON receipts (accessed)")
+        self._conn.commit()
+        self.size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM receipts").fetchone()[0]
+
+    def get(self, key: str) -> Optional[ReceiptData]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM receipts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE receipts SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return ReceiptData.parse_raw(zlib.decompress(row[0]))
+
+    def put(self, key: str, receipt_data: ReceiptData):
+        data = zlib.compress(receipt_data.json().encode())
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM receipts WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO receipts (key, data, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time())
+            )
+            self.size += len(data) - (previous[0] if previous else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        while self.size > self.max_bytes:
+            oldest = self._conn.execute(
+                "SELECT key, size FROM receipts ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                self._conn.execute("DELETE FROM receipts WHERE key = ?", (key,))
+                self.size -= size
+                self.evictions += 1
+                if self.size <= self.max_bytes:
+                    break
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM receipts").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def retrieve_exception(task: asyncio.Future):
+    """
+    Mark a task's exception as retrieved, for when nobody is left waiting on it.
+    """
+    if not task.cancelled():
+        task.exception()
+
+class OCRResultCache:
+    """
+    Two-tier cache of OCR results keyed by image content.
+
+    Results are kept in a bounded in-memory LRU and, if ``disk_path`` is set,
+    in a size-bounded SQLite file. Concurrent requests for the same key
+    share a single computation, which finishes even if the request that
+    started it is cancelled. Only successful results are cached.
+    """
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        disk_max_bytes: Optional[int] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("OCR_CACHE_SIZE", "256"))
+        disk_path = disk_path or os.environ.get("OCR_CACHE_PATH")
+        if disk_max_bytes is None:
+            disk_max_bytes = int(float(os.environ.get("OCR_CACHE_DISK_MAX_MB", "256")) * 1024 * 1024)
+        self.disk = DiskReceiptCache(disk_path, disk_max_bytes) if disk_path else None
+
+        self._memory: "OrderedDict[str, ReceiptData]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Counters exposed through stats()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.memory_evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        """
+        Whether ``key``'s result is in memory or being computed.
+        """
+        return key in self._memory or key in self._inflight
+
+    def _remember(self, key: str, receipt_data: ReceiptData):
+        self._memory[key] = receipt_data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[ReceiptData]]) -> ReceiptData:
+        """
+        Return the cached result for ``key``, awaiting ``compute()`` on a miss.
+        Callers get their own copy of the result.
+        """
+        result = await asyncio.shield(self.start(key, compute))
+        return result.copy(deep=True)
+
+    def start(self, key: str, compute: Callable[[], Awaitable[ReceiptData]]) -> "asyncio.Future":
+        """
+        Look up ``key``, starting ``compute()`` on a miss, and return a future
+        of its result without waiting for it, so later calls for the same key
+        share the computation at once. The result is shared, so copy it before
+        changing it. Must be called from the event loop.
+        """
+        cached = self._memory.get(key)
+        if cached is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(cached)
+            return future
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            # The computation is its own task, so a caller that is cancelled,
+            # e.g. because its client went away, does not cancel it for the
+            # others waiting on it
+            inflight = asyncio.ensure_future(self._compute(key, compute))
+            inflight.add_done_callback(retrieve_exception)
+            self._inflight[key] = inflight
+        else:
+            self.coalesced += 1
+        return inflight
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[ReceiptData]]) -> ReceiptData:
+        try:
+            result = await self._load_or_compute(key, compute)
+            self._remember(key, result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def _load_or_compute(self, key: str, compute: Callable[[], Awaitable[ReceiptData]]) -> ReceiptData:
+        loop = asyncio.get_running_loop()
+        if self.disk is not None:
+            result = await loop.run_in_executor(None, self.disk.get, key)
+            if result is not None:
+                self.disk_hits += 1
+                return result
+
+        self.misses += 1
+        result = await compute()
+        if self.disk is not None:
+            await loop.run_in_executor(None, self.disk.put, key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache's hit, miss and eviction counters.
+        """
+        stats = {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "memory_evictions": self.memory_evictions,
+            "inflight": len(self._inflight),
+        }
+        if self.disk is not None:
+            stats.update(
+                disk_entries=len(self.disk),
+                disk_bytes=self.disk.size,
+                disk_max_bytes=self.disk.max_bytes,
+                disk_evictions=self.disk.evictions,
+            )
+        return stats
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
@@ -0,0 +1,192 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from ocr.script_detection import normalize_merchant
+
+# Dates written with digits only, like 14/05/2025, 5-6-24 or 2025.05.14.
+# Both separators must be the same.
+NUMERIC_DATE = re.compile(r'(?<!\d)(\d{1,4})([/.-])(\d{1,2})\2(\d{1,4})(?!\d)')
+
+# Dates with the month written out, like 14 May 2025, 14-May-25 or 14th May, 2025
+DAY_MONTH_YEAR = re.compile(r'(?<!\d)(\d{1,2})(?:st|nd|rd|th)?[\s./-]*([A-Za-z]{3,9})\.?[\s./,-]*(\d{4}|\d{2})(?!\d)')
+# ... and like May 14, 2025
+MONTH_DAY_YEAR = re.compile(r'\b([A-Za-z]{3,9})\.?\s*(\d{1,2})(?:st|nd|rd|th)?,?\s*(\d{4}|\d{2})(?!\d)')
+
+DIGIT = re.compile(r'\d')
+
+MONTHS = {}
+for number, name in enumerate(["january", "february", "march", "april", "may", "june", "july",
+                               "august", "september", "october", "november", "december"], 1):
+    MONTHS[name] = MONTHS[name[:3]] = number
+MONTHS["sept"] = 9
+
+DAYS_IN_MONTH = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+# Field orders numeric dates are read in when no merchant format is known.
+# Year-first dates are only read with a 4-digit year, or a 2-digit one the
+# merchant is known to use.
+DEFAULT_ORDERS = ["YMD", "DMY", "MDY"]
+
+MEMO_SIZE = int(os.environ.get("OCR_DATE_FORMAT_MEMO_SIZE", "5000"))
+
+class ReceiptDate(NamedTuple):
+    date: datetime
+    # strftime-style format the date was written in, such as "%d/%m/%Y"
+    format: str
+    # Whether the digits also read as a different valid date
+    ambiguous: bool = False
+
+def expand_year(year: str) -> int:
+    """
+    Expand a 2-digit year the way strptime's %y does (69-99 are 1900s).
+    """
+    value = int(year)
+    if len(year) == 2:
+        value += 2000 if value < 69 else 1900
+    return value
+
+def is_valid_date(year: int, month: int, day: int) -> bool:
+    if not 1 <= month <= 12 or day < 1 or year < 1:
+        return False
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return day <= 29
+    return day <= DAYS_IN_MONTH[month - 1]
+
+def numeric_format(order: str, separator: str, year_digits: int) -> str:
+    fields = {"D": "%d", "M": "%m", "Y": "%Y" if year_digits == 4 else "%y"}
+    return separator.join(fields[field] for field in order)
+
+def format_order(date_format: str) -> str:
+    """
+    Field order ("DMY", "MDY" or "YMD") and year width of a numeric format,
+    for example "DMY4" for "%d/%m/%Y".
+    """
+    fields = re.findall(r'%([dmyY])', date_format)
+    order = "".join({"d": "D", "m": "M", "y": "Y", "Y": "Y"}[field] for field in fields)
+    return order + ("4" if "Y" in fields else "2")
+
+def read_numeric_date(match, preferred: Optional[str] = None) -> Optional[ReceiptDate]:
+    """
+    Read a NUMERIC_DATE match, using ``preferred`` (a format_order such as
+    "MDY4") to settle dates that read validly in more than one order.
+    """
+    first, separator, second, third = match.groups()
+    readings = []
+    for order in DEFAULT_ORDERS:
+        fields = dict(zip(order, (first, second, third)))
+        year = fields["Y"]
+        if len(year) not in (2, 4) or len(fields["D"]) > 2 or len(fields["M"]) > 2:
+            continue
+        key = order + str(len(year))
+        if key == "YMD2" and preferred != key:
+            continue
+        year_value, month, day = expand_year(year), int(fields["M"]), int(fields["D"])
+        if is_valid_date(year_value, month, day):
+            readings.append((key, datetime(year_value, month, day), numeric_format(order, separator, len(year))))
+    if not readings:
+        return None
+
+    ambiguous = len(set(date for _, date, _ in readings)) > 1
+    if preferred:
+        # The merchant's exact format, else its field order with the other year width
+        for matches in (lambda key: key == preferred, lambda key: key[:3] == preferred[:3]):
+            for key, date, date_format in readings:
+                if matches(key):
+                    return ReceiptDate(date, date_format, ambiguous)
+    _, date, date_format = readings[0]
+    return ReceiptDate(date, date_format, ambiguous)
+
+def read_named_month_date(day: str, month_name: str, year: str, order: str) -> Optional[ReceiptDate]:
+    month = MONTHS.get(month_name.lower())
+    if month is None:
+        return None
+    year_value, day_value = expand_year(year), int(day)
+    if not is_valid_date(year_value, month, day_value):
+        return None
+    fields = {"D": "%d", "M": "%b" if len(month_name) == 3 else "%B", "Y": "%Y" if len(year) == 4 else "%y"}
+    date_format = " ".join(fields[field] for field in order)
+    return ReceiptDate(datetime(year_value, month, day_value), date_format)
+
+def parse_line_date(line: str, preferred: Optional[str] = None) -> Optional[ReceiptDate]:
+    """
+    Parse the first valid date written on a line.
+    """
+    # Every date format has digits
+    if not DIGIT.search(line):
+        return None
+    for match in NUMERIC_DATE.finditer(line):
+        date = read_numeric_date(match, preferred)
+        if date:
+            return date
+    for match in DAY_MONTH_YEAR.finditer(line):
+        date = read_named_month_date(match.group(1), match.group(2), match.group(3), "DMY")
+        if date:
+            return date
+    for match in MONTH_DAY_YEAR.finditer(line):
+        date = read_named_month_date(match.group(2), match.group(1), match.group(3), "MDY")
+        if date:
+            return date
+    return None
+
+class DateFormatMemo:
+    """
+    Bounded LRU memo of the numeric date format each merchant prints, learned
+    from receipts whose dates can only be read one way.
+
+    The memo lives in the memory of the process using it, so each OCR worker
+    process learns on its own and starts empty again when it is recycled.
+    """
+    def __init__(self, max_merchants: int = MEMO_SIZE):
+        self.max_merchants = max_merchants
+        self._formats: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._formats)
+
+    def get(self, merchant: Optional[str]) -> Optional[str]:
+        if not merchant:
+            return None
+        key = normalize_merchant(merchant)
+        with self._lock:
+            date_format = self._formats.get(key)
+            if date_format is not None:
+                self._formats.move_to_end(key)
+            return date_format
+
+    def remember(self, merchant: Optional[str], date: ReceiptDate):
+        """
+        Record the format of a merchant's receipt date, unless it was
+        ambiguous or written with the month's name.
+        """
+        if not merchant or date.ambiguous or "%m" not in date.format:
+            return
+        key = normalize_merchant(merchant)
+        with self._lock:
+            self._formats[key] = date.format
+            self._formats.move_to_end(key)
+            while len(self._formats) > self.max_merchants:
+                self._formats.popitem(last=False)
+
+merchant_date_formats = DateFormatMemo()
+
+def find_receipt_date(lines: List[str], merchant: Optional[str] = None,
+                      memo: Optional[DateFormatMemo] = None, learn: bool = True) -> Optional[ReceiptDate]:
+    """
+    Find the first valid date in a receipt's lines. If a memo is given, the
+    merchant's known format is tried first and, if ``learn`` is set, the
+    format found is learned.
+    """
+    known_format = memo.get(merchant) if memo is not None else None
+    preferred = format_order(known_format) if known_format else None
+    for line in lines:
+        date = parse_line_date(line, preferred)
+        if date:
+            if memo is not None and learn:
+                memo.remember(merchant, date)
+            return date
+    return None
@@ -0,0 +1,87 @@
+import os
+import threading
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+# Longest side of the copy the skew angle is measured on
+DESKEW_MAX_DIMENSION = int(os.environ.get("OCR_DESKEW_MAX_DIMENSION", "800"))
+
+# Largest skew, in degrees, the search considers
+MAX_SKEW_ANGLE = float(os.environ.get("OCR_MAX_SKEW_ANGLE", "10"))
+
+# Search steps in degrees: a coarse sweep, then a fine one around its best angle
+COARSE_STEP = 1.0
+FINE_STEP = 0.1
+
+# Skew below this many degrees is left alone
+MIN_CORRECTION_ANGLE = 0.5
+
+_buffers = threading.local()
+
+def _buffer(name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+    """
+    Get a scratch array reused across calls on this thread.
+    """
+    pool: Dict[str, np.ndarray] = getattr(_buffers, "arrays", None)
+    if pool is None:
+        pool = _buffers.arrays = {}
+    array = pool.get(name)
+    if array is None or array.shape != shape or array.dtype != dtype:
+        array = pool[name] = np.empty(shape, dtype)
+    return array
+
+def _profile_score(ink: np.ndarray, angle: float) -> float:
+    """
+    Score how well text lines align with rows after rotating by ``angle``.
+    Aligned lines give sharp steps in the row sums of ink.
+    """
+    height, width = ink.shape
+    rotated = _buffer("rotated", ink.shape, np.uint8)
+    profile = _buffer("profile", (height, 1), np.float32)
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    cv2.warpAffine(ink, matrix, (width, height), dst=rotated, flags=cv2.INTER_NEAREST,
+                   borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    cv2.reduce(rotated, 1, cv2.REDUCE_SUM, dst=profile, dtype=cv2.CV_32F)
+    steps = np.diff(profile[:, 0])
+    return float(np.dot(steps, steps))
+
+def estimate_skew_angle(binary: np.ndarray) -> float:
+    """
+    Estimate the rotation, in degrees, that makes the text lines of a
+    binarized receipt (dark text on a light background) horizontal.
+
+    The angle is found with a projection-profile search on a copy no larger
+    than DESKEW_MAX_DIMENSION, so memory use does not grow with the photo's
+    resolution, and scratch buffers are reused across calls.
+    """
+    height, width = binary.shape[:2]
+    scale = min(1.0, DESKEW_MAX_DIMENSION / max(height, width))
+    small_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+
+    ink = _buffer("ink", (small_size[1], small_size[0]), np.uint8)
+    cv2.resize(binary, small_size, dst=ink, interpolation=cv2.INTER_AREA)
+    cv2.bitwise_not(ink, dst=ink)
+
+    def best_angle(angles) -> float:
+        return max(angles, key=lambda angle: _profile_score(ink, angle))
+
+    coarse = best_angle(np.arange(-MAX_SKEW_ANGLE, MAX_SKEW_ANGLE + COARSE_STEP / 2, COARSE_STEP))
+    fine = best_angle(np.arange(coarse - COARSE_STEP, coarse + COARSE_STEP + FINE_STEP / 2, FINE_STEP))
+    return round(float(fine), 2)
+
+def deskew(binary: np.ndarray) -> np.ndarray:
+    """
+    Rotate a binarized receipt so its text lines are horizontal. The image is
+    returned unchanged if its skew is negligible.
+    """
+    angle = estimate_skew_angle(binary)
+    if abs(angle) <= MIN_CORRECTION_ANGLE:
+        return binary
+
+    (h, w) = binary.shape[:2]
+    center = (w // 2, h // 2)
+    M = cv2.getRotationMatrix2D(center, angle, 1.0)
+    return cv2.warpAffine(binary, M, (w, h), flags=cv2.INTER_CUBIC,
+                          borderMode=cv2.BORDER_REPLICATE)
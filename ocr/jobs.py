@@ -0,0 +1,265 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from models.models import OCRJob, OCRJobStage, OCRJobStatus, ReceiptData
+from ocr.cache import OCRResultCache, receipt_cache_key, retrieve_exception
+from ocr.receipt_processor import get_ocr_backend, process_receipt_image
+from ocr.worker_pool import OCRWorkerPool, _env_float, _env_int
+
+# Set in each worker process by init_worker
+_progress_queue = None
+
+def init_worker(progress_queue):
+    """
+    Worker process initializer that connects the worker to the progress queue
+    and loads the OCR engine before the first job arrives.
+    """
+    global _progress_queue
+    _progress_queue = progress_queue
+    get_ocr_backend()
+
+def run_receipt_job(job_id: str, image_bytes: bytes):
+    """
+    Process a receipt in a worker process, publishing each finished stage.
+
+    Returns the receipt data together with the stage timings, so stages whose
+    progress messages are still in flight can be filled in by the caller.
+    """
+    timings: List[Tuple[str, float]] = []
+
+    def report(stage: str, elapsed: float):
+        timings.append((stage, elapsed))
+        if _progress_queue is not None:
+            _progress_queue.put((job_id, stage, elapsed))
+
+    receipt_data = process_receipt_image(image_bytes, progress=report)
+    return receipt_data, timings
+
+def format_sse(event: str, data: dict) -> str:
+    """
+    Format a server-sent event.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class JobStore:
+    """
+    Bounded in-memory store of OCR jobs.
+
+    Jobs expire ``ttl`` seconds after they finish (or after they were created
+    if they never do). When the store is full, the oldest finished job is
+    evicted first, then the oldest job of any kind.
+    """
+    def __init__(self, max_jobs: Optional[int] = None, ttl: Optional[float] = None):
+        self.max_jobs = max_jobs or _env_int("OCR_JOB_STORE_SIZE", 1000)
+        self.ttl = ttl or _env_float("OCR_JOB_TTL", 900.0)
+        self._jobs: "OrderedDict[str, OCRJob]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def add(self, job: OCRJob):
+        self._evict_expired()
+        while len(self._jobs) >= self.max_jobs:
+            self._evict_one()
+        self._jobs[job.job_id] = job
+        self._expires[job.job_id] = time.monotonic() + self.ttl
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        self._evict_expired()
+        return self._jobs.get(job_id)
+
+    def mark_finished(self, job_id: str):
+        """
+        Restart the job's TTL now that its result is available.
+        """
+        if job_id in self._jobs:
+            self._expires[job_id] = time.monotonic() + self.ttl
+
+    def _remove(self, job_id: str):
+        del self._jobs[job_id]
+        del self._expires[job_id]
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, expires in self._expires.items() if expires <= now]:
+            self._remove(job_id)
+
+    def _evict_one(self):
+        for job_id, job in self._jobs.items():
+            if job.status in (OCRJobStatus.COMPLETED, OCRJobStatus.FAILED):
+                self._remove(job_id)
+                return
+        self._remove(next(iter(self._jobs)))
+
+class OCRJobManager:
+    """
+    Runs receipts as background jobs on the OCR worker pool and tracks their
+    progress so clients can poll for results or stream stage events.
+
+    The pool must be created with ``initializer=init_worker`` and the same
+    progress queue that is passed here. Results are looked up in and added
+    to ``cache`` if one is given.
+    """
+    def __init__(self, pool: OCRWorkerPool, progress_queue, store: Optional[JobStore] = None,
+                 cache: Optional[OCRResultCache] = None):
+        self.pool = pool
+        self.store = store or JobStore()
+        self.cache = cache
+        self._progress_queue = progress_queue
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[threading.Thread] = None
+        self._changed: Dict[str, asyncio.Event] = {}
+
+    def start(self):
+        """
+        Start relaying progress messages from the workers. Must be called from the event loop.
+        """
+        if self._listener is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._listener = threading.Thread(target=self._listen, name="ocr-job-progress", daemon=True)
+        self._listener.start()
+
+    def stop(self):
+        if self._listener is not None:
+            self._progress_queue.put(None)
+            self._listener.join(timeout=5)
+            self._listener = None
+
+    def _listen(self):
+        while True:
+            message = self._progress_queue.get()
+            if message is None:
+                return
+            self._loop.call_soon_threadsafe(self._on_progress, *message)
+
+    def submit(self, image_bytes: bytes) -> OCRJob:
+        """
+        Queue a receipt for processing and return its job right away.
+
+        Raises the pool's backpressure errors if the job cannot be queued.
+        """
+        job_id = uuid.uuid4().hex
+        if self.cache is None:
+            task = self.pool.submit(run_receipt_job, job_id, image_bytes)
+        else:
+            task = self._submit_cached(job_id, image_bytes)
+
+        job = OCRJob(job_id=job_id, status=OCRJobStatus.QUEUED, created_at=datetime.now())
+        self.store.add(job)
+        self._changed[job_id] = asyncio.Event()
+        task.add_done_callback(lambda finished: self._on_finished(job_id, finished))
+        return job
+
+    def _submit_cached(self, job_id: str, image_bytes: bytes) -> "asyncio.Future":
+        """
+        Run a job through the result cache. Unless the cache already holds or
+        is computing the image's result, the job is queued on the pool right
+        away, so submit still raises the pool's backpressure errors; the
+        queued job is cancelled if the on-disk cache answers instead.
+        """
+        key = receipt_cache_key(image_bytes)
+        queued = None if key in self.cache else self.pool.submit(run_receipt_job, job_id, image_bytes)
+        if queued is not None:
+            queued.add_done_callback(retrieve_exception)
+        timings: List[Tuple[str, float]] = []
+
+        async def compute() -> ReceiptData:
+            # Only called when the cache had no result for the key, so the job was queued
+            receipt_data, job_timings = await queued
+            timings.extend(job_timings)
+            return receipt_data
+
+        result = self.cache.start(key, compute)
+
+        async def run():
+            try:
+                receipt_data = await asyncio.shield(result)
+            finally:
+                if queued is not None:
+                    queued.cancel()
+            return receipt_data.copy(deep=True), timings
+
+        return asyncio.ensure_future(run())
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        return self.store.get(job_id)
+
+    def _notify(self, job_id: str):
+        event = self._changed.get(job_id)
+        if event is not None:
+            event.set()
+            self._changed[job_id] = asyncio.Event()
+
+    def _add_stage(self, job: OCRJob, stage: str, elapsed: float):
+        if all(existing.name != stage for existing in job.stages):
+            job.stages.append(OCRJobStage(name=stage, elapsed_ms=elapsed * 1000))
+
+    def _on_progress(self, job_id: str, stage: str, elapsed: float):
+        job = self.store.get(job_id)
+        if job is None or job.status in (OCRJobStatus.COMPLETED, OCRJobStatus.FAILED):
+            return
+        job.status = OCRJobStatus.RUNNING
+        self._add_stage(job, stage, elapsed)
+        self._notify(job_id)
+
+    def _on_finished(self, job_id: str, task: asyncio.Task):
+        job = self.store.get(job_id)
+        if task.cancelled():
+            error = "Job was cancelled"
+        else:
+            error = task.exception()
+
+        if job is not None:
+            if error is not None:
+                job.status = OCRJobStatus.FAILED
+                job.error = str(error) or type(error).__name__
+            else:
+                receipt_data, timings = task.result()
+                for stage, elapsed in timings:
+                    self._add_stage(job, stage, elapsed)
+                job.result = receipt_data
+                job.status = OCRJobStatus.COMPLETED
+            job.finished_at = datetime.now()
+            self.store.mark_finished(job_id)
+
+        self._notify(job_id)
+        self._changed.pop(job_id, None)
+
+    async def events(self, job_id: str, keepalive: float = 15.0) -> AsyncIterator[str]:
+        """
+        Stream a job's progress as server-sent events, ending once it finishes.
+        """
+        sent = 0
+        while True:
+            changed = self._changed.get(job_id)
+            job = self.store.get(job_id)
+            if job is None:
+                yield format_sse("error", {"job_id": job_id, "error": "Job not found"})
+                return
+
+            for stage in job.stages[sent:]:
+                yield format_sse("progress", {"job_id": job_id, **stage.dict()})
+            sent = len(job.stages)
+
+            if job.status == OCRJobStatus.COMPLETED:
+                yield format_sse("completed", {"job_id": job_id, "result": job.result.dict()})
+                return
+            if job.status == OCRJobStatus.FAILED:
+                yield format_sse("failed", {"job_id": job_id, "error": job.error})
+                return
+
+            if changed is None:
+                await asyncio.sleep(0.1)
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
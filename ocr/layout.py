@@ -0,0 +1,219 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from models.models import ReceiptItem
+from ocr.strips import count_overlap_lines
+from ocr.text_parser import NON_ITEM_WORDS, SummaryAmounts
+
+# Geometry and confidence of each recognized word. Lines are numbered in
+# reading order across the whole receipt.
+WORD_DTYPE = np.dtype([
+    ("line", np.int32),
+    ("left", np.int32),
+    ("top", np.int32),
+    ("right", np.int32),
+    ("bottom", np.int32),
+    ("conf", np.float32),
+])
+
+# A word that is a whole money amount, like 45.00, Rs.1,250 or ₹90/-
+PRICE_WORD = re.compile(r'^(?:Rs\.?|₹)?(\d[\d,]*(?:\.\d{1,2})?)(?:/-)?$', re.IGNORECASE)
+
+# Quantities before a price: "2 x", "2x", "x2", "2 @" or a bare "2"
+QUANTITY_WORD = re.compile(r'^(\d+(?:\.\d+)?)$')
+QUANTITY_MARKED = re.compile(r'^(?:(\d+(?:\.\d+)?)[x@*]|[x@*](\d+(?:\.\d+)?))$', re.IGNORECASE)
+BARE_QUANTITY = re.compile(r'^(\d{1,2})$')
+TIMES = {"x", "X", "@", "*"}
+
+# Currency words OCR'd separately from the amount they belong to
+CURRENCY_WORDS = {"rs", "rs.", "₹", "inr"}
+
+# Largest bare number in front of a price that is read as a quantity
+MAX_BARE_QUANTITY = 99
+
+# Fewest lines with a price at the same right edge that make a price column
+MIN_COLUMN_LINES = 2
+
+class WordBoxes:
+    """
+    Words from Tesseract's TSV output in reading order: a WORD_DTYPE array
+    of boxes and confidences, and the words' text in a parallel list.
+    """
+    __slots__ = ("boxes", "words")
+
+    def __init__(self, boxes: np.ndarray, words: List[str]):
+        self.boxes = boxes
+        self.words = words
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    @classmethod
+    def from_tsv(cls, tsv: str, top_offset: int = 0) -> "WordBoxes":
+        """
+        Read the word rows of Tesseract TSV output, shifting boxes down by
+        ``top_offset`` pixels (for text recognized in a strip of the image).
+        """
+        rows = []
+        words = []
+        line_ids = {}
+        for row in tsv.splitlines():
+            fields = row.split("\t")
+            # level, page, block, paragraph, line, word, left, top, width, height, conf, text
+            if len(fields) < 12 or fields[0] != "5" or not fields[11].strip():
+                continue
+            line = line_ids.setdefault(tuple(fields[1:5]), len(line_ids))
+            left, top, width, height = int(fields[6]), int(fields[7]) + top_offset, int(fields[8]), int(fields[9])
+            rows.append((line, left, top, left + width, top + height, float(fields[10])))
+            words.append(fields[11])
+        return cls(np.array(rows, dtype=WORD_DTYPE), words)
+
+    @classmethod
+    def concatenate(cls, parts: List["WordBoxes"]) -> "WordBoxes":
+        """
+        Join the words of consecutive strips, dropping the lines at the start
+        of each strip that repeat the end of the previous one.
+        """
+        if len(parts) == 1:
+            return parts[0]
+        boxes = []
+        words: List[str] = []
+        lines: List[str] = []
+        next_line = 0
+        for part in parts:
+            bounds = part.line_bounds()
+            part_lines = [" ".join(part.words[start:end]) for start, end in bounds]
+            duplicated = count_overlap_lines(lines, part_lines)
+            lines.extend(part_lines[duplicated:])
+            if duplicated == len(bounds):
+                continue
+            first = bounds[duplicated][0]
+            part_boxes = part.boxes[first:].copy()
+            part_boxes["line"] += next_line - part_boxes["line"][0]
+            next_line = int(part_boxes["line"][-1]) + 1
+            boxes.append(part_boxes)
+            words.extend(part.words[first:])
+        return cls(np.concatenate(boxes) if boxes else np.empty(0, WORD_DTYPE), words)
+
+    def line_bounds(self) -> List[Tuple[int, int]]:
+        """
+        (start, end) word indexes of each line.
+        """
+        if not len(self.words):
+            return []
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(self.boxes["line"])) + 1))
+        ends = np.append(starts[1:], len(self.words))
+        return list(zip(starts.tolist(), ends.tolist()))
+
+    def text(self) -> str:
+        """
+        The recognized text, one line per OCR text line.
+        """
+        return "\n".join(" ".join(self.words[start:end]) for start, end in self.line_bounds())
+
+    def mean_confidence(self) -> float:
+        return float(self.boxes["conf"].mean()) if len(self.words) else 0.0
+
+def parse_price(word: str) -> Optional[float]:
+    match = PRICE_WORD.match(word)
+    return float(match.group(1).replace(',', '')) if match else None
+
+def find_price_column(words: WordBoxes) -> Optional[Tuple[int, int]]:
+    """
+    Find the range of right edges of the receipt's price column: the largest
+    group of lines ending in an amount whose right edges line up.
+    """
+    bounds = words.line_bounds()
+    last = np.array([end - 1 for start, end in bounds if parse_price(words.words[end - 1]) is not None], np.int64)
+    if len(last) < MIN_COLUMN_LINES:
+        return None
+
+    rights = np.sort(words.boxes["right"][last])
+    heights = words.boxes["bottom"][last] - words.boxes["top"][last]
+    tolerance = max(2, int(np.median(heights)))
+
+    # Split the sorted right edges wherever neighbours are further apart than
+    # a text height, and keep the largest group
+    splits = np.flatnonzero(np.diff(rights) > tolerance) + 1
+    groups = np.split(rights, splits)
+    best = max(groups, key=len)
+    if len(best) < MIN_COLUMN_LINES:
+        return None
+    return int(best[0]) - tolerance, int(best[-1]) + tolerance
+
+def _trailing_quantity(words: List[str]) -> Optional[Tuple[int, float]]:
+    """
+    Find a quantity at the end of an item's words, returned as the number
+    of words it takes up and its value. At least one word is left for the name.
+    """
+    if len(words) >= 3 and words[-1] in TIMES:
+        match = QUANTITY_WORD.match(words[-2])
+        if match:
+            return 2, float(match.group(1))
+    if len(words) >= 2:
+        match = QUANTITY_MARKED.match(words[-1])
+        if match:
+            return 1, float(match.group(1) or match.group(2))
+        match = BARE_QUANTITY.match(words[-1])
+        if match and 0 < int(match.group(1)) <= MAX_BARE_QUANTITY:
+            return 1, float(match.group(1))
+    return None
+
+def split_quantity(name_words: List[str]) -> Tuple[List[str], float]:
+    """
+    Take the quantity, and the unit price that may follow it, off the end of
+    the words before an item's price: "Milk 2 x 45.00", "Milk 2x", "Milk x2"
+    and "Milk 2" all have a quantity of 2.
+    """
+    words = list(name_words)
+    if words and words[-1].lower() in CURRENCY_WORDS:
+        words.pop()
+    if len(words) >= 2 and parse_price(words[-1]) is not None and _trailing_quantity(words[:-1]):
+        words.pop()
+    quantity = _trailing_quantity(words)
+    if quantity is None:
+        return words, 1.0
+    count, value = quantity
+    words = words[:-count]
+    # "Tea @ 2"
+    if len(words) >= 2 and words[-1] in TIMES:
+        words.pop()
+    return words, value
+
+class LayoutItems(NamedTuple):
+    items: List[ReceiptItem]
+    subtotal: Optional[float]
+    tax: Optional[float]
+
+def extract_layout_items(words: WordBoxes) -> Optional[LayoutItems]:
+    """
+    Read items, quantities, subtotal and tax from the word boxes in one pass
+    over the lines, taking prices only from the price column. Returns None
+    if the receipt has no recognizable price column.
+    """
+    column = find_price_column(words)
+    if column is None:
+        return None
+    low, high = column
+
+    items: List[ReceiptItem] = []
+    summary = SummaryAmounts()
+    rights = words.boxes["right"]
+    for start, end in words.line_bounds():
+        if not low <= rights[end - 1] <= high:
+            continue
+        price = parse_price(words.words[end - 1])
+        if price is None:
+            continue
+        line = " ".join(words.words[start:end])
+        if NON_ITEM_WORDS.search(line.lower()):
+            summary.add(line, price)
+            continue
+
+        name_words, quantity = split_quantity(words.words[start:end - 1])
+        name = " ".join(name_words).strip()
+        if price > 0 and len(name) > 1 and any(char.isalpha() for char in name):
+            items.append(ReceiptItem.construct(name=name, price=price, quantity=quantity))
+    return LayoutItems(items, summary.subtotal, summary.tax)
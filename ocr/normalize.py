@@ -0,0 +1,98 @@
+import io
+import os
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Resolution Tesseract works best at
+TARGET_DPI = float(os.environ.get("OCR_TARGET_DPI", "300"))
+
+# Physical width of a receipt; 80 mm thermal paper is the most common
+RECEIPT_WIDTH_INCHES = float(os.environ.get("OCR_RECEIPT_WIDTH_INCHES", "3.15"))
+
+# Smallest share of the photo's width a receipt is assumed to cover when
+# choosing how much to reduce the image while decoding it
+MIN_RECEIPT_FILL = float(os.environ.get("OCR_MIN_RECEIPT_FILL", "0.5"))
+
+# Reduced decode modes, largest reduction first. For JPEGs OpenCV scales
+# during the DCT, so the full-resolution image is never materialized.
+REDUCED_GRAYSCALE_MODES = [
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+]
+
+# Width of the copy used to find the receipt's outline
+CONTOUR_DETECTION_WIDTH = 400
+
+def target_width(target_dpi: float = TARGET_DPI) -> int:
+    """
+    Width in pixels of a receipt scanned at ``target_dpi``.
+    """
+    return int(target_dpi * RECEIPT_WIDTH_INCHES)
+
+def image_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read an image's (width, height) from its header without decoding it.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            return image.size
+    except Exception:
+        return None
+
+def decode_grayscale(image_bytes: bytes, min_width: int) -> Optional[np.ndarray]:
+    """
+    Decode an image to grayscale at the largest reduction that keeps a
+    receipt covering MIN_RECEIPT_FILL of the photo at least ``min_width``
+    pixels wide. Returns None if the image cannot be decoded.
+    """
+    buffer = np.frombuffer(image_bytes, np.uint8)
+    size = image_size(image_bytes) if min_width > 0 else None
+    if size is not None:
+        receipt_width = size[0] * MIN_RECEIPT_FILL
+        for factor, mode in REDUCED_GRAYSCALE_MODES:
+            if receipt_width / factor >= min_width:
+                return cv2.imdecode(buffer, mode)
+    return cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+
+def crop_to_receipt(gray: np.ndarray) -> np.ndarray:
+    """
+    Crop a photo to the bounding box of the receipt, found as the largest
+    bright region on a small copy. Returns the image unchanged if no
+    plausible receipt outline is found. The crop is a view, not a copy.
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, CONTOUR_DETECTION_WIDTH / width)
+    small = cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                       interpolation=cv2.INTER_AREA)
+    _, mask = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Close the gaps the printed text leaves in the paper
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((9, 9), np.uint8), dst=mask)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return gray
+
+    x, y, w, h = cv2.boundingRect(max(contours, key=cv2.contourArea))
+    area = (w * h) / (small.shape[0] * small.shape[1])
+    # Too small to be the receipt, or the receipt already fills the photo
+    if area < 0.2 or area > 0.95:
+        return gray
+
+    margin = 2
+    x0, y0 = max(0, int((x - margin) / scale)), max(0, int((y - margin) / scale))
+    x1, y1 = min(width, int((x + w + margin) / scale)), min(height, int((y + h + margin) / scale))
+    return gray[y0:y1, x0:x1]
+
+def normalize_resolution(gray: np.ndarray, width: int) -> np.ndarray:
+    """
+    Shrink a receipt that is much wider than ``width`` pixels to that width.
+    Narrower receipts are left as they are.
+    """
+    current_height, current_width = gray.shape[:2]
+    if width <= 0 or current_width <= width * 1.25:
+        return gray
+    scale = width / current_width
+    return cv2.resize(gray, (width, max(1, int(current_height * scale))), interpolation=cv2.INTER_AREA)
@@ -2,202 +2,453 @@ import cv2
 import numpy as np
 import pytesseract
 from PIL import Image
-import io
-import re
+import os
+import threading
+import time
 from datetime import datetime
-import json
-from models.models import ReceiptData, ReceiptItem
-from categorization.categorizer import categorize_transaction
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+from models.models import ReceiptData
+from categorization.categorizer import canonical_merchant, categorize_transaction
+from ocr.deskew import deskew
+from ocr.normalize import TARGET_DPI, crop_to_receipt, decode_grayscale, normalize_resolution, target_width
+from ocr.script_detection import merchant_languages, scripts_for_languages, select_languages
+from ocr.layout import WordBoxes, extract_layout_items
+from ocr.strips import STRIP_THREADS, ocr_strips, stitch_text, strips_for
+from ocr.dates import find_receipt_date as read_receipt_date, merchant_date_formats
+from ocr.templates import MIN_MATCH_SCORE, get_template_registry, header_band
+from ocr.text_parser import (
+    SUBTOTAL_LINE,
+    TAX_LINE,
+    SummaryAmounts,
+    find_receipt_type,
+    last_amount,
+    parse_line_total,
+    scan_receipt_text,
+)
+
+try:
+    import tesserocr
+except ImportError:  # Optional: without it OCR falls back to the pytesseract subprocess
+    tesserocr = None
 
 # Configure Tesseract path if needed
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # Windows
 # For Linux/Mac, ensure Tesseract is installed and in PATH
 
-def preprocess_image(image_bytes):
+# Bump whenever a change to the pipeline changes its output, so cached
+# OCR results from the previous version are not reused
+PIPELINE_VERSION = "10"
+
+# Called with (stage, elapsed_seconds) each time a pipeline stage finishes
+ProgressCallback = Callable[[str, float], None]
+
+def _stage_done(progress: Optional[ProgressCallback], stage: str, started: float) -> float:
+    """
+    Report a finished stage and return the start time for the next one.
+    """
+    now = time.perf_counter()
+    if progress is not None:
+        progress(stage, now - started)
+    return now
+
+def preprocess_image(image_bytes, progress: Optional[ProgressCallback] = None, target_dpi: Optional[float] = None):
     """
     Preprocess the image to improve OCR accuracy.
+    
+    Large photos are decoded at reduced size, cropped to the receipt and scaled
+    down to target_dpi (OCR_TARGET_DPI by default; 0 keeps full resolution).
     """
-    # Convert bytes to numpy array
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    started = time.perf_counter()
+    width = target_width(TARGET_DPI if target_dpi is None else target_dpi)
     
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Decode straight to grayscale, reduced while decoding when the photo is large
+    gray = decode_grayscale(image_bytes, width)
+    if gray is None:
+        raise ValueError("Could not decode image")
+    started = _stage_done(progress, "decode", started)
     
-    # Apply adaptive thresholding
+    # Crop to the receipt and bring it to the target resolution
+    if width > 0:
+        gray = normalize_resolution(crop_to_receipt(gray), width)
+    started = _stage_done(progress, "normalize", started)
+    
+    # Apply adaptive thresholding in place, reusing the grayscale buffer
     thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                  cv2.THRESH_BINARY, 11, 2)
+                                  cv2.THRESH_BINARY, 11, 2, dst=gray)
     
     # Noise removal
     kernel = np.ones((1, 1), np.uint8)
-    opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, iterations=1)
-    
-    # Deskew image if needed
-    coords = np.column_stack(np.where(opening > 0))
-    angle = cv2.minAreaRect(coords)[-1]
-    if angle < -45:
-        angle = -(90 + angle)
-    else:
-        angle = -angle
-    
-    # Rotate the image to deskew it if angle is significant
-    if abs(angle) > 0.5:
-        (h, w) = opening.shape[:2]
-        center = (w // 2, h // 2)
-        M = cv2.getRotationMatrix2D(center, angle, 1.0)
-        opening = cv2.warpAffine(opening, M, (w, h), flags=cv2.INTER_CUBIC, 
-                                borderMode=cv2.BORDER_REPLICATE)
+    opening = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel, dst=thresh, iterations=1)
+    started = _stage_done(progress, "threshold", started)
+    
+    # Deskew image if needed, measuring the skew on a bounded downscaled copy
+    opening = deskew(opening)
+    _stage_done(progress, "deskew", started)
     
     return opening
 
-def extract_text(preprocessed_image):
+# Languages supported on receipts: English and the major Indian scripts
+OCR_LANGUAGES = "eng+hin+mar+tam+tel+kan+ben+guj"
+
+# PSM 4: Assume a single column of text of variable sizes
+# OEM 3: Default OCR engine mode (LSTM only)
+OCR_PSM = 4
+OCR_OEM = 3
+
+# Cascaded OCR: a cheap first pass with English-only fast LSTM models
+# (OEM 1) on a downscaled image, escalating to the full configuration when
+# word confidence is low or the total or date cannot be found
+OCR_CASCADE = os.environ.get("OCR_CASCADE", "1") != "0"
+FAST_TIER_LANGUAGES = "eng"
+FAST_TIER_OEM = 1
+FAST_TIER_SCALE = float(os.environ.get("OCR_FAST_SCALE", "0.6"))
+FAST_TIER_MIN_CONFIDENCE = float(os.environ.get("OCR_FAST_MIN_CONFIDENCE", "75"))
+# Directory of tessdata_fast models; the default models are used if unset
+FAST_TESSDATA_DIR = os.environ.get("OCR_FAST_TESSDATA_DIR")
+
+# Most Tesseract engines a process keeps loaded, shared by all its threads.
+# Each engine holds its own copy of its language models.
+OCR_MAX_ENGINES = int(os.environ.get("OCR_MAX_ENGINES", "0")) or max(4, STRIP_THREADS)
+
+class OCRBackend:
     """
-    Extract text from the preprocessed image using Tesseract OCR.
+    Interface for the engines extract_text can run Tesseract through.
     """
-    # Convert numpy array to PIL Image
-    pil_img = Image.fromarray(preprocessed_image)
+    name = "base"
     
-    # Use Tesseract to extract text with improved configuration
-    # PSM 4: Assume a single column of text of variable sizes
-    # OEM 3: Default OCR engine mode (LSTM only)
-    text = pytesseract.image_to_string(
-        pil_img, 
-        config='--psm 4 --oem 3 -l eng+hin+mar+tam+tel+kan+ben+guj'
-    )
+    def image_to_string(self, image: np.ndarray, languages: str = OCR_LANGUAGES) -> str:
+        raise NotImplementedError
+    
+    def image_to_tsv(self, image: np.ndarray, languages: str = OCR_LANGUAGES, oem: int = OCR_OEM,
+                     tessdata_dir: Optional[str] = None) -> str:
+        """
+        Recognize the image and return Tesseract's TSV output, which has a
+        row with the position and confidence of every word.
+        """
+        raise NotImplementedError
     
-    return text
+    def detect_script(self, image: np.ndarray) -> Tuple[Optional[str], float]:
+        """
+        Detect the dominant script with Tesseract's orientation and script
+        detection. Returns the script name and confidence, or (None, 0.0).
+        """
+        return None, 0.0
 
-def parse_receipt_text(text):
+class PytesseractBackend(OCRBackend):
     """
-    Parse the extracted text to identify merchant, date, total, receipt type, and items.
-    Enhanced for Indian receipts and currency.
+    Runs the tesseract binary through pytesseract. Every call writes the image
+    to a temporary file, starts a new process and loads the language models.
     """
-    lines = text.split('\n')
-    lines = [line.strip() for line in lines if line.strip()]
+    name = "pytesseract"
     
-    # Initialize receipt data
-    merchant = ""
-    date = None
-    total = 0.0
-    receipt_type = "General"
-    items = []
+    def image_to_string(self, image: np.ndarray, languages: str = OCR_LANGUAGES) -> str:
+        return pytesseract.image_to_string(
+            Image.fromarray(image),
+            config=f"--psm {OCR_PSM} --oem {OCR_OEM} -l {languages}"
+        )
     
-    # Try to identify merchant (usually first few lines)
-    if lines:
-        merchant = lines[0]
-        
-        # If first line looks like a header, try the second line
-        if len(merchant) < 3 or any(word in merchant.lower() for word in ['receipt', 'invoice', 'bill', 'cash memo']):
-            if len(lines) > 1:
-                merchant = lines[1]
-    
-    # Look for date with Indian formats
-    date_patterns = [
-        r'(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',  # DD/MM/YYYY or MM/DD/YYYY
-        r'(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',  # DD Mon YYYY
-        r'Date\s*:?\s*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',  # Date: DD/MM/YYYY
-        r'Date\s*:?\s*(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',  # Date: DD Mon YYYY
-    ]
-    
-    for line in lines:
-        for pattern in date_patterns:
-            date_match = re.search(pattern, line, re.IGNORECASE)
-            if date_match:
-                date_str = date_match.group(1)
-                try:
-                    # Try different date formats (Indian format is typically DD/MM/YYYY)
-                    for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y', '%d.%m.%y', 
-                               '%d %b %Y', '%d %B %Y']:
-                        try:
-                            date = datetime.strptime(date_str, fmt)
-                            break
-                        except ValueError:
-                            continue
-                except:
-                    # If parsing fails, use current date
-                    date = datetime.now()
-                break
-        if date:
-            break
-    
-    # If no date found, use current date
-    if not date:
-        date = datetime.now()
-    
-    # Identify receipt type
-    receipt_type_keywords = {
-        "Food": ["restaurant", "cafe", "food", "dining", "meal", "lunch", "dinner", "breakfast"],
-        "Grocery": ["grocery", "supermarket", "mart", "store", "kirana", "provision"],
-        "Medical": ["pharmacy", "medical", "medicine", "hospital", "clinic", "doctor", "healthcare"],
-        "Utility": ["electricity", "water", "gas", "utility", "bill", "broadband", "internet", "phone"],
-        "Transportation": ["travel", "transport", "fuel", "petrol", "diesel", "gas", "taxi", "uber", "ola"],
-        "Entertainment": ["movie", "cinema", "theatre", "entertainment", "game", "play"],
-        "Shopping": ["mall", "shop", "store", "retail", "clothing", "apparel", "electronics"],
-        "Education": ["school", "college", "university", "tuition", "course", "class", "education"],
-        "Investment": ["investment", "mutual fund", "stock", "share", "bond", "deposit", "fd", "rd"]
-    }
-    
-    text_lower = text.lower()
-    for type_name, keywords in receipt_type_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            receipt_type = type_name
-            break
-    
-    # Look for total amount with Indian Rupee symbols and formats
-    total_patterns = [
-        r'total\s*(?:amount)?(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
-        r'(?:grand|net|final)\s+total\s*(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
-        r'amount\s*(?:payable|paid|due)(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
-        r'(?:Rs\.?|₹)\s*(\d+(?:[.,]\d+)?)\s*(?:only|/-)?',
-        r'(?:total|amount|sum)(?:\s|$).*?(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
-    ]
-    
-    for line in lines:
-        for pattern in total_patterns:
-            total_match = re.search(pattern, line, re.IGNORECASE)
-            if total_match:
-                try:
-                    # Handle Indian number format (e.g., 1,00,000.00)
-                    amount_str = total_match.group(1).replace(',', '')
-                    total = float(amount_str)
+    def image_to_tsv(self, image: np.ndarray, languages: str = OCR_LANGUAGES, oem: int = OCR_OEM,
+                     tessdata_dir: Optional[str] = None) -> str:
+        config = f"--psm {OCR_PSM} --oem {oem} -l {languages}"
+        if tessdata_dir:
+            config += f' --tessdata-dir "{tessdata_dir}"'
+        return pytesseract.image_to_data(Image.fromarray(image), config=config)
+    
+    def detect_script(self, image: np.ndarray) -> Tuple[Optional[str], float]:
+        try:
+            osd = pytesseract.image_to_osd(
+                Image.fromarray(image),
+                config="--psm 0",
+                output_type=pytesseract.Output.DICT
+            )
+        except pytesseract.TesseractError:
+            # Raised when there is too little text to detect a script
+            return None, 0.0
+        return osd.get("script"), float(osd.get("script_conf", 0.0))
+
+class EnginePool:
+    """
+    Tesseract engines shared by the threads of a process, at most
+    ``max_engines`` of them in all. A thread checks an engine out for one
+    call, since engines are not thread-safe, and returns it for reuse by
+    any thread. When the pool is full, the least recently used idle engine
+    is ended to make room, and if every engine is in use the thread waits
+    for one to be returned.
+    """
+    def __init__(self, create: Callable, max_engines: int = OCR_MAX_ENGINES):
+        self.create = create
+        self.max_engines = max_engines
+        self._condition = threading.Condition()
+        # Idle engines with their keys, least recently used first
+        self._idle: List[Tuple[tuple, object]] = []
+        self._count = 0
+
+        # Counters exposed through stats()
+        self.created = 0
+        self.evictions = 0
+        self.waits = 0
+
+    def _checkout(self, key: tuple):
+        with self._condition:
+            while True:
+                for position in range(len(self._idle) - 1, -1, -1):
+                    if self._idle[position][0] == key:
+                        return self._idle.pop(position)[1]
+                if self._count < self.max_engines:
+                    break
+                if self._idle:
+                    _, evicted = self._idle.pop(0)
+                    evicted.End()
+                    self._count -= 1
+                    self.evictions += 1
                     break
-                except:
-                    continue
-        if total > 0:
-            break
-    
-    # Extract items with Indian Rupee format
-    # This pattern looks for item descriptions followed by quantities and prices
-    item_patterns = [
-        r'([A-Za-z0-9\s\&\-]+)\s+(?:\d+(?:\.\d+)?)?\s*(?:x\s*)?(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
-        r'([A-Za-z0-9\s\&\-]+)\s+(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
-    ]
-    
-    for line in lines:
-        # Skip lines that are likely headers or totals
-        if any(word in line.lower() for word in ['total', 'subtotal', 'tax', 'amount', 'change', 'cash', 'credit', 'card', 'gst', 'cgst', 'sgst']):
-            continue
+                self.waits += 1
+                self._condition.wait()
+            # Reserve the slot, and load the models without holding the lock
+            self._count += 1
+        try:
+            engine = self.create(*key)
+        except BaseException:
+            with self._condition:
+                self._count -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.created += 1
+        return engine
+
+    @contextmanager
+    def engine(self, *key) -> Iterator:
+        """
+        Check out an engine for ``key``, the arguments ``create`` makes one from.
+        """
+        engine = self._checkout(key)
+        try:
+            yield engine
+        finally:
+            with self._condition:
+                self._idle.append((key, engine))
+                self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "engines": self._count,
+                "idle_engines": len(self._idle),
+                "max_engines": self.max_engines,
+                "created": self.created,
+                "evictions": self.evictions,
+                "waits": self.waits,
+            }
+
+class TesserocrBackend(OCRBackend):
+    """
+    Keeps Tesseract engines resident in the process through the tesserocr
+    bindings to the C API, so language models are loaded once per language
+    set rather than once per receipt. Engines are not thread-safe, so each
+    call checks one out of a pool shared by the process's threads, which
+    bounds how many copies of the models the process loads.
+    """
+    name = "tesserocr"
+    
+    def __init__(self, languages: str = OCR_LANGUAGES, tessdata_dir: Optional[str] = None,
+                 max_engines: int = OCR_MAX_ENGINES):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.tessdata_dir = tessdata_dir or os.environ.get("OCR_TESSDATA_DIR")
+        self.engines = EnginePool(self._create_engine, max_engines)
         
-        for pattern in item_patterns:
-            item_match = re.search(pattern, line)
-            if item_match:
-                item_name = item_match.group(1).strip()
+        # Load the default models now so a missing language fails at startup
+        with self._engine(languages):
+            pass
+    
+    def _create_engine(self, languages: str, psm: int, oem: int, tessdata_dir: Optional[str]):
+        kwargs = {"lang": languages, "psm": psm, "oem": oem}
+        if tessdata_dir:
+            kwargs["path"] = os.path.join(tessdata_dir, "")
+        return tesserocr.PyTessBaseAPI(**kwargs)
+    
+    def _engine(self, languages: str, psm: int = OCR_PSM, oem: int = OCR_OEM, tessdata_dir: Optional[str] = None):
+        return self.engines.engine(languages, psm, oem, tessdata_dir or self.tessdata_dir)
+    
+    def _set_image(self, engine, image: np.ndarray):
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        engine.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+    
+    def image_to_string(self, image: np.ndarray, languages: str = OCR_LANGUAGES) -> str:
+        with self._engine(languages) as engine:
+            self._set_image(engine, image)
+            try:
+                return engine.GetUTF8Text()
+            finally:
+                engine.Clear()
+    
+    def image_to_tsv(self, image: np.ndarray, languages: str = OCR_LANGUAGES, oem: int = OCR_OEM,
+                     tessdata_dir: Optional[str] = None) -> str:
+        with self._engine(languages, OCR_PSM, oem, tessdata_dir) as engine:
+            self._set_image(engine, image)
+            try:
+                return engine.GetTSVText(0)
+            finally:
+                engine.Clear()
+    
+    def detect_script(self, image: np.ndarray) -> Tuple[Optional[str], float]:
+        try:
+            with self._engine("osd", tesserocr.PSM.OSD_ONLY) as engine:
+                self._set_image(engine, image)
                 try:
-                    item_price = float(item_match.group(2).replace(',', ''))
-                    if item_price > 0 and len(item_name) > 1:
-                        items.append(ReceiptItem(name=item_name, price=item_price))
-                except:
-                    continue
+                    osd = engine.DetectOrientationScript()
+                finally:
+                    engine.Clear()
+        except RuntimeError:
+            # osd.traineddata is not installed
+            return None, 0.0
+        if not osd:
+            return None, 0.0
+        return osd["script_name"], float(osd["script_conf"])
+
+def create_ocr_backend(name: Optional[str] = None) -> OCRBackend:
+    """
+    Create the OCR backend named by ``name`` or the OCR_BACKEND environment
+    variable: "tesserocr", "pytesseract" or "auto" (the default), which uses
+    tesserocr when it can load the models and pytesseract otherwise.
+    """
+    name = name or os.environ.get("OCR_BACKEND", "auto")
+    if name not in ("auto", "tesserocr", "pytesseract"):
+        raise ValueError(f"Unknown OCR backend: {name}")
+    
+    if name in ("auto", "tesserocr"):
+        try:
+            return TesserocrBackend()
+        except RuntimeError:
+            if name == "tesserocr":
+                raise
+    return PytesseractBackend()
+
+_ocr_backend: Optional[OCRBackend] = None
+
+def get_ocr_backend() -> OCRBackend:
+    """
+    Get this process's OCR backend, creating it on first use.
+    """
+    global _ocr_backend
+    if _ocr_backend is None:
+        _ocr_backend = create_ocr_backend()
+    return _ocr_backend
+
+def detect_languages(preprocessed_image, merchant: Optional[str] = None, backend: Optional[OCRBackend] = None) -> str:
+    """
+    Choose the subset of OCR_LANGUAGES to OCR the image with, from the
+    merchant's earlier receipts or a quick script detection pass.
+    """
+    backend = backend or get_ocr_backend()
+    return select_languages(preprocessed_image, backend, OCR_LANGUAGES, language_memo_key(merchant), merchant_languages)
+
+def language_memo_key(merchant: Optional[str]) -> Optional[str]:
+    """
+    Name a merchant's languages are remembered and looked up under: the known
+    merchant it most likely is, so a given name and an OCR'd one meet, or
+    else the name itself.
+    """
+    if not merchant:
+        return None
+    return canonical_merchant(merchant) or merchant
+
+def extract_text(preprocessed_image, backend: Optional[OCRBackend] = None, languages: str = OCR_LANGUAGES):
+    """
+    Extract text from the preprocessed image using Tesseract OCR.
+    
+    Long receipts are split into horizontal strips at gaps between text
+    lines and the strips are OCRed in parallel.
+    """
+    backend = backend or get_ocr_backend()
+    texts = ocr_strips(preprocessed_image, lambda strip: backend.image_to_string(strip, languages))
+    return texts[0] if len(texts) == 1 else stitch_text(texts)
+
+def parse_tsv(tsv: str) -> Tuple[str, List[float]]:
+    """
+    Rebuild the text from Tesseract TSV output, one line per OCR text line,
+    and collect the confidence of every recognized word.
+    """
+    words = WordBoxes.from_tsv(tsv)
+    return words.text(), words.boxes["conf"].tolist()
+
+def extract_words(preprocessed_image, backend: Optional[OCRBackend] = None, languages: str = OCR_LANGUAGES,
+                  oem: int = OCR_OEM, tessdata_dir: Optional[str] = None) -> WordBoxes:
+    """
+    Recognize the preprocessed image and return its words with their boxes
+    and confidences. Long receipts are OCRed in parallel strips.
+    """
+    backend = backend or get_ocr_backend()
+    strips = strips_for(preprocessed_image)
+    tsvs = ocr_strips(
+        preprocessed_image,
+        lambda strip: backend.image_to_tsv(strip, languages, oem, tessdata_dir),
+        strips
+    )
+    return WordBoxes.concatenate([WordBoxes.from_tsv(tsv, top) for tsv, (top, _) in zip(tsvs, strips)])
+
+def extract_words_fast(preprocessed_image, backend: Optional[OCRBackend] = None) -> Tuple[WordBoxes, float]:
+    """
+    Run the cheap first OCR pass and return its words with their mean confidence (0-100).
+    """
+    height, width = preprocessed_image.shape[:2]
+    if FAST_TIER_SCALE < 1.0:
+        size = (max(1, int(width * FAST_TIER_SCALE)), max(1, int(height * FAST_TIER_SCALE)))
+        preprocessed_image = cv2.resize(preprocessed_image, size, interpolation=cv2.INTER_AREA)
+    words = extract_words(preprocessed_image, backend, FAST_TIER_LANGUAGES, FAST_TIER_OEM, FAST_TESSDATA_DIR)
+    return words, words.mean_confidence()
+
+def find_receipt_date(lines):
+    """
+    Find the receipt date in the given lines, or None if there is none.
+    """
+    date = read_receipt_date(lines)
+    return date.date if date else None
+
+def parse_receipt_text(text, progress: Optional[ProgressCallback] = None, words: Optional[WordBoxes] = None,
+                       learn_date_format: bool = True):
+    """
+    Parse the extracted text to identify merchant, date, total, receipt type, and items.
+    Enhanced for Indian receipts and currency.
+    
+    If the OCR word boxes are given and show a price column, items (with
+    quantities), subtotal and tax are read from the layout instead of the text.
+    Unless learn_date_format is False, the merchant's date format is learned
+    from the date found.
+    """
+    started = time.perf_counter()
+    parsed = scan_receipt_text(text, merchant_date_formats, learn_date_format)
+    items, subtotal, tax = parsed.items, parsed.subtotal, parsed.tax
+    
+    layout = extract_layout_items(words) if words is not None else None
+    if layout is not None:
+        items = layout.items
+        subtotal = layout.subtotal if layout.subtotal is not None else subtotal
+        tax = layout.tax if layout.tax is not None else tax
+    
+    # If no date found, use current date (date_format stays None to show it)
+    date = parsed.date or datetime.now()
+    
+    started = _stage_done(progress, "parse", started)
     
     # Determine category based on merchant, receipt type and items
-    category = categorize_transaction(merchant, total, " ".join([item.name for item in items]))
+    category = categorize_transaction(parsed.merchant, parsed.total, " ".join([item.name for item in items]))
+    _stage_done(progress, "categorize", started)
     
     # Create and return receipt data
     receipt_data = ReceiptData(
-        merchant=merchant,
+        merchant=parsed.merchant,
+        canonical_merchant=canonical_merchant(parsed.merchant),
         date=date,
-        total=total,
-        receipt_type=receipt_type,
+        date_format=parsed.date_format,
+        total=parsed.total,
+        subtotal=subtotal,
+        tax=tax,
+        receipt_type=parsed.receipt_type,
         category=category,
         items=items,
         raw_text=text
@@ -205,17 +456,145 @@ def parse_receipt_text(text):
     
     return receipt_data
 
-def process_receipt_image(image_bytes):
+def needs_full_ocr(text: str, confidence: float, receipt_data: ReceiptData) -> bool:
+    """
+    Decide whether a fast-tier result is too unreliable to return: its mean
+    word confidence is below FAST_TIER_MIN_CONFIDENCE, or no total or date was found.
+    """
+    if confidence < FAST_TIER_MIN_CONFIDENCE or receipt_data.total <= 0:
+        return True
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    return find_receipt_date(lines) is None
+
+def process_with_template(preprocessed, merchant: Optional[str] = None,
+                          progress: Optional[ProgressCallback] = None) -> Optional[ReceiptData]:
+    """
+    Process a receipt from a merchant with a layout template by OCRing only
+    the template's date, item and total regions.
+    
+    The merchant is recognized from the given name or a fast OCR of the
+    header band. Returns None, so the full pipeline runs instead, when no
+    template matches well enough or the regions do not give a date, total
+    and items with FAST_TIER_MIN_CONFIDENCE.
+    """
+    registry = get_template_registry()
+    if not len(registry):
+        return None
+    
+    started = time.perf_counter()
+    template = registry.get(merchant)
+    if template is None:
+        header = extract_words(header_band(preprocessed), None, FAST_TIER_LANGUAGES, FAST_TIER_OEM, FAST_TESSDATA_DIR)
+        matched = registry.match(header.text())
+        if matched is None or matched[1] < MIN_MATCH_SCORE:
+            _stage_done(progress, "template_match", started)
+            return None
+        template = matched[0]
+    started = _stage_done(progress, "template_match", started)
+    
+    regions = {}
+    for name, region in template.regions.items():
+        crop = region.crop(preprocessed)
+        if crop is None:
+            return None
+        regions[name] = extract_words(crop, languages=template.languages)
+    started = _stage_done(progress, "template_ocr", started)
+    
+    date = read_receipt_date(regions["date"].text().split("\n"), template.merchant, merchant_date_formats, learn=False)
+    layout = extract_layout_items(regions["items"])
+    
+    # The total is the first total line that is not a subtotal or tax line
+    summary = SummaryAmounts()
+    total = 0.0
+    for line in regions["total"].text().split("\n"):
+        summary.add(line, last_amount(line))
+        line_total = parse_line_total(line)
+        if total <= 0 and line_total and not SUBTOTAL_LINE.search(line) and not TAX_LINE.search(line):
+            total = line_total
+    
+    confidences = np.concatenate([words.boxes["conf"] for words in regions.values()])
+    confidence = float(confidences.mean()) if len(confidences) else 0.0
+    if date is None or total <= 0 or layout is None or confidence < FAST_TIER_MIN_CONFIDENCE:
+        return None
+    
+    merchant_date_formats.remember(template.merchant, date)
+    text = "\n".join(words.text() for words in regions.values())
+    started = _stage_done(progress, "parse", started)
+    category = categorize_transaction(template.merchant, total, " ".join(item.name for item in layout.items))
+    _stage_done(progress, "categorize", started)
+    
+    return ReceiptData(
+        merchant=template.merchant,
+        canonical_merchant=canonical_merchant(template.merchant),
+        date=date.date,
+        date_format=date.format,
+        total=total,
+        subtotal=summary.subtotal if summary.subtotal is not None else layout.subtotal,
+        tax=summary.tax if summary.tax is not None else layout.tax,
+        receipt_type=find_receipt_type(text.lower()),
+        category=category,
+        items=layout.items,
+        raw_text=text,
+        ocr_tier="template",
+        ocr_confidence=confidence,
+    )
+
+def process_receipt_image(image_bytes, progress: Optional[ProgressCallback] = None, merchant: Optional[str] = None):
     """
     Process a receipt image and extract structured data.
+    
+    If given, progress is called with the stage name and its duration in seconds
+    as each stage (decode, normalize, threshold, deskew, template_match,
+    template_ocr, ocr_fast, detect, ocr, parse, categorize) finishes. The
+    merchant, if known, lets OCR reuse the languages that merchant's earlier
+    receipts needed and picks its layout template without OCRing the header.
+    
+    Receipts matching a merchant template are handled by process_with_template
+    (ocr_tier "template"). Otherwise, with OCR_CASCADE enabled, a fast
+    English-only pass runs first and the full OCR configuration only runs if
+    needs_full_ocr rejects its result. The result's ocr_tier records which
+    pass produced it.
     """
     # Preprocess the image
-    preprocessed = preprocess_image(image_bytes)
+    preprocessed = preprocess_image(image_bytes, progress)
+    
+    # Receipts from merchants with a template only need a few regions OCR'd
+    receipt_data = process_with_template(preprocessed, merchant, progress)
+    if receipt_data is not None:
+        return receipt_data
+    
+    # Try the cheap OCR pass first
+    if OCR_CASCADE:
+        started = time.perf_counter()
+        words, confidence = extract_words_fast(preprocessed)
+        text = words.text()
+        _stage_done(progress, "ocr_fast", started)
+        
+        # Text the full pass may replace must not teach the merchant's date format
+        receipt_data = parse_receipt_text(text, progress, words, learn_date_format=False)
+        if not needs_full_ocr(text, confidence, receipt_data):
+            lines = [line.strip() for line in text.split('\n') if line.strip()]
+            read_receipt_date(lines, receipt_data.merchant, merchant_date_formats)
+            receipt_data.ocr_tier = "fast"
+            receipt_data.ocr_confidence = confidence
+            return receipt_data
+    
+    # Pick the languages to load for this receipt
+    started = time.perf_counter()
+    languages = detect_languages(preprocessed, merchant)
+    started = _stage_done(progress, "detect", started)
     
-    # Extract text using OCR
-    text = extract_text(preprocessed)
+    # Extract the words and their boxes using OCR
+    words = extract_words(preprocessed, languages=languages)
+    text = words.text()
+    _stage_done(progress, "ocr", started)
     
     # Parse the text to extract structured data
-    receipt_data = parse_receipt_text(text)
+    receipt_data = parse_receipt_text(text, progress, words)
+    receipt_data.ocr_tier = "full"
+    # Text OCR'd with fewer languages cannot show the scripts left out, so
+    # the scripts those languages were picked for are remembered with it
+    scripts = scripts_for_languages(languages) if languages != OCR_LANGUAGES else ()
+    merchant_languages.remember(language_memo_key(merchant or receipt_data.merchant), text, scripts)
     
     return receipt_data
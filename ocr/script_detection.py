@@ -0,0 +1,146 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import FrozenSet, Iterable, Optional, Set
+
+import cv2
+import numpy as np
+
+# Tesseract language models for each script Tesseract's OSD can report
+SCRIPT_LANGUAGES = {
+    "Latin": ["eng"],
+    "Devanagari": ["hin", "mar"],
+    "Bengali": ["ben"],
+    "Gujarati": ["guj"],
+    "Tamil": ["tam"],
+    "Telugu": ["tel"],
+    "Kannada": ["kan"],
+}
+
+# Unicode blocks used to tell which scripts appear in recognized text
+SCRIPT_RANGES = [
+    ("Devanagari", 0x0900, 0x097F),
+    ("Bengali", 0x0980, 0x09FF),
+    ("Gujarati", 0x0A80, 0x0AFF),
+    ("Tamil", 0x0B80, 0x0BFF),
+    ("Telugu", 0x0C00, 0x0C7F),
+    ("Kannada", 0x0C80, 0x0CFF),
+]
+
+# Width the image is shrunk to before running script detection
+DETECTION_WIDTH = int(os.environ.get("OCR_SCRIPT_DETECTION_WIDTH", "800"))
+
+# OSD confidence below which all languages are used
+MIN_SCRIPT_CONFIDENCE = float(os.environ.get("OCR_MIN_SCRIPT_CONFIDENCE", "1.0"))
+
+def languages_for_scripts(scripts: Set[str]) -> str:
+    """
+    Build a Tesseract language string for the given scripts. English is always
+    included because amounts, dates and totals are printed in Latin script.
+    """
+    languages = ["eng"]
+    for script, script_languages in SCRIPT_LANGUAGES.items():
+        if script in scripts:
+            languages.extend(lang for lang in script_languages if lang not in languages)
+    return "+".join(languages)
+
+def scripts_for_languages(languages: str) -> Set[str]:
+    """
+    The scripts whose language models are all in a Tesseract language string.
+    """
+    loaded = set(languages.split("+"))
+    return {script for script, script_languages in SCRIPT_LANGUAGES.items() if loaded.issuperset(script_languages)}
+
+def scripts_in_text(text: str) -> Set[str]:
+    """
+    Find the scripts used in recognized text by their Unicode blocks.
+    """
+    scripts = set()
+    for char in text:
+        code = ord(char)
+        if code < 0x0900:
+            if char.isalpha():
+                scripts.add("Latin")
+            continue
+        for script, start, end in SCRIPT_RANGES:
+            if start <= code <= end:
+                scripts.add(script)
+                break
+    return scripts
+
+def normalize_merchant(merchant: str) -> str:
+    return " ".join(merchant.lower().split())
+
+class MerchantLanguageMemo:
+    """
+    Bounded LRU memo of the scripts each merchant's receipts have used, and
+    so the languages they need.
+
+    The memo lives in the memory of the process using it, so each OCR worker
+    process learns on its own and starts empty again when it is recycled.
+    """
+    def __init__(self, max_merchants: int = 5000):
+        self.max_merchants = max_merchants
+        self._scripts: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._scripts)
+
+    def get(self, merchant: Optional[str]) -> Optional[str]:
+        if not merchant:
+            return None
+        key = normalize_merchant(merchant)
+        with self._lock:
+            scripts = self._scripts.get(key)
+            if scripts is None:
+                return None
+            self._scripts.move_to_end(key)
+        return languages_for_scripts(scripts)
+
+    def remember(self, merchant: Optional[str], text: str, scripts: Iterable[str] = ()):
+        """
+        Add the scripts found in a merchant's receipt text, and any other
+        scripts given, to those its earlier receipts used. Scripts are never
+        dropped, since a receipt lacking one does not mean the merchant's next
+        receipt will.
+        """
+        if not merchant:
+            return
+        key = normalize_merchant(merchant)
+        scripts = frozenset(scripts_in_text(text)) | frozenset(scripts)
+        with self._lock:
+            self._scripts[key] = self._scripts.get(key, frozenset()) | scripts
+            self._scripts.move_to_end(key)
+            while len(self._scripts) > self.max_merchants:
+                self._scripts.popitem(last=False)
+
+merchant_languages = MerchantLanguageMemo()
+
+def downscale_for_detection(image: np.ndarray, width: int = DETECTION_WIDTH) -> np.ndarray:
+    height, current_width = image.shape[:2]
+    if current_width <= width:
+        return image
+    scale = width / current_width
+    return cv2.resize(image, (width, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+
+def select_languages(image: np.ndarray, backend, all_languages: str, merchant: Optional[str] = None,
+                     memo: Optional[MerchantLanguageMemo] = None) -> str:
+    """
+    Pick the Tesseract languages to OCR a receipt with.
+
+    A merchant seen before reuses the languages its earlier receipts needed,
+    from ``memo`` or merchant_languages. Otherwise the backend's script
+    detection runs on a downscaled copy of the image; if it cannot name the
+    script confidently, all languages are used.
+    """
+    if memo is None:
+        memo = merchant_languages
+    remembered = memo.get(merchant)
+    if remembered:
+        return remembered
+
+    script, confidence = backend.detect_script(downscale_for_detection(image))
+    if script not in SCRIPT_LANGUAGES or confidence < MIN_SCRIPT_CONFIDENCE:
+        return all_languages
+    return languages_for_scripts({script})
@@ -0,0 +1,138 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Receipts are only split when every strip would be at least this tall
+STRIP_MIN_HEIGHT = int(os.environ.get("OCR_STRIP_MIN_HEIGHT", "1200"))
+
+# How far, in pixels, each strip reaches past its cut into the next strip.
+# The overlap is extended to the next gap between text lines so overlapping
+# lines are never cut through.
+STRIP_OVERLAP = int(os.environ.get("OCR_STRIP_OVERLAP", "30"))
+
+# Rows with at most this share of ink pixels count as gaps between lines
+GAP_INK_RATIO = 0.002
+
+# Most lines compared when removing text duplicated by the overlap
+MAX_OVERLAP_LINES = 5
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _default_strip_threads() -> int:
+    # Each OCR pool worker gets an even share of the cores, so strips of one
+    # receipt do not oversubscribe a busy pool; two threads at least, since
+    # much of OCR on a strip is spent outside the GIL
+    pool_workers = int(os.environ.get("OCR_POOL_WORKERS", "0")) or os.cpu_count() or 1
+    return max(2, available_cores() // pool_workers)
+
+# Most strips a receipt is split into, each OCRed on its own thread
+STRIP_THREADS = int(os.environ.get("OCR_STRIP_THREADS", "0")) or _default_strip_threads()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _strip_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=STRIP_THREADS, thread_name_prefix="ocr-strip")
+        return _executor
+
+def find_line_gaps(binary: np.ndarray) -> np.ndarray:
+    """
+    Find the rows of a binarized receipt (dark text on light paper) that lie
+    between text lines, as the center row of each run of blank rows.
+    """
+    height, width = binary.shape[:2]
+    ink = cv2.reduce(cv2.bitwise_not(binary), 1, cv2.REDUCE_SUM, dtype=cv2.CV_32F)[:, 0] / 255
+    blank = ink <= max(1.0, width * GAP_INK_RATIO)
+
+    # Edges of the runs of blank rows
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], blank.astype(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    return (starts + ends - 1) // 2
+
+def plan_strips(height: int, gaps: np.ndarray, count: int, overlap: int = STRIP_OVERLAP) -> List[Tuple[int, int]]:
+    """
+    Split ``height`` rows into up to ``count`` overlapping (top, bottom) strips
+    whose cuts fall in gaps between text lines.
+    """
+    if count <= 1 or len(gaps) == 0:
+        return [(0, height)]
+
+    cuts = []
+    for index in range(1, count):
+        ideal = height * index // count
+        cut = int(gaps[np.argmin(np.abs(gaps - ideal))])
+        if (not cuts or cut > cuts[-1]) and 0 < cut < height:
+            cuts.append(cut)
+
+    def reach(row: int, direction: int) -> int:
+        # First gap at least `overlap` rows away from the cut, or the image edge
+        if direction > 0:
+            beyond = gaps[gaps >= row + overlap]
+            return int(beyond[0]) if len(beyond) else height
+        beyond = gaps[gaps <= row - overlap]
+        return int(beyond[-1]) if len(beyond) else 0
+
+    bounds = [0] + cuts + [height]
+    return [
+        (reach(top, -1) if top > 0 else 0, reach(bottom, 1) if bottom < height else height)
+        for top, bottom in zip(bounds[:-1], bounds[1:])
+    ]
+
+def strips_for(binary: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Plan the strips to OCR a receipt in, one per available core at most.
+    Receipts too short to split come back as a single strip.
+    """
+    height = binary.shape[0]
+    count = min(STRIP_THREADS, height // STRIP_MIN_HEIGHT)
+    if count <= 1:
+        return [(0, height)]
+    return plan_strips(height, find_line_gaps(binary), count)
+
+def ocr_strips(binary: np.ndarray, recognize: Callable[[np.ndarray], str],
+               strips: Optional[List[Tuple[int, int]]] = None) -> List[str]:
+    """
+    Run ``recognize`` on each strip of the image in parallel and return the
+    outputs in top-to-bottom order.
+    """
+    strips = strips if strips is not None else strips_for(binary)
+    if len(strips) == 1:
+        top, bottom = strips[0]
+        return [recognize(binary[top:bottom])]
+    return list(_strip_executor().map(lambda bounds: recognize(binary[bounds[0]:bounds[1]]), strips))
+
+def _normalize_line(line: str) -> str:
+    return " ".join(line.lower().split())
+
+def count_overlap_lines(previous: List[str], lines: List[str]) -> int:
+    """
+    Count the lines at the start of ``lines`` that repeat the end of
+    ``previous``, as text from neighbouring strips does.
+    """
+    seen = [_normalize_line(line) for line in previous[-MAX_OVERLAP_LINES:]]
+    new = [_normalize_line(line) for line in lines[:MAX_OVERLAP_LINES]]
+    for size in range(min(len(seen), len(new)), 0, -1):
+        if seen[-size:] == new[:size]:
+            return size
+    return 0
+
+def stitch_text(texts: List[str]) -> str:
+    """
+    Join the text of consecutive strips, dropping the lines at the start of
+    each strip that repeat the end of the previous one.
+    """
+    lines: List[str] = []
+    for text in texts:
+        strip_lines = [line for line in text.split("\n") if line.strip()]
+        lines.extend(strip_lines[count_overlap_lines(lines, strip_lines):])
+    return "\n".join(lines)
@@ -0,0 +1,84 @@
+"""
+Learn merchant layout templates from receipt images stored on disk.
+
+Usage: python -m ocr.template_learning <image_dir> [--out DIR] [--min-receipts N]
+
+Every image is run through the full OCR pipeline. Merchants with at least
+N receipts whose date, item table and totals can be located get a template
+written to DIR (default: OCR_TEMPLATE_DIR).
+"""
+import argparse
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from ocr.layout import WordBoxes
+from ocr.receipt_processor import detect_languages, extract_words, parse_receipt_text, preprocess_image
+from ocr.script_detection import normalize_merchant
+from ocr.templates import MIN_SAMPLES, TEMPLATE_DIR, MerchantTemplate, TemplateRegistry, learn_template
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp"}
+
+def collect_samples(paths: Iterable[Path]) -> Dict[str, Tuple[str, str, List[Tuple[WordBoxes, int, int]]]]:
+    """
+    OCR receipt images and group their word boxes by merchant. Returns, per
+    normalized merchant name, the merchant as printed, the languages its
+    receipts needed and the (word boxes, width, height) samples.
+    """
+    merchants: Dict[str, str] = {}
+    languages_seen = defaultdict(set)
+    samples = defaultdict(list)
+    for path in paths:
+        try:
+            preprocessed = preprocess_image(path.read_bytes())
+        except ValueError:
+            continue
+        languages = detect_languages(preprocessed)
+        words = extract_words(preprocessed, languages=languages)
+        receipt = parse_receipt_text(words.text(), words=words)
+        key = normalize_merchant(receipt.merchant)
+        if not key:
+            continue
+        height, width = preprocessed.shape[:2]
+        merchants.setdefault(key, receipt.merchant)
+        languages_seen[key].update(languages.split("+"))
+        samples[key].append((words, width, height))
+
+    # English first, as select_languages orders them
+    return {
+        key: (merchant, "+".join(sorted(languages_seen[key], key=lambda lang: (lang != "eng", lang))), samples[key])
+        for key, merchant in merchants.items()
+    }
+
+def learn_templates(image_dir: str, registry: TemplateRegistry, min_samples: int = MIN_SAMPLES) -> List[MerchantTemplate]:
+    """
+    Learn templates from the receipt images in ``image_dir`` and add them to
+    the registry.
+    """
+    paths = sorted(path for path in Path(image_dir).rglob("*") if path.suffix.lower() in IMAGE_SUFFIXES)
+    learned = []
+    for merchant, languages, samples in collect_samples(paths).values():
+        template = learn_template(merchant, samples, languages, min_samples)
+        if template is not None:
+            registry.add(template)
+            learned.append(template)
+    return learned
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir", help="directory of processed receipt images")
+    parser.add_argument("--out", default=TEMPLATE_DIR, help="template directory (default: OCR_TEMPLATE_DIR)")
+    parser.add_argument("--min-receipts", type=int, default=MIN_SAMPLES,
+                        help="receipts a merchant needs before a template is learned")
+    args = parser.parse_args()
+    if not args.out:
+        parser.error("set --out or OCR_TEMPLATE_DIR")
+
+    os.makedirs(args.out, exist_ok=True)
+    registry = TemplateRegistry(args.out)
+    for template in learn_templates(args.image_dir, registry, args.min_receipts):
+        print(f"{template.merchant}: learned from {template.samples} receipts ({template.languages})")
+
+if __name__ == "__main__":
+    main()
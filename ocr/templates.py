@@ -0,0 +1,269 @@
+import difflib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ocr.dates import parse_line_date
+from ocr.layout import WordBoxes, find_price_column, parse_price
+from ocr.script_detection import normalize_merchant
+from ocr.text_parser import NON_ITEM_WORDS, parse_line_total
+
+# Directory of merchant template JSON files; templates are off if unset
+TEMPLATE_DIR = os.environ.get("OCR_TEMPLATE_DIR")
+
+# Height of the header band OCR'd to recognize the merchant, in receipt widths
+HEADER_BAND = float(os.environ.get("OCR_TEMPLATE_HEADER_BAND", "0.6"))
+
+# Smallest similarity (0-1) between a header line and a template's merchant
+# names for the template to be used
+MIN_MATCH_SCORE = float(os.environ.get("OCR_TEMPLATE_MIN_MATCH", "0.85"))
+
+# Padding added around learned regions, in receipt widths
+REGION_MARGIN = 0.03
+
+# Fewest receipts of a merchant needed to learn its template
+MIN_SAMPLES = 3
+
+REGION_NAMES = ("date", "items", "total")
+
+class Region(NamedTuple):
+    """
+    A band of the receipt, measured in receipt widths so it does not depend
+    on resolution. ``anchor`` says which edges the offsets are measured from:
+    "top" (both from the top), "bottom" (both up from the bottom) or "span"
+    (top edge from the top, bottom edge up from the bottom), since the item
+    table grows with the number of items while the header and totals do not.
+    """
+    anchor: str
+    top: float
+    bottom: float
+    left: float = 0.0
+    right: float = 1.0
+
+    def pixels(self, width: int, height: int) -> Tuple[int, int, int, int]:
+        """
+        (top, bottom, left, right) pixel bounds of the region on a receipt.
+        """
+        top = self.top * width if self.anchor in ("top", "span") else height - self.top * width
+        bottom = self.bottom * width if self.anchor == "top" else height - self.bottom * width
+        top, bottom = int(max(0, min(height, top))), int(max(0, min(height, bottom)))
+        left, right = int(max(0.0, self.left) * width), int(min(1.0, self.right) * width)
+        return top, bottom, left, right
+
+    def crop(self, image: np.ndarray) -> Optional[np.ndarray]:
+        height, width = image.shape[:2]
+        top, bottom, left, right = self.pixels(width, height)
+        if bottom - top < 8 or right - left < 8:
+            return None
+        return image[top:bottom, left:right]
+
+class MerchantTemplate(NamedTuple):
+    merchant: str
+    # Names the merchant's header can read as, compared after normalize_merchant
+    names: List[str]
+    regions: Dict[str, Region]
+    languages: str = "eng"
+    samples: int = 0
+
+    def to_json(self) -> dict:
+        return {
+            "merchant": self.merchant,
+            "names": self.names,
+            "languages": self.languages,
+            "samples": self.samples,
+            "regions": {name: region._asdict() for name, region in self.regions.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "MerchantTemplate":
+        regions = {name: Region(**region) for name, region in data["regions"].items()}
+        missing = set(REGION_NAMES) - set(regions)
+        if missing:
+            raise ValueError(f"Template for {data['merchant']} has no {', '.join(sorted(missing))} region")
+        return cls(
+            merchant=data["merchant"],
+            names=[normalize_merchant(name) for name in data.get("names") or [data["merchant"]]],
+            regions=regions,
+            languages=data.get("languages", "eng"),
+            samples=data.get("samples", 0),
+        )
+
+def template_filename(merchant: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '-', normalize_merchant(merchant)).strip('-') + ".json"
+
+class TemplateRegistry:
+    """
+    Merchant templates loaded from the JSON files in ``directory``, matched
+    against the text of a receipt's header band.
+    """
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._templates: Dict[str, MerchantTemplate] = {}
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if directory and os.path.isdir(directory):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def load(self):
+        templates = {}
+        for filename in sorted(os.listdir(self.directory)):
+            if filename.endswith(".json"):
+                with open(os.path.join(self.directory, filename), encoding="utf-8") as f:
+                    template = MerchantTemplate.from_json(json.load(f))
+                templates[normalize_merchant(template.merchant)] = template
+        with self._lock:
+            self._templates = {}
+            self._names = {}
+            for template in templates.values():
+                self._add_locked(template)
+
+    def _add_locked(self, template: MerchantTemplate):
+        key = normalize_merchant(template.merchant)
+        self._templates[key] = template
+        for name in set(template.names) | {key}:
+            self._names[name] = key
+
+    def add(self, template: MerchantTemplate, save: bool = True):
+        """
+        Register a template, writing it to the registry's directory if it has one.
+        """
+        with self._lock:
+            self._add_locked(template)
+        if save and self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, template_filename(template.merchant))
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(template.to_json(), f, indent=2)
+
+    def get(self, merchant: Optional[str]) -> Optional[MerchantTemplate]:
+        if not merchant:
+            return None
+        key = self._names.get(normalize_merchant(merchant))
+        return self._templates.get(key) if key else None
+
+    def match(self, header_text: str) -> Optional[Tuple[MerchantTemplate, float]]:
+        """
+        Find the template whose merchant names best match a line of the
+        header text, with the similarity score (0-1).
+        """
+        with self._lock:
+            names = self._names
+            templates = self._templates
+        best_key, best_score = None, 0.0
+        for line in header_text.split("\n"):
+            line = normalize_merchant(line)
+            if len(line) < 3:
+                continue
+            if line in names:
+                return templates[names[line]], 1.0
+            for name in difflib.get_close_matches(line, names, n=1, cutoff=max(best_score, 0.5)):
+                score = difflib.SequenceMatcher(None, line, name).ratio()
+                if score > best_score:
+                    best_key, best_score = names[name], score
+        if best_key is None:
+            return None
+        return templates[best_key], best_score
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_template_registry() -> TemplateRegistry:
+    """
+    Get this process's template registry, loading OCR_TEMPLATE_DIR on first use.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry(TEMPLATE_DIR)
+        return _registry
+
+def header_band(image: np.ndarray) -> np.ndarray:
+    height, width = image.shape[:2]
+    return image[:min(height, int(HEADER_BAND * width))]
+
+class _Band(NamedTuple):
+    top: int
+    bottom: int
+
+def _line_bands(words: WordBoxes) -> List[Tuple[str, _Band]]:
+    boxes = words.boxes
+    return [
+        (" ".join(words.words[start:end]),
+         _Band(int(boxes["top"][start:end].min()), int(boxes["bottom"][start:end].max())))
+        for start, end in words.line_bounds()
+    ]
+
+def receipt_regions(words: WordBoxes, width: int, height: int) -> Optional[Dict[str, Region]]:
+    """
+    Measure where the date, item table and totals are on one processed
+    receipt. Returns None if any of them cannot be found.
+    """
+    lines = _line_bands(words)
+    date = next((band for text, band in lines if parse_line_date(text)), None)
+
+    column = find_price_column(words)
+    if date is None or column is None:
+        return None
+    low, high = column
+
+    # Lines ending in an amount in the price column, split into items and
+    # the totals block that follows the last item
+    priced = []
+    for (text, band), (start, end) in zip(lines, words.line_bounds()):
+        if low <= words.boxes["right"][end - 1] <= high and parse_price(words.words[end - 1]) is not None:
+            priced.append((text, band, bool(NON_ITEM_WORDS.search(text.lower()))))
+    items = [band for text, band, summary in priced if not summary]
+    totals = [band for text, band, summary in priced if summary and parse_line_total(text)]
+    totals = [band for band in totals if items and band.top > items[-1].bottom]
+    if not items or not totals:
+        return None
+
+    return {
+        "date": Region("top", date.top / width, date.bottom / width),
+        "items": Region("span", items[0].top / width, (height - items[-1].bottom) / width),
+        "total": Region("bottom", (height - totals[0].top) / width, (height - totals[-1].bottom) / width),
+    }
+
+def merge_regions(samples: List[Dict[str, Region]], margin: float = REGION_MARGIN) -> Dict[str, Region]:
+    """
+    Combine the regions measured on several receipts into bands that cover
+    all of them, padded by ``margin``.
+    """
+    merged = {}
+    for name in REGION_NAMES:
+        regions = [sample[name] for sample in samples]
+        anchor = regions[0].anchor
+        if anchor == "top":
+            top, bottom = min(r.top for r in regions) - margin, max(r.bottom for r in regions) + margin
+        elif anchor == "bottom":
+            top, bottom = max(r.top for r in regions) + margin, min(r.bottom for r in regions) - margin
+        else:
+            top, bottom = min(r.top for r in regions) - margin, min(r.bottom for r in regions) - margin
+        merged[name] = Region(anchor, max(0.0, top), max(0.0, bottom))
+    return merged
+
+def learn_template(merchant: str, samples: List[Tuple[WordBoxes, int, int]], languages: str = "eng",
+                   min_samples: int = MIN_SAMPLES) -> Optional[MerchantTemplate]:
+    """
+    Learn a merchant's template from its processed receipts, given as
+    (word boxes, width, height) of the preprocessed images. Returns None if
+    fewer than ``min_samples`` receipts have a readable layout.
+    """
+    measured = [regions for regions in (receipt_regions(words, width, height) for words, width, height in samples)
+                if regions is not None]
+    if len(measured) < min_samples:
+        return None
+    return MerchantTemplate(
+        merchant=merchant,
+        names=[normalize_merchant(merchant)],
+        regions=merge_regions(measured),
+        languages=languages,
+        samples=len(measured),
+    )
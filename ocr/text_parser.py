@@ -0,0 +1,189 @@
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from categorization.keyword_index import KeywordIndex
+from models.models import ReceiptItem
+from ocr.dates import DateFormatMemo, format_order, parse_line_date
+
+# Words that mark the first line as a document header rather than the merchant
+HEADER_WORDS = ['receipt', 'invoice', 'bill', 'cash memo']
+
+RECEIPT_TYPE_KEYWORDS = {
+    "Food": ["restaurant", "cafe", "food", "dining", "meal", "lunch", "dinner", "breakfast"],
+    "Grocery": ["grocery", "supermarket", "mart", "store", "kirana", "provision"],
+    "Medical": ["pharmacy", "medical", "medicine", "hospital", "clinic", "doctor", "healthcare"],
+    "Utility": ["electricity", "water", "gas", "utility", "bill", "broadband", "internet", "phone"],
+    "Transportation": ["travel", "transport", "fuel", "petrol", "diesel", "gas", "taxi", "uber", "ola"],
+    "Entertainment": ["movie", "cinema", "theatre", "entertainment", "game", "play"],
+    "Shopping": ["mall", "shop", "store", "retail", "clothing", "apparel", "electronics"],
+    "Education": ["school", "college", "university", "tuition", "course", "class", "education"],
+    "Investment": ["investment", "mutual fund", "stock", "share", "bond", "deposit", "fd", "rd"]
+}
+RECEIPT_TYPE_INDEX = KeywordIndex(RECEIPT_TYPE_KEYWORDS)
+
+# Total amount patterns with Indian Rupee symbols and formats, in order of
+# preference. Every one of them needs one of the words in TOTAL_HINT.
+TOTAL_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in [
+    r'total\s*(?:amount)?(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+    r'(?:grand|net|final)\s+total\s*(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+    r'amount\s*(?:payable|paid|due)(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+    r'(?:Rs\.?|₹)\s*(\d+(?:[.,]\d+)?)\s*(?:only|/-)?',
+    r'(?:total|amount|sum)(?:\s|$).*?(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+]]
+TOTAL_HINT = re.compile(r'total|amount|sum|rs|₹', re.IGNORECASE)
+
+# Item descriptions followed by quantities and prices. Every pattern that
+# matches a line adds an item.
+ITEM_PATTERNS = [re.compile(pattern) for pattern in [
+    r'([A-Za-z0-9\s\&\-]+)\s+(?:\d+(?:\.\d+)?)?\s*(?:x\s*)?(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+    r'([A-Za-z0-9\s\&\-]+)\s+(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+]]
+DIGIT = re.compile(r'\d')
+
+# Lines that are likely headers or totals rather than items
+# (also covers subtotal, cgst and sgst)
+NON_ITEM_WORDS = re.compile(r'total|tax|amount|change|cash|credit|card|gst')
+
+# Subtotal and tax lines, and the money amounts on them (not rates like "9%").
+# Lines such as "Tax Invoice" or "Total incl. of taxes" name tax without
+# giving its amount.
+SUBTOTAL_LINE = re.compile(r'sub\s*-?\s*total', re.IGNORECASE)
+TAX_LINE = re.compile(r'\b(?:[csi]?gst|ut\s*gst|vat|tax)\b', re.IGNORECASE)
+NOT_TAX_AMOUNT = re.compile(r'invoice|incl|excl|before|after|without|w/o', re.IGNORECASE)
+AMOUNT = re.compile(r'(\d[\d,]*\.\d{2})(?![\d%]|\s*%)')
+
+class ParsedReceiptText(NamedTuple):
+    merchant: str
+    date: Optional[datetime]
+    date_format: Optional[str]
+    total: float
+    subtotal: Optional[float]
+    tax: Optional[float]
+    receipt_type: str
+    items: List[ReceiptItem]
+
+def find_merchant(lines: List[str]) -> str:
+    """
+    Pick the merchant name from the first lines of a receipt.
+    """
+    if not lines:
+        return ""
+    merchant = lines[0]
+    # If first line looks like a header, try the second line
+    if len(merchant) < 3 or any(word in merchant.lower() for word in HEADER_WORDS):
+        if len(lines) > 1:
+            merchant = lines[1]
+    return merchant
+
+def find_receipt_type(text_lower: str) -> str:
+    return RECEIPT_TYPE_INDEX.first_group(text_lower) or "General"
+
+def parse_line_total(line: str) -> Optional[float]:
+    """
+    Read the amount of the first total pattern matching a line, if any.
+    """
+    if not TOTAL_HINT.search(line):
+        return None
+    for pattern in TOTAL_PATTERNS:
+        total_match = pattern.search(line)
+        if total_match:
+            # Handle Indian number format (e.g., 1,00,000.00)
+            return float(total_match.group(1).replace(',', ''))
+    return None
+
+def parse_line_items(line: str, items: List[ReceiptItem]):
+    if not DIGIT.search(line):
+        return
+    for pattern in ITEM_PATTERNS:
+        item_match = pattern.search(line)
+        if item_match:
+            item_name = item_match.group(1).strip()
+            item_price = float(item_match.group(2).replace(',', ''))
+            if item_price > 0 and len(item_name) > 1:
+                # Both fields already have the validated types
+                items.append(ReceiptItem.construct(name=item_name, price=item_price))
+
+def last_amount(line: str) -> Optional[float]:
+    """
+    Read the last money amount on a line, skipping rates like "9.00%".
+    """
+    amounts = AMOUNT.findall(line)
+    return float(amounts[-1].replace(',', '')) if amounts else None
+
+class SummaryAmounts:
+    """
+    Collects the subtotal and tax from a receipt's summary lines. Tax is the
+    tax total line if there is one, otherwise the sum of the individual tax
+    lines (such as CGST and SGST).
+    """
+    def __init__(self):
+        self.subtotal: Optional[float] = None
+        self._tax_parts: List[float] = []
+        self._tax_total: Optional[float] = None
+
+    def add(self, line: str, amount: Optional[float]):
+        if amount is None:
+            return
+        if self.subtotal is None and SUBTOTAL_LINE.search(line):
+            self.subtotal = amount
+        elif TAX_LINE.search(line) and not NOT_TAX_AMOUNT.search(line):
+            if 'total' in line.lower():
+                self._tax_total = amount
+            else:
+                self._tax_parts.append(amount)
+
+    @property
+    def tax(self) -> Optional[float]:
+        if self._tax_total is not None:
+            return self._tax_total
+        return round(sum(self._tax_parts), 2) if self._tax_parts else None
+
+def scan_receipt_text(text: str, date_formats: Optional[DateFormatMemo] = None,
+                      learn: bool = True) -> ParsedReceiptText:
+    """
+    Extract merchant, date, total, subtotal, tax, receipt type and items from
+    OCR text in a single pass over its lines.
+
+    The first line with a date gives the date and the first line with a
+    positive total gives the total. Ambiguous dates are read in the merchant's format from ``date_formats``,
+    which learns the format of unambiguous ones if ``learn`` is set.
+    """
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    merchant = find_merchant(lines)
+    known_format = date_formats.get(merchant) if date_formats is not None else None
+    preferred = format_order(known_format) if known_format else None
+
+    date = None
+    total = 0.0
+    summary = SummaryAmounts()
+    items: List[ReceiptItem] = []
+
+    for line in lines:
+        if date is None:
+            date = parse_line_date(line, preferred)
+
+        if total <= 0:
+            line_total = parse_line_total(line)
+            if line_total is not None:
+                total = line_total
+
+        if not NON_ITEM_WORDS.search(line.lower()):
+            parse_line_items(line, items)
+            continue
+
+        summary.add(line, last_amount(line))
+
+    if date is not None and date_formats is not None and learn:
+        date_formats.remember(merchant, date)
+
+    return ParsedReceiptText(
+        merchant=merchant,
+        date=date.date if date else None,
+        date_format=date.format if date else None,
+        total=total,
+        subtotal=summary.subtotal,
+        tax=summary.tax,
+        receipt_type=find_receipt_type(text.lower()),
+        items=items,
+    )
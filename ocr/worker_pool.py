@@ -0,0 +1,292 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class OCRPoolSaturated(Exception):
+    """Raised when the pool already holds as many jobs as it is allowed to queue."""
+
+
+class OCRPoolUnavailable(Exception):
+    """Raised when a job is submitted to a pool that is not running."""
+
+
+class OCRJobTimeout(Exception):
+    """Raised when a job does not finish within the configured timeout."""
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+def terminate_workers(executor: ProcessPoolExecutor):
+    """
+    Kill an executor's worker processes. Its unfinished jobs fail with
+    BrokenProcessPool.
+    """
+    # ProcessPoolExecutor has no public way to do this before Python 3.14
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+
+
+class OCRWorkerPool:
+    """
+    Runs CPU-bound OCR work in a managed pool of worker processes so the
+    event loop only awaits results.
+
+    The pool accepts at most ``max_workers + max_queue`` jobs at a time and
+    rejects anything beyond that with OCRPoolSaturated. Jobs wait in the
+    pool's own queue until a worker is free and are only then handed to
+    the executor, so ``job_timeout`` counts running time, not time queued.
+
+    Workers are recycled by retiring the whole executor once it has been
+    handed ``max_workers * max_jobs_per_worker`` jobs, or when a job times
+    out, since a stuck worker cannot be interrupted. Jobs still running on
+    a retired executor are allowed to finish and count as pending until
+    they do. At most ``max_retired`` retired executors are kept; retiring
+    another terminates the oldest one's workers. If a worker process dies,
+    the broken executor is replaced and the jobs it was running are tried
+    once more on the new one.
+    """
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+        max_jobs_per_worker: Optional[int] = None,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        max_retired: Optional[int] = None,
+    ):
+        self.max_workers = max_workers or _env_int("OCR_POOL_WORKERS", os.cpu_count() or 1)
+        self.max_queue = max_queue if max_queue is not None else _env_int("OCR_POOL_MAX_QUEUE", self.max_workers * 4)
+        self.job_timeout = job_timeout or _env_float("OCR_JOB_TIMEOUT", 30.0)
+        self.max_jobs_per_worker = max_jobs_per_worker or _env_int("OCR_WORKER_MAX_JOBS", 200)
+        self.max_retired = max_retired if max_retired is not None else _env_int("OCR_POOL_MAX_RETIRED", 1)
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs_on_executor = 0
+        self._pending = 0
+        # Jobs handed to each executor that have not finished yet
+        self._outstanding: Dict[ProcessPoolExecutor, int] = {}
+        # Retired executors still finishing jobs, oldest first
+        self._retired: List[ProcessPoolExecutor] = []
+        # Limits jobs handed to the executor to one per worker
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Counters exposed through stats()
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._recycled = 0
+        self._crashed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        """
+        Start the worker processes. Calling start on a running pool is a no-op.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._jobs_on_executor = 0
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting jobs and shut the worker processes down.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            retired, self._retired = self._retired, []
+        for old in retired:
+            old.shutdown(wait=wait, cancel_futures=True)
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=self.initializer,
+            initargs=self.initargs,
+        )
+
+    def _retire_locked(self):
+        old, self._executor = self._executor, self._new_executor()
+        self._jobs_on_executor = 0
+        self._recycled += 1
+        if old is None:
+            return
+        # Let jobs already running on the retired workers finish
+        old.shutdown(wait=False)
+        if self._outstanding.get(old):
+            self._retired.append(old)
+        while len(self._retired) > self.max_retired:
+            terminate_workers(self._retired.pop(0))
+
+    def _replace_broken_locked(self, executor: ProcessPoolExecutor):
+        if self._executor is executor:
+            self._crashed += 1
+            self._executor = self._new_executor()
+            self._jobs_on_executor = 0
+        elif executor in self._retired:
+            self._retired.remove(executor)
+        self._outstanding.pop(executor, None)
+        executor.shutdown(wait=False)
+
+    def _replace_broken(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            self._replace_broken_locked(executor)
+
+    def _job_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_workers)
+            self._slots_loop = loop
+        return self._slots
+
+    def _admit(self):
+        with self._lock:
+            if self._executor is None:
+                raise OCRPoolUnavailable("OCR worker pool is not running")
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise OCRPoolSaturated("OCR worker pool queue is full")
+            self._pending += 1
+
+    def _submit_to_executor(self, fn: Callable, args: Tuple) -> Tuple[ProcessPoolExecutor, Future]:
+        with self._lock:
+            if self._executor is None:
+                raise OCRPoolUnavailable("OCR worker pool is not running")
+            if (self._jobs_on_executor >= self.max_workers * self.max_jobs_per_worker
+                    and len(self._retired) < self.max_retired):
+                self._retire_locked()
+            executor = self._executor
+            self._jobs_on_executor += 1
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._replace_broken_locked(executor)
+                raise
+            self._outstanding[executor] = self._outstanding.get(executor, 0) + 1
+        future.add_done_callback(lambda _: self._job_finished(executor))
+        return executor, future
+
+    def _job_finished(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            remaining = self._outstanding.get(executor, 0) - 1
+            if remaining > 0:
+                self._outstanding[executor] = remaining
+                return
+            self._outstanding.pop(executor, None)
+            if executor in self._retired:
+                self._retired.remove(executor)
+
+    def _release_pending(self, _=None):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        Run ``fn(*args)`` in a worker process and await its result.
+
+        ``fn`` and its arguments must be picklable, so pass module-level
+        functions such as ``ocr.receipt_processor.process_receipt_image``.
+        """
+        return await self.submit(fn, *args)
+
+    def submit(self, fn: Callable, *args: Any) -> "asyncio.Task":
+        """
+        Queue ``fn(*args)`` and return a task that resolves to its result.
+
+        Unlike run, backpressure errors are raised immediately rather than
+        when the task is awaited. Must be called from the event loop.
+        """
+        self._admit()
+        return asyncio.ensure_future(self._run_job(fn, args))
+
+    async def _run_job(self, fn: Callable, args: Tuple) -> Any:
+        # Whether this coroutine, rather than the job's future, gives back
+        # the job's place in the pending count
+        release_pending = True
+        try:
+            async with self._job_slots():
+                for attempt in range(2):
+                    try:
+                        executor, future = self._submit_to_executor(fn, args)
+                    except BrokenProcessPool:
+                        continue
+                    try:
+                        result = await asyncio.wait_for(
+                            asyncio.shield(asyncio.wrap_future(future)), timeout=self.job_timeout
+                        )
+                    except BrokenProcessPool:
+                        # A worker died; the job may have been running on it
+                        self._replace_broken(executor)
+                        continue
+                    except asyncio.TimeoutError:
+                        # The stuck worker cannot be interrupted, so retire its
+                        # executor and let the job run to completion in the
+                        # background, still counted as pending
+                        release_pending = False
+                        future.add_done_callback(self._release_pending)
+                        with self._lock:
+                            self._timed_out += 1
+                            if self._executor is executor:
+                                self._retire_locked()
+                        raise OCRJobTimeout(f"OCR job did not finish within {self.job_timeout:.1f}s")
+                    except asyncio.CancelledError:
+                        release_pending = False
+                        future.add_done_callback(self._release_pending)
+                        raise
+                    except Exception:
+                        with self._lock:
+                            self._failed += 1
+                        raise
+                    with self._lock:
+                        self._completed += 1
+                    return result
+            with self._lock:
+                self._failed += 1
+            raise OCRPoolUnavailable("OCR worker process crashed")
+        finally:
+            if release_pending:
+                self._release_pending()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the pool's configuration and counters.
+        """
+        with self._lock:
+            return {
+                "running": self.running,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "job_timeout": self.job_timeout,
+                "max_jobs_per_worker": self.max_jobs_per_worker,
+                "max_retired": self.max_retired,
+                "pending": self._pending,
+                "retired_executors": len(self._retired),
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+            }
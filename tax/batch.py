@@ -0,0 +1,140 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.models import DeductionType, FilingStatus, TaxBreakdown, TaxResult
+from tax.calculator import generate_income_tax_insights
+from tax.tables import tax_tables
+
+def lookup_codes(values: Sequence) -> Tuple[List[str], np.ndarray]:
+    """
+    The distinct values of a column, with enum members as their values,
+    and each row's index into them.
+    """
+    if not (isinstance(values, np.ndarray) and values.dtype.kind == "U"):
+        values = np.array([getattr(value, "value", value) for value in values], dtype=str)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    return distinct.tolist(), inverse
+
+class IncomeTaxBatch:
+    """
+    Income taxes of many scenarios as arrays. TaxResult objects, with their
+    breakdown and insights, are only built for the rows asked for.
+    """
+    def __init__(self, annual_income: np.ndarray, filing_status: np.ndarray, federal_tax: np.ndarray,
+                 marginal_rate: np.ndarray, bracket: np.ndarray, state_tax: np.ndarray, state_tax_rate: np.ndarray, social_security_tax: np.ndarray,
+                 medicare_tax: np.ndarray, total_tax: np.ndarray, effective_rate: np.ndarray):
+        self.annual_income = annual_income
+        self.filing_status = filing_status
+        self.federal_tax = federal_tax
+        # Federal marginal rate (0-1) and bracket index of each scenario
+        self.marginal_rate = marginal_rate
+        self.bracket = bracket
+        self.state_tax = state_tax
+        self.state_tax_rate = state_tax_rate
+        self.social_security_tax = social_security_tax
+        self.medicare_tax = medicare_tax
+        self.total_tax = total_tax
+        self.effective_rate = effective_rate
+
+    def __len__(self) -> int:
+        return len(self.total_tax)
+
+    def result(self, row: int) -> TaxResult:
+        """
+        The TaxResult calculate_income_tax gives for one row.
+        """
+        annual_income = float(self.annual_income[row])
+        federal_tax = float(self.federal_tax[row])
+        state_tax = float(self.state_tax[row])
+        effective_rate = float(self.effective_rate[row])
+        breakdown = [
+            TaxBreakdown(name="Federal Income Tax", amount=federal_tax, rate=(federal_tax / annual_income) * 100 if annual_income > 0 else 0),
+            TaxBreakdown(name="State Income Tax", amount=state_tax, rate=float(self.state_tax_rate[row]) * 100),
+            TaxBreakdown(name="Social Security", amount=float(self.social_security_tax[row]), rate=6.2),
+            TaxBreakdown(name="Medicare", amount=float(self.medicare_tax[row]), rate=1.45)
+        ]
+        insights = generate_income_tax_insights(annual_income, federal_tax, state_tax, effective_rate,
+                                                FilingStatus(self.filing_status[row]))
+        return TaxResult(
+            federal_tax=federal_tax,
+            state_tax=state_tax,
+            total_tax=float(self.total_tax[row]),
+            effective_rate=effective_rate,
+            marginal_rate=float(self.marginal_rate[row]) * 100,
+            breakdown=breakdown,
+            insights=insights
+        )
+
+def calculate_income_tax_batch(
+    annual_income: Sequence[float],
+    filing_status: Sequence[str],
+    state: Sequence[str],
+    deduction_type: Sequence[str],
+    custom_deduction: Optional[Sequence[Optional[float]]] = None,
+    tax_year: Optional[int] = None
+) -> IncomeTaxBatch:
+    """
+    Calculate income tax for many scenarios at once, with the same results
+    as calling calculate_income_tax on each of them.
+
+    Each argument has one entry per scenario; a missing custom deduction is
+    None or NaN. All scenarios use the tables of ``tax_year``, or else the
+    default year. Federal tax is looked up with np.searchsorted in the
+    compiled bracket tables, one filing status at a time, and state tax,
+    Social Security and Medicare are computed over the whole batch.
+    """
+    tables = tax_tables.get(tax_year)
+    annual_income = np.asarray(annual_income, np.float64)
+    count = len(annual_income)
+    if custom_deduction is None:
+        custom_deduction = np.full(count, np.nan)
+    custom_deduction = np.array([np.nan if value is None else value for value in custom_deduction], np.float64)
+    if not count == len(filing_status) == len(state) == len(deduction_type) == len(custom_deduction):
+        raise ValueError("All scenario columns must have the same length")
+
+    statuses, status_codes = lookup_codes(filing_status)
+    statuses = [FilingStatus(status) for status in statuses]
+    deduction_types, deduction_codes = lookup_codes(deduction_type)
+    standard = np.array([DeductionType(value) == DeductionType.STANDARD for value in deduction_types], bool)[deduction_codes]
+
+    # Determine deduction amounts
+    standard_deduction = np.array([tables.standard_deduction[status] for status in statuses], np.float64)[status_codes]
+    deduction = np.where(standard, standard_deduction, np.nan_to_num(custom_deduction, nan=0.0))
+
+    # Calculate federal tax, one filing status at a time
+    taxable_income = np.maximum(0, annual_income - deduction)
+    federal_tax = np.zeros(count)
+    marginal_rate = np.zeros(count)
+    bracket = np.zeros(count, np.int64)
+    for code, status in enumerate(statuses):
+        rows = status_codes == code
+        federal_tax[rows], marginal_rate[rows], bracket[rows] = tables.federal_bracket_tables[status].lookup_many(taxable_income[rows])
+
+    # Calculate state tax (simplified), defaulting to 5% for unknown states
+    states, state_codes = lookup_codes(state)
+    state_rates: Dict[str, float] = {value: tables.state_income_tax_rates.get(value, 0.05) for value in states}
+    state_tax_rate = np.array([state_rates[value] for value in states], np.float64)[state_codes]
+    state_tax = annual_income * state_tax_rate
+
+    # Calculate Social Security and Medicare
+    social_security_tax = np.minimum(annual_income, 147000) * 0.062
+    medicare_tax = annual_income * 0.0145
+
+    total_tax = federal_tax + state_tax + social_security_tax + medicare_tax
+    positive = annual_income > 0
+    effective_rate = np.where(positive, total_tax / np.where(positive, annual_income, 1) * 100, 0.0)
+
+    return IncomeTaxBatch(
+        annual_income=annual_income,
+        filing_status=np.array([status.value for status in statuses], dtype=object)[status_codes],
+        federal_tax=federal_tax,
+        marginal_rate=marginal_rate,
+        bracket=bracket,
+        state_tax=state_tax,
+        state_tax_rate=state_tax_rate,
+        social_security_tax=social_security_tax,
+        medicare_tax=medicare_tax,
+        total_tax=total_tax,
+        effective_rate=effective_rate,
+    )
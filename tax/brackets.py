@@ -0,0 +1,69 @@
+from bisect import bisect_left
+from typing import NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+class BracketLookup(NamedTuple):
+    tax: float
+    marginal_rate: float
+    bracket: int
+
+class BracketTable(NamedTuple):
+    """
+    Tax brackets compiled for lookup: the income each bracket starts at, its
+    rate, and the tax owed on all income below its start. Tuples serve the
+    scalar path, where bisect on a tuple is fastest, and read-only arrays
+    with the same values serve the batch path.
+    """
+    thresholds: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    base_tax: Tuple[float, ...]
+    threshold_array: np.ndarray
+    rate_array: np.ndarray
+    base_tax_array: np.ndarray
+
+    def lookup(self, taxable_income: float) -> BracketLookup:
+        """
+        Tax on a taxable income, the rate its next dollar is taxed at, and
+        the index of its bracket.
+        """
+        # Income exactly at a threshold is the top of the bracket below it
+        bracket = bisect_left(self.thresholds, taxable_income) - 1
+        if bracket < 0:
+            return BracketLookup(0.0, self.rates[0], 0)
+        tax = self.base_tax[bracket] + (taxable_income - self.thresholds[bracket]) * self.rates[bracket]
+        return BracketLookup(tax, self.rates[bracket], bracket)
+
+    def lookup_many(self, taxable_income: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tax, marginal rate and bracket index of each taxable income, equal
+        to lookup on each of them.
+        """
+        bracket = np.searchsorted(self.threshold_array, taxable_income, side="left") - 1
+        taxed = bracket >= 0
+        bracket = np.maximum(bracket, 0)
+        tax = self.base_tax_array[bracket] + (taxable_income - self.threshold_array[bracket]) * self.rate_array[bracket]
+        return np.where(taxed, tax, 0.0), self.rate_array[bracket], bracket
+
+def read_only(values: Sequence[float]) -> np.ndarray:
+    array = np.array(values, np.float64)
+    array.setflags(write=False)
+    return array
+
+def compile_brackets(brackets: Sequence[Tuple[float, float, float]]) -> BracketTable:
+    """
+    Compile (lower, upper, rate) brackets into a BracketTable.
+
+    Published tables start each bracket a dollar above the previous one's
+    upper bound (10275, then 10276); each bracket is taken to start exactly
+    at the previous upper bound, so no income falls between brackets.
+    """
+    thresholds = [float(brackets[0][0])] + [float(upper) for _, upper, _ in brackets[:-1]]
+    rates = [float(rate) for _, _, rate in brackets]
+    base_tax = [0.0]
+    for bracket in range(1, len(brackets)):
+        base_tax.append(base_tax[-1] + (thresholds[bracket] - thresholds[bracket - 1]) * rates[bracket - 1])
+    return BracketTable(
+        tuple(thresholds), tuple(rates), tuple(base_tax),
+        read_only(thresholds), read_only(rates), read_only(base_tax),
+    )
@@ -1,154 +1,67 @@
 from typing import Dict, List, Optional, Any
 from models.models import TaxResult, TaxBreakdown, FilingStatus, DeductionType
+from tax.brackets import BracketLookup
+from tax.tables import TaxTables, tax_tables
 
-# Tax brackets for 2023 (simplified)
-FEDERAL_TAX_BRACKETS = {
-    FilingStatus.SINGLE: [
-        (0, 10275, 0.10),
-        (10276, 41775, 0.12),
-        (41776, 89075, 0.22),
-        (89076, 170050, 0.24),
-        (170051, 215950, 0.32),
-        (215951, 539900, 0.35),
-        (539901, float('inf'), 0.37)
-    ],
-    FilingStatus.MARRIED_JOINT: [
-        (0, 20550, 0.10),
-        (20551, 83550, 0.12),
-        (83551, 178150, 0.22),
-        (178151, 340100, 0.24),
-        (340101, 431900, 0.32),
-        (431901, 647850, 0.35),
-        (647851, float('inf'), 0.37)
-    ],
-    FilingStatus.MARRIED_SEPARATE: [
-        (0, 10275, 0.10),
-        (10276, 41775, 0.12),
-        (41776, 89075, 0.22),
-        (89076, 170050, 0.24),
-        (170051, 215950, 0.32),
-        (215951, 323925, 0.35),
-        (323926, float('inf'), 0.37)
-    ],
-    FilingStatus.HEAD: [
-        (0, 14650, 0.10),
-        (14651, 55900, 0.12),
-        (55901, 89050, 0.22),
-        (89051, 170050, 0.24),
-        (170051, 215950, 0.32),
-        (215951, 539900, 0.35),
-        (539901, float('inf'), 0.37)
-    ]
+# Tables of the default tax year, for callers that read them directly as
+# module attributes. They are looked up when read, so importing this module
+# does not need the table files.
+DEFAULT_TABLE_ALIASES = {
+    "FEDERAL_TAX_BRACKETS": "federal_tax_brackets",
+    "FEDERAL_BRACKET_TABLES": "federal_bracket_tables",
+    "STANDARD_DEDUCTION": "standard_deduction",
+    "STATE_INCOME_TAX_RATES": "state_income_tax_rates",
+    "SALES_TAX_RATES": "sales_tax_rates",
+    "PROPERTY_TAX_RATES": "property_tax_rates",
 }
 
-# Standard deduction amounts for 2023
-STANDARD_DEDUCTION = {
-    FilingStatus.SINGLE: 12950,
-    FilingStatus.MARRIED_JOINT: 25900,
-    FilingStatus.MARRIED_SEPARATE: 12950,
-    FilingStatus.HEAD: 19400
-}
+def __getattr__(name: str) -> Any:
+    if name in DEFAULT_TABLE_ALIASES:
+        return getattr(tax_tables.get(), DEFAULT_TABLE_ALIASES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# State income tax rates (simplified)
-STATE_INCOME_TAX_RATES = {
-    "CA": 0.093,
-    "NY": 0.085,
-    "TX": 0.0,
-    "FL": 0.0,
-    "IL": 0.0495,
-    "WA": 0.0,
-    "NV": 0.0,
-    "AZ": 0.045,
-    "CO": 0.0455,
-    "GA": 0.0575,
-    "MA": 0.05,
-    "MI": 0.0425,
-    "OH": 0.0399,
-    "PA": 0.0307,
-    "VA": 0.0575
-}
-
-# Sales tax rates by state (simplified)
-SALES_TAX_RATES = {
-    "CA": 0.0725,
-    "NY": 0.045,
-    "TX": 0.0625,
-    "FL": 0.06,
-    "IL": 0.0625,
-    "WA": 0.065,
-    "NV": 0.0685,
-    "AZ": 0.056,
-    "CO": 0.029,
-    "GA": 0.04,
-    "MA": 0.0625,
-    "MI": 0.06,
-    "OH": 0.0575,
-    "PA": 0.06,
-    "VA": 0.053
-}
-
-# Property tax rates by state (simplified)
-PROPERTY_TAX_RATES = {
-    "CA": 0.0077,
-    "NY": 0.0172,
-    "TX": 0.0181,
-    "FL": 0.0098,
-    "IL": 0.0227,
-    "WA": 0.0103,
-    "NV": 0.0069,
-    "AZ": 0.0077,
-    "CO": 0.0055,
-    "GA": 0.0092,
-    "MA": 0.0123,
-    "MI": 0.0158,
-    "OH": 0.0157,
-    "PA": 0.0158,
-    "VA": 0.0080
-}
+def federal_tax_bracket(income: float, filing_status: FilingStatus, deduction: float,
+                        tables: Optional[TaxTables] = None) -> BracketLookup:
+    """
+    Federal income tax after deductions, with the marginal rate and index of
+    the bracket the taxable income falls in.
+    """
+    tables = tables or tax_tables.get()
+    taxable_income = max(0, income - deduction)
+    return tables.federal_bracket_tables[filing_status].lookup(taxable_income)
 
-def calculate_federal_income_tax(income: float, filing_status: FilingStatus, deduction: float) -> float:
+def calculate_federal_income_tax(income: float, filing_status: FilingStatus, deduction: float,
+                                 tax_year: Optional[int] = None) -> float:
     """
     Calculate federal income tax based on income, filing status, and deductions.
     """
-    # Apply deduction
-    taxable_income = max(0, income - deduction)
-    
-    # Get the appropriate tax brackets
-    brackets = FEDERAL_TAX_BRACKETS[filing_status]
-    
-    # Calculate tax
-    tax = 0
-    for lower, upper, rate in brackets:
-        if taxable_income > lower:
-            bracket_income = min(taxable_income, upper) - lower
-            tax += bracket_income * rate
-            
-            if taxable_income <= upper:
-                break
-    
-    return tax
+    return federal_tax_bracket(income, filing_status, deduction, tax_tables.get(tax_year)).tax
 
 def calculate_income_tax(
     annual_income: float,
     filing_status: FilingStatus,
     state: str,
     deduction_type: DeductionType,
-    custom_deduction: Optional[float] = None
+    custom_deduction: Optional[float] = None,
+    tax_year: Optional[int] = None
 ) -> TaxResult:
     """
-    Calculate income tax based on provided information.
+    Calculate income tax based on provided information, with the tables of
+    ``tax_year`` or else the default year.
     """
+    tables = tax_tables.get(tax_year)
+    
     # Determine deduction amount
     if deduction_type == DeductionType.STANDARD:
-        deduction = STANDARD_DEDUCTION[filing_status]
+        deduction = tables.standard_deduction[filing_status]
     else:  # Itemized
         deduction = custom_deduction if custom_deduction is not None else 0
     
     # Calculate federal tax
-    federal_tax = calculate_federal_income_tax(annual_income, filing_status, deduction)
+    federal_tax, marginal_rate, _ = federal_tax_bracket(annual_income, filing_status, deduction, tables)
     
     # Calculate state tax (simplified)
-    state_tax_rate = STATE_INCOME_TAX_RATES.get(state, 0.05)  # Default to 5% if state not found
+    state_tax_rate = tables.state_income_tax_rates.get(state, 0.05)  # Default to 5% if state not found
     state_tax = annual_income * state_tax_rate
     
     # Calculate Social Security and Medicare
@@ -175,6 +88,7 @@ def calculate_income_tax(
         state_tax=state_tax,
         total_tax=total_tax,
         effective_rate=effective_rate,
+        marginal_rate=marginal_rate * 100,
         breakdown=breakdown,
         insights=insights
     )
@@ -182,13 +96,16 @@ def calculate_income_tax(
 def calculate_sales_tax(
     purchase_amount: float,
     state: str,
-    is_essential: bool = False
+    is_essential: bool = False,
+    tax_year: Optional[int] = None
 ) -> TaxResult:
     """
     Calculate sales tax for a purchase.
     """
+    tables = tax_tables.get(tax_year)
+    
     # Get base sales tax rate for the state
-    base_rate = SALES_TAX_RATES.get(state, 0.06)  # Default to 6% if state not found
+    base_rate = tables.sales_tax_rates.get(state, 0.06)  # Default to 6% if state not found
     
     # Adjust rate for essential items if applicable
     adjusted_rate = base_rate * 0.5 if is_essential else base_rate
@@ -202,7 +119,7 @@ def calculate_sales_tax(
     ]
     
     # Generate insights
-    insights = generate_sales_tax_insights(purchase_amount, tax_amount, state, is_essential)
+    insights = generate_sales_tax_insights(purchase_amount, tax_amount, state, is_essential, tables)
     
     return TaxResult(
         federal_tax=0,
@@ -216,24 +133,21 @@ def calculate_sales_tax(
 def calculate_property_tax(
     property_value: float,
     state: str,
-    county: Optional[str] = None
+    county: Optional[str] = None,
+    tax_year: Optional[int] = None
 ) -> TaxResult:
     """
     Calculate property tax based on property value and location.
     """
-    # Get base property tax rate for the state
-    base_rate = PROPERTY_TAX_RATES.get(state, 0.01)  # Default to 1% if state not found
+    tables = tax_tables.get(tax_year)
+    state = state.strip().upper()
     
-    # County adjustments would be applied here in a real implementation
-    # For this example, we'll use a simple adjustment factor
-    county_adjustment = 1.0
-    if county:
-        # This would be a lookup in a real implementation
-        # For now, just a simple hash-based adjustment
-        county_adjustment = 0.9 + (hash(county) % 3) / 10  # Between 0.9 and 1.1
+    # Get base property tax rate for the state
+    base_rate = tables.property_tax_rates.get(state, 0.01)  # Default to 1% if state not found
     
-    # Calculate adjusted rate
-    adjusted_rate = base_rate * county_adjustment
+    # Use the county's own rate if the year's county rate table has it
+    county_rate = tables.county_property_tax_rates.rate(state, county) if county else None
+    adjusted_rate = county_rate if county_rate is not None else base_rate
     
     # Calculate tax amount
     tax_amount = property_value * adjusted_rate
@@ -244,7 +158,7 @@ def calculate_property_tax(
     ]
     
     # Generate insights
-    insights = generate_property_tax_insights(property_value, tax_amount, state, county)
+    insights = generate_property_tax_insights(property_value, tax_amount, state, county, tables)
     
     return TaxResult(
         federal_tax=0,
@@ -282,7 +196,8 @@ def generate_income_tax_insights(income: float, federal_tax: float, state_tax: f
     
     return " ".join(insights)
 
-def generate_sales_tax_insights(amount: float, tax: float, state: str, is_essential: bool) -> str:
+def generate_sales_tax_insights(amount: float, tax: float, state: str, is_essential: bool,
+                                tables: Optional[TaxTables] = None) -> str:
     """
     Generate insights for sales tax.
     """
@@ -290,7 +205,7 @@ def generate_sales_tax_insights(amount: float, tax: float, state: str, is_essent
     
     # Compare to national average
     national_avg_rate = 6.57  # Example national average sales tax rate
-    state_rate = SALES_TAX_RATES.get(state, 0.06) * 100
+    state_rate = (tables or tax_tables.get()).sales_tax_rates.get(state, 0.06) * 100
     
     if state_rate > national_avg_rate:
         insights.append(f"{state} has a higher sales tax rate than the national average of {national_avg_rate:.2f}%.")
@@ -307,7 +222,8 @@ def generate_sales_tax_insights(amount: float, tax: float, state: str, is_essent
     
     return " ".join(insights)
 
-def generate_property_tax_insights(value: float, tax: float, state: str, county: Optional[str]) -> str:
+def generate_property_tax_insights(value: float, tax: float, state: str, county: Optional[str],
+                                   tables: Optional[TaxTables] = None) -> str:
     """
     Generate insights for property tax.
     """
@@ -315,7 +231,7 @@ def generate_property_tax_insights(value: float, tax: float, state: str, county:
     
     # Compare to national average
     national_avg_rate = 1.07  # Example national average property tax rate
-    state_rate = PROPERTY_TAX_RATES.get(state, 0.01) * 100
+    state_rate = (tables or tax_tables.get()).property_tax_rates.get(state, 0.01) * 100
     
     if state_rate > national_avg_rate * 1.2:
         insights.append(f"{state} has significantly higher property tax rates than the national average of {national_avg_rate:.2f}%.")
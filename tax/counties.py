@@ -0,0 +1,55 @@
+import csv
+import re
+from bisect import bisect_left
+from typing import Iterable, Optional, Tuple
+
+NON_WORD = re.compile(r"[^a-z0-9]+")
+COUNTY_SUFFIX = re.compile(r" (county|parish|borough|census area|municipality)$")
+
+def normalize_county(county: str) -> str:
+    """
+    Normalize a county name for lookup: lowercase, punctuation removed and
+    a trailing "County", "Parish" or similar dropped, so "Miami-Dade County"
+    and "miami dade" are the same county.
+    """
+    name = NON_WORD.sub(" ", county.lower().replace("&", " and ")).strip()
+    name = re.sub(r"^st ", "saint ", name)
+    return COUNTY_SUFFIX.sub("", name)
+
+def county_key(state: str, county: str) -> str:
+    return f"{state.strip().upper()}\t{normalize_county(county)}"
+
+class CountyRateIndex:
+    """
+    Property tax rates by (state, normalized county), kept as a sorted tuple
+    of keys and a parallel tuple of rates and looked up by binary search.
+    The same file gives the same rates in every process.
+    """
+    def __init__(self, rows: Iterable[Tuple[str, str, float]]):
+        rates = {}
+        for state, county, rate in rows:
+            rates[county_key(state, county)] = float(rate)
+        self.keys = tuple(sorted(rates))
+        self.rates = tuple(rates[key] for key in self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def rate(self, state: str, county: str) -> Optional[float]:
+        """
+        The county's property tax rate, or None if it is not in the table.
+        """
+        key = county_key(state, county)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            return self.rates[position]
+        return None
+
+def load_county_rates(path: str) -> CountyRateIndex:
+    """
+    Load a county rate CSV, with state, county and rate columns. Lines
+    starting with # are comments.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(line for line in f if not line.startswith("#"))
+        return CountyRateIndex((row["state"], row["county"], row["rate"]) for row in reader)
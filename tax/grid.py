@@ -0,0 +1,127 @@
+import json
+import math
+import os
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from models.models import IncomeRange
+from tax.batch import calculate_income_tax_batch
+
+# Most scenarios one grid request may evaluate
+TAX_GRID_MAX_CELLS = int(os.environ.get("TAX_GRID_MAX_CELLS", "1000000"))
+
+# Values written per chunk of a streamed grid response
+GRID_CHUNK_VALUES = 65536
+
+GRID_AXES = ("income", "filing_status", "state", "deduction_type")
+GRID_COLUMNS = (
+    "federal_tax", "state_tax", "social_security_tax", "medicare_tax",
+    "total_tax", "effective_rate", "marginal_rate",
+)
+
+class TaxGridError(ValueError):
+    """
+    Raised when a grid request cannot be evaluated.
+    """
+
+class TaxGrid(NamedTuple):
+    axes: Dict[str, list]
+    shape: List[int]
+    columns: Dict[str, np.ndarray]
+
+def income_axis(incomes: Optional[Sequence[float]], income_range: Optional[IncomeRange],
+                max_cells: int = TAX_GRID_MAX_CELLS) -> np.ndarray:
+    """
+    The grid's incomes, from a list or an inclusive range.
+    """
+    if (incomes is None) == (income_range is None):
+        raise TaxGridError("Give either incomes or income_range")
+    if incomes is not None:
+        incomes = np.asarray(incomes, np.float64)
+        if not np.isfinite(incomes).all():
+            raise TaxGridError("incomes must be finite numbers")
+        return incomes
+    start, stop, step = income_range.start, income_range.stop, income_range.step
+    if not all(math.isfinite(value) for value in (start, stop, step)):
+        raise TaxGridError("income_range needs finite start, stop and step")
+    if step <= 0 or stop < start:
+        raise TaxGridError("income_range needs a positive step and stop >= start")
+    steps = (stop - start) / step
+    if not steps < max_cells:
+        raise TaxGridError(f"Grid has more than {max_cells} scenarios")
+    # A stop a whole number of steps away is included even when the
+    # division rounds just below it, as (0.3 - 0) / 0.1 does
+    nearest = round(steps)
+    count = (nearest if math.isclose(steps, nearest, rel_tol=1e-9) else math.floor(steps)) + 1
+    if count > max_cells:
+        raise TaxGridError(f"Grid has more than {max_cells} scenarios")
+    return start + np.arange(count) * step
+
+def evaluate_grid(incomes: np.ndarray, filing_statuses: Sequence[str], states: Sequence[str],
+                  deduction_types: Sequence[str], custom_deduction: Optional[float] = None,
+                  columns: Optional[Sequence[str]] = None, max_cells: int = TAX_GRID_MAX_CELLS,
+                  tax_year: Optional[int] = None) -> TaxGrid:
+    """
+    Income tax of every combination of income, filing status, state and
+    deduction type, in one batch. Columns are flattened in row-major order
+    over the axes, incomes varying slowest.
+    """
+    columns = list(columns) if columns else list(GRID_COLUMNS)
+    unknown = [column for column in columns if column not in GRID_COLUMNS]
+    if unknown:
+        raise TaxGridError(f"Unknown columns: {', '.join(unknown)}")
+    axes = {
+        "income": np.asarray(incomes, np.float64),
+        "filing_status": np.array([getattr(status, "value", status) for status in filing_statuses], dtype=str),
+        "state": np.array(states, dtype=str),
+        "deduction_type": np.array([getattr(value, "value", value) for value in deduction_types], dtype=str),
+    }
+    shape = [len(axes[axis]) for axis in GRID_AXES]
+    cells = int(np.prod(shape))
+    if cells == 0:
+        raise TaxGridError("Every axis needs at least one value")
+    if cells > max_cells:
+        raise TaxGridError(f"Grid has {cells} scenarios, more than {max_cells}")
+
+    # Index of each scenario along each axis
+    indexes = np.unravel_index(np.arange(cells), shape)
+    income, filing_status, state, deduction_type = (axes[axis][index] for axis, index in zip(GRID_AXES, indexes))
+    batch = calculate_income_tax_batch(
+        income, filing_status, state, deduction_type,
+        np.full(cells, np.nan if custom_deduction is None else custom_deduction), tax_year
+    )
+    values = {column: getattr(batch, column) for column in columns}
+    if "marginal_rate" in values:
+        # As a percentage, like effective_rate
+        values["marginal_rate"] = values["marginal_rate"] * 100
+    return TaxGrid({axis: axis_values.tolist() for axis, axis_values in axes.items()}, shape, values)
+
+def grid_header(grid: TaxGrid) -> Dict:
+    return {"shape": grid.shape, "axes": grid.axes, "columns": list(grid.columns)}
+
+def stream_grid_json(grid: TaxGrid) -> Iterator[str]:
+    """
+    The grid as one JSON object, with each column as an array of numbers,
+    written a chunk at a time.
+    """
+    header = json.dumps(grid_header(grid))
+    yield header[:-1] + ', "values": {'
+    for position, (name, column) in enumerate(grid.columns.items()):
+        yield f'{", " if position else ""}{json.dumps(name)}: ['
+        for start in range(0, len(column), GRID_CHUNK_VALUES):
+            chunk = json.dumps(column[start:start + GRID_CHUNK_VALUES].tolist())[1:-1]
+            yield f", {chunk}" if start else chunk
+        yield "]"
+    yield "}}"
+
+def stream_grid_float32(grid: TaxGrid) -> Iterator[bytes]:
+    """
+    The grid as a JSON header line, followed by each column in turn as
+    little-endian float32 values.
+    """
+    header = dict(grid_header(grid), dtype="<f4")
+    yield (json.dumps(header) + "\n").encode()
+    for column in grid.columns.values():
+        for start in range(0, len(column), GRID_CHUNK_VALUES):
+            yield column[start:start + GRID_CHUNK_VALUES].astype("<f4").tobytes()
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from models.models import FilingStatus
+from tax.brackets import BracketTable, compile_brackets
+from tax.counties import CountyRateIndex, load_county_rates
+
+logger = logging.getLogger(__name__)
+
+# Directory of per-year tax table files, named like 2023.json, each with an
+# optional county property tax rate file named like 2023_counties.csv
+TAX_TABLES_DIR = os.environ.get("TAX_TABLES_DIR", str(Path(__file__).parent / "data"))
+
+# Tax year used when a request does not give one
+DEFAULT_TAX_YEAR = int(os.environ.get("TAX_DEFAULT_YEAR", "2023"))
+
+# Seconds between checks of a loaded year's file for changes
+TAX_TABLES_CHECK_INTERVAL = float(os.environ.get("TAX_TABLES_CHECK_INTERVAL", "5"))
+
+# Seconds a year other than the default may go unused before its tables
+# are dropped from memory
+TAX_TABLES_IDLE_SECONDS = float(os.environ.get("TAX_TABLES_IDLE_SECONDS", "3600"))
+
+class UnknownTaxYear(LookupError):
+    """
+    Raised when there are no tax tables for a requested year.
+    """
+
+class TaxTables(NamedTuple):
+    """
+    One year's tax tables, compiled. Never changed once loaded: a reload
+    builds a new TaxTables, so a calculation that already holds one keeps
+    using the same tables throughout.
+    """
+    year: int
+    federal_tax_brackets: Dict[FilingStatus, List[Tuple[float, float, float]]]
+    federal_bracket_tables: Dict[FilingStatus, BracketTable]
+    standard_deduction: Dict[FilingStatus, float]
+    state_income_tax_rates: Dict[str, float]
+    sales_tax_rates: Dict[str, float]
+    property_tax_rates: Dict[str, float]
+    county_property_tax_rates: CountyRateIndex
+
+def parse_tax_tables(year: int, data: Dict[str, Any], county_rates: Optional[CountyRateIndex] = None) -> TaxTables:
+    """
+    Compile the contents of a tax table file. An upper bound of null in a
+    bracket means no upper bound.
+    """
+    if data.get("year", year) != year:
+        raise ValueError(f"Tables for {data['year']} in the file for {year}")
+    brackets = {}
+    for status in FilingStatus:
+        rows = data["federal_tax_brackets"][status.value]
+        brackets[status] = [
+            (float(lower), float('inf') if upper is None else float(upper), float(rate)) for lower, upper, rate in rows
+        ]
+    return TaxTables(
+        year=year,
+        federal_tax_brackets=brackets,
+        federal_bracket_tables={status: compile_brackets(rows) for status, rows in brackets.items()},
+        standard_deduction={status: float(data["standard_deduction"][status.value]) for status in FilingStatus},
+        state_income_tax_rates={state: float(rate) for state, rate in data["state_income_tax_rates"].items()},
+        sales_tax_rates={state: float(rate) for state, rate in data["sales_tax_rates"].items()},
+        property_tax_rates={state: float(rate) for state, rate in data["property_tax_rates"].items()},
+        county_property_tax_rates=county_rates if county_rates is not None else CountyRateIndex(()),
+    )
+
+def load_tax_tables(path: str, year: int, county_path: Optional[str] = None) -> TaxTables:
+    """
+    Load a year's tables, with its county rates if ``county_path`` exists.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    county_rates = load_county_rates(county_path) if county_path and os.path.exists(county_path) else None
+    return parse_tax_tables(year, data, county_rates)
+
+def file_version(path: str) -> Tuple[int, int]:
+    """
+    A file's modification time in nanoseconds and its size. The size also
+    changes with most edits made within one tick of a coarse mtime clock.
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+class LoadedYear:
+    """
+    A year's compiled tables with what is needed to notice its files
+    changing and to evict it when unused.
+    """
+    def __init__(self, tables: TaxTables, version: Tuple):
+        self.tables = tables
+        # Modification times in nanoseconds and sizes of the files when loaded
+        self.version = version
+        self.checked = time.monotonic()
+        self.used = time.monotonic()
+
+class TaxTableRegistry:
+    """
+    Per-year tax tables loaded from ``directory`` on first use.
+
+    A loaded year's files, its tables and its county rates, are checked
+    for changes at most every ``check_interval`` seconds as it is used, and reload() checks them all
+    at once (the app calls it on SIGHUP). Changed tables are compiled before
+    being swapped in, so requests never see half-loaded tables, and a file
+    that fails to load leaves the previous tables in use. Years other than
+    the default that go unused for ``idle_seconds`` are dropped from memory.
+    """
+    def __init__(self, directory: str = TAX_TABLES_DIR, default_year: int = DEFAULT_TAX_YEAR,
+                 check_interval: float = TAX_TABLES_CHECK_INTERVAL, idle_seconds: float = TAX_TABLES_IDLE_SECONDS):
+        self.directory = directory
+        self.default_year = default_year
+        self.check_interval = check_interval
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._years: Dict[int, LoadedYear] = {}
+
+        # Counters exposed through stats()
+        self.loads = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.evictions = 0
+
+    def path(self, year: int) -> str:
+        return os.path.join(self.directory, f"{year}.json")
+
+    def county_path(self, year: int) -> str:
+        return os.path.join(self.directory, f"{year}_counties.csv")
+
+    def _version(self, year: int) -> Tuple:
+        """
+        Versions of a year's table file and of its county rate file, which
+        is None while there is none.
+        """
+        try:
+            county_version = file_version(self.county_path(year))
+        except FileNotFoundError:
+            county_version = None
+        return file_version(self.path(year)), county_version
+
+    def available_years(self) -> List[int]:
+        """
+        Years with a table file, loaded or not.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[:-5]) for name in names if name.endswith(".json") and name[:-5].isdigit())
+
+    def get(self, year: Optional[int] = None) -> TaxTables:
+        """
+        The tables for ``year``, or the default year if None.
+        """
+        year = self.default_year if year is None else year
+        now = time.monotonic()
+        with self._lock:
+            loaded = self._years.get(year)
+            if loaded is not None:
+                loaded.used = now
+            self._evict_idle_locked(now)
+        if loaded is None:
+            return self._load(year)
+        if now - loaded.checked >= self.check_interval:
+            loaded.checked = now
+            self._reload_if_changed(year, loaded)
+            return self._years.get(year, loaded).tables
+        return loaded.tables
+
+    def _load(self, year: int) -> TaxTables:
+        path = self.path(year)
+        try:
+            version = self._version(year)
+        except FileNotFoundError:
+            raise UnknownTaxYear(f"No tax tables for {year} (no file {path})")
+        tables = load_tax_tables(path, year, self.county_path(year))
+        with self._lock:
+            # Another request may have loaded it meanwhile; either is current
+            loaded = self._years.setdefault(year, LoadedYear(tables, version))
+            self.loads += 1
+        return loaded.tables
+
+    def _reload_if_changed(self, year: int, loaded: LoadedYear) -> bool:
+        path = self.path(year)
+        try:
+            version = self._version(year)
+            if version == loaded.version:
+                return False
+            tables = load_tax_tables(path, year, self.county_path(year))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # A file being rewritten or a bad edit keeps the tables in use
+            logger.warning("Keeping the loaded %s tax tables: %s", year, e)
+            with self._lock:
+                self.reload_errors += 1
+            return False
+        replacement = LoadedYear(tables, version)
+        replacement.used = loaded.used
+        with self._lock:
+            self._years[year] = replacement
+            self.reloads += 1
+        logger.info("Reloaded %s tax tables from %s", year, path)
+        return True
+
+    def reload(self) -> int:
+        """
+        Reload every loaded year whose file changed. Returns how many were.
+        """
+        with self._lock:
+            loaded = list(self._years.items())
+        return sum(self._reload_if_changed(year, entry) for year, entry in loaded)
+
+    def _evict_idle_locked(self, now: float):
+        for year, loaded in list(self._years.items()):
+            if year != self.default_year and now - loaded.used > self.idle_seconds:
+                del self._years[year]
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the loaded years and the registry's load, reload and eviction counters.
+        """
+        with self._lock:
+            return {
+                "default_year": self.default_year,
+                "loaded_years": sorted(self._years),
+                "available_years": self.available_years(),
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "reload_errors": self.reload_errors,
+                "evictions": self.evictions,
+            }
+
+# Tables shared by the calculators and the app
+tax_tables = TaxTableRegistry()
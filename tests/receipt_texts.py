@@ -0,0 +1,206 @@
+"""
+Synthetic receipt OCR texts, and the receipt parser from before the
+single-pass parser as a reference to check it against. Used by the parser
+tests and benchmarks/bench_parser.py.
+"""
+import random
+import re
+from datetime import datetime
+
+from models.models import ReceiptItem
+from ocr.text_parser import scan_receipt_text
+
+MERCHANTS = ["BIG BAZAAR", "Cafe Coffee Day", "Apollo Pharmacy", "HP Petrol Pump", "PVR Cinemas",
+             "Reliance Smart", "Sharma Kirana Store", "Tuition Point", "Zerodha Broking", "xy"]
+HEADERS = ["TAX INVOICE", "Cash Memo", "RECEIPT", "Bill of Supply"]
+ITEMS = ["Milk", "Bread", "Atta 5kg", "Paneer", "Tea & Snacks", "Diesel", "Paracetamol", "Ticket",
+         "Rice - Basmati", "Soap", "Dal", "Onion"]
+MONTHS = ["Jan", "Feb", "March", "Apr", "May", "June", "Jul", "Aug", "Sept", "Oct", "Nov", "Dec", "JAN"]
+
+def random_date(rng):
+    day, month, year = rng.randint(1, 31), rng.randint(1, 13), rng.choice([2023, 2024, 2025])
+    separator = rng.choice("/-.")
+    style = rng.randrange(6)
+    if style == 0:
+        return f"{day:02d}{separator}{month:02d}{separator}{year}"
+    if style == 1:
+        return f"{day}{separator}{month}{separator}{year % 100:02d}"
+    if style == 2:
+        return f"{month:02d}/{day:02d}/{year}"
+    if style == 3:
+        return f"{day} {rng.choice(MONTHS)} {rng.choice([year, year % 100])}"
+    if style == 4:
+        return f"{day}/{month}-{year}"
+    return f"{day}{separator}{month}{separator}{rng.choice(['202', '2024 10:45'])}"
+
+def random_amount(rng):
+    amount = rng.uniform(1, 250000)
+    style = rng.randrange(4)
+    if style == 0:
+        return f"{amount:.2f}"
+    if style == 1:
+        return f"{amount:,.2f}"
+    if style == 2:
+        return str(int(amount))
+    return f"{int(amount)}/-"
+
+def synthetic_texts(count, seed=0):
+    """
+    Generate ``count`` synthetic receipt OCR texts.
+    """
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        lines = []
+        if rng.random() < 0.4:
+            lines.append(rng.choice(HEADERS))
+        lines.append(rng.choice(MERCHANTS))
+        if rng.random() < 0.3:
+            lines.append("GSTIN: 29ABCDE1234F1Z5")
+        if rng.random() < 0.9:
+            lines.append(rng.choice(["Date: ", "Dt ", "", "Bill Date : "]) + random_date(rng))
+        for _ in range(rng.randint(0, 25)):
+            name = rng.choice(ITEMS)
+            style = rng.randrange(3)
+            if style == 0:
+                lines.append(f"{name}  {rng.randint(1, 5)} x {random_amount(rng)}")
+            elif style == 1:
+                lines.append(f"{name}    {rng.choice(['Rs.', 'Rs', '₹', ''])}{random_amount(rng)}")
+            else:
+                lines.append(name)
+        if rng.random() < 0.6:
+            lines.append(f"Sub Total {random_amount(rng)}")
+        if rng.random() < 0.5:
+            lines.append(f"CGST @ 9% {random_amount(rng)}")
+            lines.append(f"SGST @ 9% {random_amount(rng)}")
+        lines.append(rng.choice(["Total", "Grand Total", "Net Total:", "Amount Payable", "TOTAL AMOUNT",
+                                 "Rs.", "Sum", "Amount Due"]) + " " + random_amount(rng))
+        if rng.random() < 0.3:
+            lines.append(f"Cash {random_amount(rng)}  Change {random_amount(rng)}")
+        if rng.random() < 0.3:
+            lines.append("Thank you! Visit again")
+        noise = rng.random()
+        if noise < 0.2:
+            lines.insert(rng.randrange(len(lines) + 1), "  ")
+        texts.append("\n".join(lines))
+    return texts
+
+def legacy_parse_receipt_text(text):
+    """
+    The previous parse_receipt_text, without categorization. Returns
+    (merchant, date or None, total, receipt_type, [(item name, price)]).
+    """
+    lines = text.split('\n')
+    lines = [line.strip() for line in lines if line.strip()]
+    merchant = ""
+    date = None
+    total = 0.0
+    receipt_type = "General"
+    items = []
+    if lines:
+        merchant = lines[0]
+        if len(merchant) < 3 or any(word in merchant.lower() for word in ['receipt', 'invoice', 'bill', 'cash memo']):
+            if len(lines) > 1:
+                merchant = lines[1]
+    date_patterns = [
+        r'(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+        r'(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',
+        r'Date\s*:?\s*(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})',
+        r'Date\s*:?\s*(\d{1,2}\s+(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s+\d{2,4})',
+    ]
+    for line in lines:
+        for pattern in date_patterns:
+            date_match = re.search(pattern, line, re.IGNORECASE)
+            if date_match:
+                date_str = date_match.group(1)
+                try:
+                    for fmt in ['%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y', '%d.%m.%y',
+                               '%d %b %Y', '%d %B %Y']:
+                        try:
+                            date = datetime.strptime(date_str, fmt)
+                            break
+                        except ValueError:
+                            continue
+                except:
+                    date = datetime.now()
+                break
+        if date:
+            break
+    receipt_type_keywords = {
+        "Food": ["restaurant", "cafe", "food", "dining", "meal", "lunch", "dinner", "breakfast"],
+        "Grocery": ["grocery", "supermarket", "mart", "store", "kirana", "provision"],
+        "Medical": ["pharmacy", "medical", "medicine", "hospital", "clinic", "doctor", "healthcare"],
+        "Utility": ["electricity", "water", "gas", "utility", "bill", "broadband", "internet", "phone"],
+        "Transportation": ["travel", "transport", "fuel", "petrol", "diesel", "gas", "taxi", "uber", "ola"],
+        "Entertainment": ["movie", "cinema", "theatre", "entertainment", "game", "play"],
+        "Shopping": ["mall", "shop", "store", "retail", "clothing", "apparel", "electronics"],
+        "Education": ["school", "college", "university", "tuition", "course", "class", "education"],
+        "Investment": ["investment", "mutual fund", "stock", "share", "bond", "deposit", "fd", "rd"]
+    }
+    text_lower = text.lower()
+    for type_name, keywords in receipt_type_keywords.items():
+        if any(keyword in text_lower for keyword in keywords):
+            receipt_type = type_name
+            break
+    total_patterns = [
+        r'total\s*(?:amount)?(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+        r'(?:grand|net|final)\s+total\s*(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+        r'amount\s*(?:payable|paid|due)(?:\s*:)?\s*(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+        r'(?:Rs\.?|₹)\s*(\d+(?:[.,]\d+)?)\s*(?:only|/-)?',
+        r'(?:total|amount|sum)(?:\s|$).*?(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+    ]
+    for line in lines:
+        for pattern in total_patterns:
+            total_match = re.search(pattern, line, re.IGNORECASE)
+            if total_match:
+                try:
+                    amount_str = total_match.group(1).replace(',', '')
+                    total = float(amount_str)
+                    break
+                except:
+                    continue
+        if total > 0:
+            break
+    item_patterns = [
+        r'([A-Za-z0-9\s\&\-]+)\s+(?:\d+(?:\.\d+)?)?\s*(?:x\s*)?(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+        r'([A-Za-z0-9\s\&\-]+)\s+(?:Rs\.?|₹)?\s*(\d+(?:[.,]\d+)?)',
+    ]
+    for line in lines:
+        if any(word in line.lower() for word in ['total', 'subtotal', 'tax', 'amount', 'change', 'cash', 'credit', 'card', 'gst', 'cgst', 'sgst']):
+            continue
+        for pattern in item_patterns:
+            item_match = re.search(pattern, line)
+            if item_match:
+                item_name = item_match.group(1).strip()
+                try:
+                    item_price = float(item_match.group(2).replace(',', ''))
+                    if item_price > 0 and len(item_name) > 1:
+                        items.append(ReceiptItem(name=item_name, price=item_price))
+                except:
+                    continue
+    return merchant, date, total, receipt_type, [(item.name, item.price) for item in items]
+
+def scan_fields(text):
+    """
+    The fields of scan_receipt_text that legacy_parse_receipt_text also extracts.
+    """
+    parsed = scan_receipt_text(text)
+    items = [(item.name, item.price) for item in parsed.items]
+    return parsed.merchant, parsed.date, parsed.total, parsed.receipt_type, items
+
+# Date formats the legacy parser could read
+LEGACY_DATE_FORMATS = {'%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y', '%d.%m.%y',
+                       '%d %b %Y', '%d %B %Y'}
+
+def matches_legacy(text):
+    """
+    Whether scan_receipt_text agrees with legacy_parse_receipt_text. Dates
+    may differ when the new parser read one the legacy parser could not (US
+    order, year first, 2-digit years or abbreviations like "Sept" with
+    month names).
+    """
+    legacy = legacy_parse_receipt_text(text)
+    current = scan_fields(text)
+    if legacy[1] is None or scan_receipt_text(text).date_format not in LEGACY_DATE_FORMATS:
+        return legacy[:1] + legacy[2:] == current[:1] + current[2:]
+    return legacy == current
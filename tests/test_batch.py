@@ -0,0 +1,55 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.batch import process_receipt_batch
+
+class FakePool:
+    """Stands in for the worker pool, finishing later images first."""
+    max_workers = 4
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def run(self, fn, contents):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01 * (10 - int(contents)))
+        self.active -= 1
+        if contents == b"3":
+            raise ValueError("Could not decode image")
+        return contents.decode()
+
+def test_batch_streams_results_as_they_finish():
+    """Test that batch results arrive in completion order with inline errors"""
+    pool = FakePool()
+    images = [(f"r{i}.jpg", str(i).encode()) for i in range(8)] + [("notes.txt", None)]
+    
+    async def collect():
+        return [result async for result in process_receipt_batch(pool, images, concurrency=8)]
+    results = asyncio.run(collect())
+    
+    assert len(results) == 9
+    assert results[0]["filename"] == "notes.txt"
+    assert results[0]["status"] == "error"
+    assert [r["index"] for r in results[1:]] == [7, 6, 5, 4, 3, 2, 1, 0]
+    failed = [r for r in results if r["index"] == 3][0]
+    assert failed["status"] == "error"
+    assert failed["error"] == "Could not decode image"
+    assert all(r["receipt"] == str(r["index"]) for r in results if r["status"] == "ok")
+
+def test_batch_limits_concurrency():
+    """Test that a batch never has more images in the pool than allowed"""
+    pool = FakePool()
+    images = [(f"r{i}.jpg", b"9") for i in range(10)]
+    
+    async def collect():
+        return [result async for result in process_receipt_batch(pool, images)]
+    results = asyncio.run(collect())
+    
+    assert len(results) == 10
+    assert pool.peak == pool.max_workers
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization.bulk import bulk_format, categorize_stream
+from categorization.categorizer import categorize_transaction
+
+def categorize_body(body: bytes, fmt: str, chunk_bytes: int = 7, chunk_rows: int = 2, **kwargs):
+    """Stream the body in small chunks that split lines and characters, and collect the results"""
+    async def chunks():
+        for start in range(0, len(body), chunk_bytes):
+            yield body[start:start + chunk_bytes]
+
+    async def collect():
+        return [result async for result in categorize_stream(chunks(), fmt, chunk_rows, **kwargs)]
+    return asyncio.run(collect())
+
+def test_bulk_ndjson():
+    """Test that NDJSON rows are categorized in order with inline errors"""
+    rows = [
+        {"id": "t1", "merchant": "Kroger", "amount": 85.75, "description": "Weekly grocery shopping"},
+        {"merchant": "Comcast", "amount": "79.99", "description": "Internet bill"},
+        {"merchant": "ACME Corp", "amount": 3500, "description": "Direct Deposit - Salary"},
+    ]
+    body = "\n".join(json.dumps(row) for row in rows) + "\n\nnot json\n[1, 2]\n"
+    body += json.dumps({"merchant": "Café Ré", "amount": "ten"})
+    results = categorize_body(body.encode(), "ndjson")
+
+    assert [result["index"] for result in results] == list(range(6))
+    assert results[0]["id"] == "t1"
+    assert "id" not in results[1]
+    assert [result["category"] for result in results[:3]] == [
+        categorize_transaction(row["merchant"], float(row["amount"]), row["description"]) for row in rows
+    ]
+    assert results[2]["category"] == "Income"
+    assert [result["status"] for result in results[3:]] == ["error"] * 3
+    assert results[3]["error"].startswith("Invalid JSON")
+
+def test_bulk_csv():
+    """Test CSV rows with a header, quoted fields and newlines inside quotes"""
+    body = (
+        "﻿ID,Merchant,Amount,Description\r\n"
+        "1,Kroger,85.75,Weekly grocery shopping\r\n"
+        '2,"City Power & Light","1,085.30","Monthly\nelectric, bill"\r\n'
+        "3,Shell\r\n"
+        "4,Starbucks,,Coffee\r\n"
+    )
+    results = categorize_body(body.encode(), "csv")
+
+    assert [result.get("id") for result in results] == ["1", "2", None, "4"]
+    assert results[0]["category"] == "Groceries"
+    assert results[1]["category"] == "Utilities"
+    assert results[2]["status"] == "error"
+    assert results[3]["category"] == categorize_transaction("Starbucks", 0, "Coffee")
+
+def test_bulk_line_too_long():
+    """Test that a body without newlines is not buffered past the line limit"""
+    body = b'{"merchant": "' + b"x" * 1000 + b'"}'
+    results = categorize_body(body, "ndjson", chunk_bytes=100, max_line_bytes=500)
+    assert len(results) == 1
+    assert results[0]["status"] == "error"
+
+def test_bulk_csv_stray_quote():
+    """Test that a stray quote in a CSV body does not buffer the rest of it"""
+    body = "merchant,amount,description\n" + 'Joe"s Diner,12,Lunch\n'
+    body += "".join(f"Kroger,{n},Groceries\n" for n in range(20))
+    results = categorize_body(body.encode(), "csv", max_line_bytes=100)
+    assert results[0]["status"] == "error"
+    assert results[0]["error"].startswith("Quoted field longer than")
+    assert len(results) > 10
+    assert all(result["category"] == "Groceries" for result in results[1:])
+
+def test_bulk_format():
+    """Test choosing the format from the parameter or the content type"""
+    assert bulk_format("application/x-ndjson") == "ndjson"
+    assert bulk_format("text/csv; charset=utf-8") == "csv"
+    assert bulk_format("text/csv", "NDJSON") == "ndjson"
+    assert bulk_format("multipart/form-data") is None
+    assert bulk_format(None, "xml") is None
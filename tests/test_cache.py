@@ -0,0 +1,131 @@
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.cache import OCRResultCache, receipt_cache_key
+from models.models import ReceiptData, ReceiptItem
+
+def make_receipt(total):
+    return ReceiptData(
+        merchant="GROCERY STORE",
+        date=datetime(2025, 5, 14),
+        total=total,
+        items=[ReceiptItem(name="Milk", price=4.99)]
+    )
+
+class Counter:
+    """Counts how many times the OCR computation actually runs."""
+    def __init__(self):
+        self.calls = 0
+
+    async def compute(self, total=22.5, delay=0.01):
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return make_receipt(total)
+
+def test_cache_key_depends_on_content():
+    """Test that cache keys address image content"""
+    assert receipt_cache_key(b"image") == receipt_cache_key(b"image")
+    assert receipt_cache_key(b"image") != receipt_cache_key(b"other")
+    # A merchant name given with the image can change its result
+    assert receipt_cache_key(b"image", "Corner  Deli") == receipt_cache_key(b"image", "corner deli")
+    assert receipt_cache_key(b"image", "Corner Deli") != receipt_cache_key(b"image")
+
+def test_memory_hits_and_coalescing():
+    """Test memory hits and that concurrent identical requests share one run"""
+    cache = OCRResultCache(max_entries=2)
+    counter = Counter()
+    
+    async def scenario():
+        key = receipt_cache_key(b"image")
+        results = await asyncio.gather(*(cache.get_or_compute(key, counter.compute) for _ in range(5)))
+        again = await cache.get_or_compute(key, counter.compute)
+        return results, again
+    results, again = asyncio.run(scenario())
+    
+    assert counter.calls == 1
+    assert all(result.total == 22.5 for result in results)
+    # Callers get independent copies
+    results[0].items.append(ReceiptItem(name="Bread", price=3.49))
+    assert len(again.items) == 1
+    
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["memory_hits"] == 1
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    """Test that cancelling the request that started a computation leaves the others waiting on it"""
+    cache = OCRResultCache(max_entries=2)
+    counter = Counter()
+
+    async def scenario():
+        key = receipt_cache_key(b"image")
+        compute = lambda: counter.compute(delay=0.05)
+        leader = asyncio.ensure_future(cache.get_or_compute(key, compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_compute(key, compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await waiter
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return result
+    result = asyncio.run(scenario())
+
+    assert result.total == 22.5
+    assert counter.calls == 1
+    assert cache.stats()["inflight"] == 0
+    assert cache.stats()["memory_entries"] == 1
+
+def test_memory_eviction_and_errors():
+    """Test LRU eviction and that failed computations are not cached"""
+    cache = OCRResultCache(max_entries=2)
+    counter = Counter()
+    
+    async def failing():
+        raise ValueError("Could not decode image")
+    
+    async def scenario():
+        for image in (b"a", b"b", b"c"):
+            await cache.get_or_compute(receipt_cache_key(image), counter.compute)
+        with pytest.raises(ValueError):
+            await cache.get_or_compute(receipt_cache_key(b"bad"), failing)
+        await cache.get_or_compute(receipt_cache_key(b"a"), counter.compute)
+    asyncio.run(scenario())
+    
+    assert counter.calls == 4
+    assert cache.stats()["memory_evictions"] == 2
+    assert cache.stats()["memory_entries"] == 2
+
+def test_disk_tier(tmp_path):
+    """Test that results survive in the disk tier and it stays within its size"""
+    path = str(tmp_path / "ocr-cache.sqlite")
+    counter = Counter()
+    
+    async def fill(cache, images):
+        for image in images:
+            await cache.get_or_compute(receipt_cache_key(image), counter.compute)
+    
+    cache = OCRResultCache(max_entries=1, disk_path=path, disk_max_bytes=10_000)
+    asyncio.run(fill(cache, [b"a", b"b"]))
+    cache.close()
+    
+    reopened = OCRResultCache(max_entries=1, disk_path=path, disk_max_bytes=10_000)
+    asyncio.run(fill(reopened, [b"a", b"b"]))
+    assert counter.calls == 2
+    assert reopened.stats()["disk_hits"] == 2
+    reopened.close()
+    
+    small = OCRResultCache(max_entries=1, disk_path=path, disk_max_bytes=300)
+    asyncio.run(fill(small, [b"c", b"d", b"e"]))
+    stats = small.stats()
+    assert stats["disk_bytes"] <= 300
+    assert stats["disk_evictions"] > 0
+    small.close()
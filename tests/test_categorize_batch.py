@@ -0,0 +1,39 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization.batch import categorize_batch
+from categorization.categorizer import CATEGORY_KEYWORDS, categorize_transaction
+from tests.transactions import synthetic_transactions
+
+TRANSACTIONS = [
+    ("Kroger", 85.75, "Weekly grocery shopping"),
+    ("Whole Foods", 120.50, ""),
+    ("Starbucks", 5.25, "Coffee"),
+    ("City Power & Light", 85.30, "Monthly electric bill"),
+    ("Comcast", 79.99, "Internet bill"),
+    ("ACME Corp", 3500.00, "Direct Deposit - Salary"),
+    ("Payroll", 2800.00, "Bi-weekly deposit"),
+    ("Payroll", 200.00, "Bi-weekly deposit"),
+    ("Landlord LLC", 1200.00, "Rent payment"),
+    ("Zzz", 10.00, ""),
+]
+
+def test_batch_matches_scalar():
+    """Test that the batch categorizer agrees with categorize_transaction"""
+    transactions = TRANSACTIONS + synthetic_transactions(2000, CATEGORY_KEYWORDS, random.Random(0))
+    merchants, amounts, descriptions = zip(*transactions)
+    categories = categorize_batch(merchants, amounts, descriptions)
+    assert list(categories) == [categorize_transaction(*transaction) for transaction in transactions]
+
+def test_batch_without_descriptions():
+    """Test batches of merchants and amounts only, and empty batches"""
+    assert list(categorize_batch(["Kroger", "Zzz"], [10, 10])) == ["Groceries", "Other"]
+    assert len(categorize_batch([], [])) == 0
+    with pytest.raises(ValueError):
+        categorize_batch(["Kroger"], [10, 20])
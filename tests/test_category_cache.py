@@ -0,0 +1,128 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization import categorizer
+from categorization.bulk import categorize_rows
+from categorization.cache import CategoryCache
+from categorization.categorizer import categorize_transaction
+
+def test_cache_hits_and_eviction():
+    """Test that repeated transactions are served from the bounded memo"""
+    cache = CategoryCache(max_entries=2)
+    assert cache.categorize("Kroger", 85.75, "Weekly grocery shopping") == "Groceries"
+    assert cache.categorize("  KROGER ", 12.00, "weekly  grocery shopping") == "Groceries"
+    assert cache.categorize("Comcast", 79.99, "Internet bill") == "Utilities"
+    assert cache.categorize("Payroll", 2800.00, "Bi-weekly deposit") == "Income"
+    # The amount only matters through the income threshold
+    assert cache.categorize("Payroll", 200.00, "Bi-weekly deposit") == categorize_transaction("Payroll", 200.00, "Bi-weekly deposit")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 2
+    assert stats["hit_rate"] == 0.2
+
+def test_corrections_override_keywords():
+    """Test that a user's correction wins for every transaction of the merchant"""
+    cache = CategoryCache()
+    assert cache.categorize("Starbucks", 5.25, "Coffee") == categorize_transaction("Starbucks", 5.25, "Coffee")
+    cache.set_correction("STARBUCKS", "Food & Dining")
+    assert cache.categorize("Starbucks", 5.25, "Coffee") == "Food & Dining"
+    assert cache.categorize_many(["starbucks", "Kroger"], [3, 4], ["", ""]) == ["Food & Dining", "Groceries"]
+    assert cache.stats()["correction_hits"] == 2
+
+    assert cache.remove_correction("Starbucks")
+    assert not cache.remove_correction("Starbucks")
+    assert cache.categorize("Starbucks", 5.25, "Coffee") == categorize_transaction("Starbucks", 5.25, "Coffee")
+
+def test_categorize_many_matches_scalar():
+    """Test that cached batch categorization agrees with categorize_transaction"""
+    cache = CategoryCache()
+    merchants = ["Kroger", "Comcast", "Kroger", "ACME Corp", "Zzz"]
+    amounts = [10, 79.99, 10, 3500, 1]
+    descriptions = ["", "Internet bill", "", "Direct Deposit - Salary", ""]
+    expected = [categorize_transaction(*transaction) for transaction in zip(merchants, amounts, descriptions)]
+    assert cache.categorize_many(merchants, amounts, descriptions) == expected
+    assert cache.categorize_many(merchants, amounts, descriptions) == expected
+    assert cache.stats()["misses"] == 5
+    assert cache.stats()["entries"] == 4
+
+def test_persistence(tmp_path):
+    """Test that corrections and the warm set survive a restart"""
+    path = str(tmp_path / "categories.db")
+    cache = CategoryCache(path=path)
+    cache.categorize("Kroger", 10, "")
+    cache.set_correction("Corner Shop", "Groceries")
+    cache.close()
+
+    cache = CategoryCache(path=path)
+    assert cache.corrections() == {"corner shop": "Groceries"}
+    assert cache.categorize("Kroger", 10, "") == "Groceries"
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+def test_invalidated_when_keywords_change(tmp_path, monkeypatch):
+    """Test that categorizations made with old keyword lists are dropped"""
+    path = str(tmp_path / "categories.db")
+    cache = CategoryCache(path=path)
+    assert cache.categorize("Chipotle", 12.99, "Lunch") == "Other"
+    cache.close()
+
+    monkeypatch.setitem(categorizer.CATEGORY_KEYWORDS, "Food & Dining",
+                        categorizer.CATEGORY_KEYWORDS["Food & Dining"] + ["chipotle"])
+    categorizer.reload_keywords()
+    try:
+        cache = CategoryCache(path=path)
+        assert cache.stats()["entries"] == 0
+        assert cache.categorize("Chipotle", 12.99, "Lunch") == "Food & Dining"
+    finally:
+        monkeypatch.undo()
+        categorizer.reload_keywords()
+
+    # The cache notices the index being rebuilt while it is running
+    assert cache.categorize("Chipotle", 12.99, "Lunch") == "Other"
+    assert cache.stats()["invalidations"] == 1
+    cache.close()
+
+def test_invalidated_when_keywords_edited_in_place(tmp_path):
+    """Test that editing a keyword list in place drops categorizations made with it"""
+    path = str(tmp_path / "categories.db")
+    cache = CategoryCache(path=path)
+    assert cache.categorize("Chipotle", 12.99, "Lunch") == "Other"
+    cache.close()
+
+    food = categorizer.CATEGORY_KEYWORDS["Food & Dining"]
+    food.append("chipotle")
+    try:
+        cache = CategoryCache(path=path)
+        assert cache.stats()["entries"] == 0
+        assert cache.categorize("Chipotle", 12.99, "Lunch") == "Food & Dining"
+    finally:
+        food.remove("chipotle")
+    assert cache.categorize("Chipotle", 12.99, "Lunch") == "Other"
+    assert cache.stats()["invalidations"] == 1
+    cache.close()
+
+def test_warm_set_saved_in_background(tmp_path):
+    """Test that categorize hands the periodic write to a thread"""
+    path = str(tmp_path / "categories.db")
+    cache = CategoryCache(path=path, save_every=2)
+    cache.categorize("Kroger", 10, "")
+    cache.categorize("Comcast", 79.99, "Internet bill")
+    cache._saver.join()
+    assert len(cache.disk.load_categorizations(cache._fingerprint)) == 2
+    cache.close()
+
+def test_bulk_rows_use_cache():
+    """Test that bulk categorization applies corrections through the cache"""
+    cache = CategoryCache()
+    cache.set_correction("Landlord LLC", "Housing")
+    results = categorize_rows([{"merchant": "Landlord LLC", "amount": "1200"}, ValueError("bad row")], 0, cache)
+    assert results == [
+        {"index": 0, "status": "ok", "category": "Housing"},
+        {"index": 1, "status": "error", "error": "bad row"},
+    ]
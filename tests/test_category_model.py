@@ -0,0 +1,134 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization.batch import categorize_batch
+from categorization.cache import CategoryCache
+from categorization.categorizer import categorize_transaction
+from categorization.model import CategoryModel
+
+CORRECTIONS = [
+    ("Chipotle", "Food & Dining"),
+    ("Chipotle Mexican Grill", "Food & Dining"),
+    ("Corner Shop", "Groceries"),
+    ("Corner Shop Express", "Groceries"),
+    ("Landlord LLC", "Housing"),
+]
+
+def trained_model(path=None):
+    model = CategoryModel(path, n_features=4096)
+    for merchant, category in CORRECTIONS:
+        model.learn(merchant, "", category)
+    return model
+
+def test_untrained_model_defers_to_rules():
+    """Test that a model that has learned nothing changes no category"""
+    model = CategoryModel(n_features=4096)
+    assert model.predict("Chipotle") is None
+    assert categorize_transaction("Kroger", 10, "", model) == "Groceries"
+    assert categorize_transaction("Chipotle", 12.99, "Lunch", model) == "Other"
+
+def test_learns_from_corrections():
+    """Test that corrections carry over to merchants sharing their words"""
+    model = trained_model()
+    prediction = model.predict("CHIPOTLE #552", "Lunch")
+    assert prediction.category == "Food & Dining"
+    assert prediction.confidence >= model.min_confidence
+    assert categorize_transaction("CHIPOTLE #552", 12.99, "Lunch", model) == "Food & Dining"
+    assert categorize_transaction("Corner Shop 2", 8, "", model) == "Groceries"
+    assert model.documents == len(CORRECTIONS)
+    assert model.updates == len(CORRECTIONS)
+
+def test_low_confidence_falls_back_to_rules():
+    """Test that transactions unlike any correction keep their rule-based category"""
+    model = CategoryModel(n_features=4096)
+    model.learn("Chipotle", "", "Food & Dining")
+    # One category's corrections say nothing about merchants never learned
+    assert model.predict("Kroger") is None
+    assert categorize_transaction("Kroger", 10, "", model) == "Groceries"
+    assert categorize_transaction("Payroll", 2800, "Direct Deposit - Salary", model) == "Income"
+
+def test_many_corrections_in_one_category():
+    """Test that piling corrections into one category leaves unseen merchants to the rules"""
+    model = CategoryModel()
+    for n in range(5000):
+        model.learn(f"store{n}", "", "Groceries")
+    assert model.predict("Comcast") is None
+    assert model.predict("") is None
+    assert categorize_transaction("Comcast", 79.99, "Internet bill", model) == "Utilities"
+    assert categorize_transaction("Netflix", 15.99, "", model) == "Entertainment"
+    assert categorize_transaction("Chipotle", 12.99, "", model) == "Other"
+    assert categorize_transaction("", 10, "", model) == "Other"
+    assert categorize_transaction("store17", 10, "", model) == "Groceries"
+    merchants = ["Comcast", "Netflix", "Chipotle", "", "store17"]
+    amounts = [79.99, 15.99, 12.99, 10, 10]
+    descriptions = ["Internet bill", "", "", "", ""]
+    expected = [categorize_transaction(*transaction, model) for transaction in zip(merchants, amounts, descriptions)]
+    assert list(categorize_batch(merchants, amounts, descriptions, model)) == expected
+
+def test_unlearn():
+    """Test that unlearning a correction takes it back out of the counts"""
+    model = CategoryModel(n_features=4096)
+    model.learn("Chipotle", "", "Food & Dining")
+    model.unlearn("Chipotle", "", "Food & Dining")
+    assert model.documents == 0
+    assert not model.counts[:model.n_features].any()
+    assert model.predict("Chipotle") is None
+    # Unlearning what was never learned leaves no negative counts
+    model.unlearn("Taco Bell", "", "Food & Dining")
+    assert model.counts.min() == 0
+
+def test_predict_many_matches_predict():
+    """Test that batch predictions agree with one-at-a-time predictions"""
+    model = trained_model()
+    merchants = ["Chipotle Grill", "Corner Shop", "Landlord", "Kroger", ""]
+    descriptions = ["Lunch", "", "Rent", "", ""]
+    categories, confidences = model.predict_many(merchants, descriptions)
+    for merchant, description, category, confidence in zip(merchants, descriptions, categories, confidences):
+        prediction = model.predict(merchant, description)
+        if prediction is None:
+            assert confidence == 0
+        else:
+            assert category == prediction.category
+            assert np.isclose(confidence, prediction.confidence)
+
+def test_batch_matches_scalar_with_model():
+    """Test that the batch categorizer uses the model as the scalar one does"""
+    model = trained_model()
+    merchants = ["CHIPOTLE #552", "Kroger", "Corner Shop 2", "Comcast", "Zzz", "Chipotle"]
+    amounts = [12.99, 10, 8, 79.99, 1, 9]
+    descriptions = ["Lunch", "", "", "Internet bill", "", ""]
+    expected = [categorize_transaction(*transaction, model) for transaction in zip(merchants, amounts, descriptions)]
+    assert list(categorize_batch(merchants, amounts, descriptions, model)) == expected
+
+def test_memory_mapped_model_is_shared(tmp_path):
+    """Test that a model file is seen by every model opened on it"""
+    path = str(tmp_path / "model.npy")
+    writer = trained_model(path)
+    reader = CategoryModel(path)
+    assert reader.n_features == 4096
+    assert reader.predict("Chipotle").category == "Food & Dining"
+    writer.learn("Uber", "", "Transportation")
+    assert reader.updates == len(CORRECTIONS) + 1
+    writer.flush()
+
+def test_cache_trains_model():
+    """Test that cache corrections train the model and drop stale categorizations"""
+    model = CategoryModel(n_features=4096)
+    cache = CategoryCache(model=model)
+    assert cache.categorize("Chipotle Downtown", 12.99, "Lunch") == "Other"
+    cache.set_correction("Chipotle", "Food & Dining")
+    cache.set_correction("Chipotle Mexican Grill", "Food & Dining")
+    cache.set_correction("Corner Shop", "Groceries")
+    assert cache.categorize("Chipotle Downtown", 12.99, "Lunch") == "Food & Dining"
+    assert cache.stats()["invalidations"] >= 1
+
+    # Changing a correction moves it to the new category
+    cache.set_correction("Corner Shop", "Shopping")
+    assert model.documents == 3
+    assert cache.remove_correction("Corner Shop")
+    assert model.documents == 2
@@ -0,0 +1,101 @@
+import asyncio
+import queue
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.cache import OCRResultCache
+from ocr.jobs import JobStore, OCRJobManager
+from models.models import OCRJob, OCRJobStatus, ReceiptData
+
+class FakePool:
+    """Stands in for the worker pool, reporting progress through the queue."""
+    def __init__(self, progress_queue, fail=False):
+        self.progress_queue = progress_queue
+        self.fail = fail
+        self.submitted = 0
+
+    def submit(self, fn, job_id, image_bytes):
+        self.submitted += 1
+
+        async def work():
+            self.progress_queue.put((job_id, "decode", 0.001))
+            await asyncio.sleep(0.05)
+            if self.fail:
+                raise ValueError("bad image")
+            receipt = ReceiptData(merchant="SHOP", date=datetime(2025, 5, 14), total=10.0)
+            return receipt, [("decode", 0.001), ("ocr", 0.002)]
+        return asyncio.ensure_future(work())
+
+def make_job(job_id, status=OCRJobStatus.QUEUED):
+    return OCRJob(job_id=job_id, status=status, created_at=datetime.now())
+
+def test_job_store_bounds_and_ttl():
+    """Test that the job store evicts finished jobs first and expires old ones"""
+    store = JobStore(max_jobs=2, ttl=60)
+    store.add(make_job("a", OCRJobStatus.RUNNING))
+    store.add(make_job("b", OCRJobStatus.COMPLETED))
+    store.add(make_job("c"))
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert len(store) == 2
+    
+    expiring = JobStore(max_jobs=2, ttl=0.01)
+    expiring.add(make_job("a"))
+    asyncio.run(asyncio.sleep(0.02))
+    assert expiring.get("a") is None
+
+def test_job_lifecycle_and_events():
+    """Test submitting a job, polling it and streaming its events"""
+    async def scenario(fail):
+        progress_queue = queue.Queue()
+        manager = OCRJobManager(FakePool(progress_queue, fail), progress_queue)
+        manager.start()
+        try:
+            job = manager.submit(b"image")
+            assert job.status == OCRJobStatus.QUEUED
+            events = [event async for event in manager.events(job.job_id)]
+            return manager.get(job.job_id), events
+        finally:
+            manager.stop()
+    
+    job, events = asyncio.run(scenario(fail=False))
+    assert job.status == OCRJobStatus.COMPLETED
+    assert job.result.merchant == "SHOP"
+    assert [stage.name for stage in job.stages] == ["decode", "ocr"]
+    assert events[0].startswith("event: progress")
+    assert events[-1].startswith("event: completed")
+    
+    job, events = asyncio.run(scenario(fail=True))
+    assert job.status == OCRJobStatus.FAILED
+    assert job.error == "bad image"
+    assert events[-1].startswith("event: failed")
+
+def test_jobs_share_the_result_cache():
+    """Test that jobs for an image already processed or being processed skip the pool"""
+    async def scenario():
+        progress_queue = queue.Queue()
+        pool = FakePool(progress_queue)
+        cache = OCRResultCache(max_entries=4)
+        manager = OCRJobManager(pool, progress_queue, cache=cache)
+        manager.start()
+        try:
+            first = manager.submit(b"image")
+            second = manager.submit(b"image")
+            for job in (first, second):
+                [event async for event in manager.events(job.job_id)]
+            third = manager.submit(b"image")
+            [event async for event in manager.events(third.job_id)]
+            return pool, cache, [manager.get(job.job_id) for job in (first, second, third)]
+        finally:
+            manager.stop()
+    
+    pool, cache, jobs = asyncio.run(scenario())
+    assert pool.submitted == 1
+    assert all(job.status == OCRJobStatus.COMPLETED and job.result.merchant == "SHOP" for job in jobs)
+    assert [stage.name for stage in jobs[0].stages] == ["decode", "ocr"]
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["memory_hits"] == 1
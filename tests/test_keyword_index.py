@@ -0,0 +1,53 @@
+import random
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from categorization import categorizer
+from categorization.categorizer import build_keyword_index, categorize_transaction
+from categorization.keyword_index import KeywordIndex
+from ocr.text_parser import find_receipt_type
+from tests.transactions import grow_keywords, legacy_categorize_transaction, synthetic_transactions
+
+def test_counts_match_substring_search():
+    """Test that every group's count equals a search for each of its keywords"""
+    rng = random.Random(0)
+    for _ in range(2000):
+        groups = {
+            f"group {i}": ["".join(rng.choice("ab c") for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(0, 5))]
+            for i in range(4)
+        }
+        text = "".join(rng.choice("ab cd") for _ in range(rng.randint(0, 20)))
+        expected = [sum(1 for keyword in keywords if keyword in text) for keywords in groups.values()]
+        assert KeywordIndex(groups).counts(text) == expected
+
+def test_overlapping_keywords():
+    """Test keywords inside other keywords and keywords listed in several groups"""
+    index = KeywordIndex({"a": ["gas", "Gas Station", "station"], "b": ["gas", "tat"], "c": ["ion"]})
+    assert index.counts("gas station") == [3, 2, 1]
+    assert index.counts("statatio") == [0, 1, 0]
+    assert index.first_group("stastation") == "a"
+    assert index.first_group("lion") == "c"
+    assert index.first_group("") is None
+
+def test_categorize_matches_legacy():
+    """Test that categories are unchanged, also with thousands of keywords"""
+    rng = random.Random(1)
+    default_index = categorizer.KEYWORD_INDEX
+    try:
+        for size in (0, 3000):
+            keywords = grow_keywords(size, rng)
+            categorizer.KEYWORD_INDEX = build_keyword_index(keywords)
+            for transaction in synthetic_transactions(500, keywords, rng):
+                assert categorize_transaction(*transaction) == legacy_categorize_transaction(keywords, *transaction)
+    finally:
+        categorizer.KEYWORD_INDEX = default_index
+
+def test_receipt_type():
+    """Test that the first receipt type in order with a keyword wins"""
+    assert find_receipt_type("apollo pharmacy\nparacetamol") == "Medical"
+    assert find_receipt_type("cafe inside the mall") == "Food"
+    assert find_receipt_type("mutual fund sip") == "Investment"
+    assert find_receipt_type("xyz") == "General"
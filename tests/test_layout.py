@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.layout import WordBoxes, extract_layout_items, find_price_column, split_quantity
+from ocr.receipt_processor import parse_receipt_text
+
+def receipt_tsv(lines, top=0):
+    """Build Tesseract TSV with the last word of each line right-aligned at x=500"""
+    rows = ["level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"]
+    for line_num, line in enumerate(lines, 1):
+        words = line.split()
+        y = top + line_num * 30
+        for word_num, word in enumerate(words, 1):
+            width = len(word) * 12
+            left = 500 - width if word_num == len(words) and len(words) > 1 else 20 + (word_num - 1) * 90
+            rows.append(f"5\t1\t1\t1\t{line_num}\t{word_num}\t{left}\t{y}\t{width}\t20\t90\t{word}")
+    return "\n".join(rows)
+
+RECEIPT = [
+    "SHARMA KIRANA STORE",
+    "Bill No 1042 Date 14/05/2025",
+    "Milk 2 x 45.00 90.00",
+    "Atta 5kg 245.00",
+    "Paneer 3 210.00",
+    "Sub Total 545.00",
+    "CGST @ 2.5% 13.63",
+    "SGST @ 2.5% 13.63",
+    "Total 572.26",
+]
+
+def test_word_boxes_from_tsv():
+    """Test reading word boxes and rebuilding the text"""
+    words = WordBoxes.from_tsv(receipt_tsv(RECEIPT[:3]), top_offset=100)
+    assert len(words) == 13
+    assert words.text() == "\n".join(RECEIPT[:3])
+    assert words.boxes["top"][0] == 130
+    assert words.mean_confidence() == 90.0
+
+def test_layout_items():
+    """Test reading items, quantities, subtotal and tax from the price column"""
+    words = WordBoxes.from_tsv(receipt_tsv(RECEIPT))
+    low, high = find_price_column(words)
+    assert low <= 500 <= high
+
+    layout = extract_layout_items(words)
+    assert [(item.name, item.price, item.quantity) for item in layout.items] == [
+        ("Milk", 90.0, 2.0),
+        ("Atta 5kg", 245.0, 1.0),
+        ("Paneer", 210.0, 3.0),
+    ]
+    assert layout.subtotal == 545.0
+    assert layout.tax == 27.26
+
+    # Without a price column the text parser's items are kept
+    assert extract_layout_items(WordBoxes.from_tsv(receipt_tsv(["STORE", "Total 22.50"]))) is None
+
+def test_parse_receipt_text_with_layout():
+    """Test that layout items replace the ones guessed from the text"""
+    words = WordBoxes.from_tsv(receipt_tsv(RECEIPT))
+    receipt = parse_receipt_text(words.text(), words=words)
+    assert receipt.merchant == "SHARMA KIRANA STORE"
+    assert [item.quantity for item in receipt.items] == [2.0, 1.0, 3.0]
+    assert receipt.tax == 27.26
+
+def test_split_quantity():
+    """Test the quantity forms written before an item's price"""
+    assert split_quantity("Milk 2 x 45.00".split()) == (["Milk"], 2.0)
+    assert split_quantity("Milk x2".split()) == (["Milk"], 2.0)
+    assert split_quantity("Tea @ 2".split()) == (["Tea"], 2.0)
+    assert split_quantity("Room 101".split()) == (["Room", "101"], 1.0)
+
+def test_concatenate_strips():
+    """Test that lines repeated across strip seams are dropped"""
+    first = WordBoxes.from_tsv(receipt_tsv(RECEIPT[:5]))
+    second = WordBoxes.from_tsv(receipt_tsv(RECEIPT[4:], top=120))
+    words = WordBoxes.concatenate([first, second])
+    assert words.text() == "\n".join(RECEIPT)
+    assert len(set(words.boxes["line"].tolist())) == len(RECEIPT)
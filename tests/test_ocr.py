@@ -0,0 +1,339 @@
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.receipt_processor import (
+    EnginePool,
+    OCRBackend,
+    OCR_LANGUAGES,
+    PytesseractBackend,
+    create_ocr_backend,
+    extract_text,
+    parse_tsv,
+    preprocess_image,
+)
+from ocr import receipt_processor
+from ocr.dates import DateFormatMemo
+from ocr.normalize import crop_to_receipt, decode_grayscale, normalize_resolution, target_width
+from ocr.deskew import deskew, estimate_skew_angle
+from ocr import script_detection, strips
+from ocr.strips import find_line_gaps, plan_strips, stitch_text
+from ocr.script_detection import (
+    MerchantLanguageMemo,
+    languages_for_scripts,
+    scripts_for_languages,
+    scripts_in_text,
+    select_languages,
+)
+
+class FakeBackend(OCRBackend):
+    name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def image_to_string(self, image, languages=OCR_LANGUAGES):
+        self.calls.append((image.shape, languages))
+        return "GROCERY STORE\nTotal 22.50"
+
+def test_extract_text_uses_backend():
+    """Test that extract_text runs OCR through the given backend"""
+    backend = FakeBackend()
+    text = extract_text(np.zeros((20, 10), np.uint8), backend=backend)
+    
+    assert text == "GROCERY STORE\nTotal 22.50"
+    assert backend.calls == [((20, 10), OCR_LANGUAGES)]
+
+def test_create_ocr_backend():
+    """Test choosing OCR backends by name"""
+    assert isinstance(create_ocr_backend("pytesseract"), PytesseractBackend)
+    assert isinstance(create_ocr_backend("auto"), OCRBackend)
+    
+    with pytest.raises(ValueError):
+        create_ocr_backend("unknown")
+
+class FakeEngine:
+    def __init__(self, *key):
+        self.key = key
+        self.ended = False
+
+    def End(self):
+        self.ended = True
+
+def test_engine_pool_is_shared_and_bounded():
+    """Test that threads share a bounded set of engines, evicting idle ones for new languages"""
+    created = []
+    def create(*key):
+        created.append(FakeEngine(*key))
+        return created[-1]
+    pool = EnginePool(create, max_engines=2)
+    with pool.engine("eng") as engine:
+        pass
+    with pool.engine("eng") as again:
+        assert again is engine
+
+    # Engines are reused across threads, never more than max_engines at once
+    in_use = []
+    def ocr(_):
+        with pool.engine("eng") as engine:
+            in_use.append(engine)
+            assert len(in_use) <= 2
+            time.sleep(0.01)
+            in_use.remove(engine)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(ocr, range(16)))
+    assert len(created) == 2
+    assert pool.stats()["waits"] > 0
+
+    # Other languages end the least recently used idle engine
+    with pool.engine("eng+tam") as tamil:
+        assert tamil.key == ("eng+tam",)
+    assert len(created) == 3
+    assert sum(engine.ended for engine in created) == 1
+    assert pool.stats()["engines"] == 2
+
+class ScriptBackend(FakeBackend):
+    def __init__(self, script, confidence):
+        super().__init__()
+        self.script = script
+        self.confidence = confidence
+
+    def detect_script(self, image):
+        self.calls.append((image.shape, "osd"))
+        return self.script, self.confidence
+
+def test_languages_for_scripts():
+    """Test mapping detected scripts to Tesseract languages"""
+    assert languages_for_scripts({"Latin"}) == "eng"
+    assert languages_for_scripts({"Devanagari", "Latin"}) == "eng+hin+mar"
+    assert languages_for_scripts(scripts_in_text("Total ₹ 120 कुल")) == "eng+hin+mar"
+    assert scripts_in_text("மொத்தம் 120") == {"Tamil"}
+    assert scripts_for_languages("eng+hin+mar") == {"Latin", "Devanagari"}
+    assert scripts_for_languages("eng+hin") == {"Latin"}
+
+def test_select_languages(monkeypatch):
+    """Test language selection from script detection and the merchant memo"""
+    image = np.zeros((100, 2000), np.uint8)
+    memo = MerchantLanguageMemo()
+    monkeypatch.setattr(script_detection, "merchant_languages", memo)
+    
+    backend = ScriptBackend("Tamil", 5.0)
+    assert select_languages(image, backend, OCR_LANGUAGES) == "eng+tam"
+    # Script detection runs on a downscaled copy
+    assert backend.calls[0][0][1] == 800
+    
+    assert select_languages(image, ScriptBackend("Tamil", 0.1), OCR_LANGUAGES) == OCR_LANGUAGES
+    assert select_languages(image, ScriptBackend(None, 0.0), OCR_LANGUAGES) == OCR_LANGUAGES
+    
+    memo.remember("Saravana  Stores", "சரவணா ஸ்டோர்ஸ் Total 120")
+    backend = ScriptBackend("Latin", 5.0)
+    assert select_languages(image, backend, OCR_LANGUAGES, "saravana stores") == "eng+tam"
+    assert backend.calls == []
+
+def test_merchant_language_memo_merges_scripts():
+    """Test that a merchant's remembered scripts are added to, not replaced"""
+    memo = MerchantLanguageMemo()
+    memo.remember("Saravana Stores", "சரவணா Total 120")
+    memo.remember("Saravana Stores", "Total 120 कुल")
+    assert memo.get("saravana stores") == "eng+hin+mar+tam"
+    memo.remember("Saravana Stores", "Total 99")
+    assert memo.get("saravana stores") == "eng+hin+mar+tam"
+
+def synthetic_receipt(angle, height=1500, width=600):
+    """Draw dark text lines on white and rotate them by angle degrees"""
+    image = np.full((height, width), 255, np.uint8)
+    for line in range(30):
+        cv2.putText(image, f"ITEM {line:02d}    {line * 3.17:7.2f}", (40, 60 + line * 45),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2)
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), borderValue=255)
+
+def test_estimate_skew_angle():
+    """Test that the skew estimate undoes the rotation of the text lines"""
+    for angle in (-4.0, 0.0, 2.5):
+        assert estimate_skew_angle(synthetic_receipt(angle)) == pytest.approx(-angle, abs=0.3)
+    
+    straight = synthetic_receipt(0.0)
+    assert deskew(straight) is straight
+
+def test_reduced_decode_and_crop():
+    """Test that large photos are decoded reduced and cropped to the receipt"""
+    photo = np.full((3000, 4000, 3), 60, np.uint8)
+    photo[100:2900, 1000:3000] = 235
+    image_bytes = cv2.imencode(".jpg", photo)[1].tobytes()
+    
+    # A 2000 px receipt at 50% fill allows a 2x reduction for a 945 px target
+    gray = decode_grayscale(image_bytes, target_width(300))
+    assert gray.shape == (1500, 2000)
+    assert decode_grayscale(image_bytes, 0).shape == (3000, 4000)
+    assert decode_grayscale(b"not an image", 945) is None
+    
+    receipt = crop_to_receipt(gray)
+    assert abs(receipt.shape[1] - 1000) <= 30
+    assert abs(receipt.shape[0] - 1400) <= 30
+    assert normalize_resolution(receipt, 500).shape[1] == 500
+    
+    preprocessed = preprocess_image(image_bytes)
+    assert preprocessed.shape[1] <= receipt.shape[1]
+
+def make_tsv(lines, confidence):
+    """Build Tesseract TSV output with one word row per word"""
+    rows = ["level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"]
+    for line_num, line in enumerate(lines, 1):
+        rows.append(f"4\t1\t1\t1\t{line_num}\t0\t0\t{line_num * 20}\t100\t18\t-1\t")
+        for word_num, word in enumerate(line.split(), 1):
+            rows.append(f"5\t1\t1\t1\t{line_num}\t{word_num}\t{word_num * 50}\t{line_num * 20}\t40\t18\t{confidence}\t{word}")
+    return "\n".join(rows)
+
+class CascadeBackend(FakeBackend):
+    def __init__(self, fast_lines, fast_confidence):
+        super().__init__()
+        self.fast_lines = fast_lines
+        self.fast_confidence = fast_confidence
+
+    def image_to_tsv(self, image, languages=OCR_LANGUAGES, oem=3, tessdata_dir=None):
+        self.calls.append((image.shape, languages))
+        return make_tsv(self.fast_lines, self.fast_confidence)
+
+    def detect_script(self, image):
+        return None, 0.0
+
+class TwoPassBackend(CascadeBackend):
+    def __init__(self, fast_lines, fast_confidence, full_lines):
+        super().__init__(fast_lines, fast_confidence)
+        self.full_lines = full_lines
+
+    def image_to_tsv(self, image, languages=OCR_LANGUAGES, oem=3, tessdata_dir=None):
+        if not self.calls:
+            return super().image_to_tsv(image, languages, oem, tessdata_dir)
+        self.calls.append((image.shape, languages))
+        return make_tsv(self.full_lines, 90.0)
+
+def test_parse_tsv():
+    """Test rebuilding text lines and confidences from TSV output"""
+    text, confidences = parse_tsv(make_tsv(["GROCERY STORE", "Total 22.50"], 91.5))
+    assert text == "GROCERY STORE\nTotal 22.50"
+    assert confidences == [91.5] * 4
+
+def test_cascade_escalation(monkeypatch):
+    """Test that the fast OCR pass is kept only when it is confident and complete"""
+    image = cv2.imencode(".png", synthetic_receipt(0.0))[1].tobytes()
+    lines = ["GROCERY STORE", "Date: 14/05/2025", "Milk 4.99", "Total 22.50"]
+    
+    backend = CascadeBackend(lines, 93.0)
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    result = receipt_processor.process_receipt_image(image)
+    assert result.ocr_tier == "fast"
+    assert result.ocr_confidence == 93.0
+    assert result.total == 22.5
+    assert [languages for _, languages in backend.calls] == ["eng"]
+    
+    # Low confidence escalates to the full configuration
+    backend = CascadeBackend(lines, 40.0)
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    result = receipt_processor.process_receipt_image(image)
+    assert result.ocr_tier == "full"
+    assert result.merchant == "GROCERY STORE"
+    assert [languages for _, languages in backend.calls] == ["eng", OCR_LANGUAGES]
+    
+    # So does a confident pass with no date
+    backend = CascadeBackend(["GROCERY STORE", "Total 22.50"], 95.0)
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    assert receipt_processor.process_receipt_image(image).ocr_tier == "full"
+
+def test_rejected_fast_pass_teaches_no_date_format(monkeypatch):
+    """Test that only the text of the returned result teaches the merchant's date format"""
+    image = cv2.imencode(".png", synthetic_receipt(0.0))[1].tobytes()
+    memo = DateFormatMemo()
+    monkeypatch.setattr(receipt_processor, "merchant_date_formats", memo)
+
+    # The fast pass misreads an unambiguous US date and is redone
+    backend = TwoPassBackend(["CORNER DELI", "Date: 05/14/2025", "Total 22.50"], 40.0,
+                             ["CORNER DELI", "Date: 05/06/2025", "Total 22.50"])
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    result = receipt_processor.process_receipt_image(image)
+    assert result.ocr_tier == "full"
+    assert result.date == datetime(2025, 6, 5)
+    assert len(memo) == 0
+
+    # A fast pass that is kept does teach it
+    backend = CascadeBackend(["CORNER DELI", "Date: 05/14/2025", "Total 22.50"], 95.0)
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    assert receipt_processor.process_receipt_image(image).ocr_tier == "fast"
+    assert memo.get("CORNER DELI") == "%m/%d/%Y"
+
+def test_merchant_languages_remembered(monkeypatch):
+    """Test that the languages a receipt needed are remembered under the name later lookups use"""
+    image = cv2.imencode(".png", synthetic_receipt(0.0))[1].tobytes()
+    lines = ["GROCERY STORE", "Date: 14/05/2025", "Total 22.50"]
+    memo = MerchantLanguageMemo()
+    monkeypatch.setattr(receipt_processor, "merchant_languages", memo)
+
+    # Text OCR'd with every language is remembered under the OCR'd name
+    backend = CascadeBackend(lines, 40.0)
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    receipt_processor.process_receipt_image(image)
+    assert backend.calls[-1][1] == OCR_LANGUAGES
+    assert memo.get("grocery store") == "eng"
+
+    # A confident detection is remembered under the given name, with its
+    # script even though the text does not show it
+    backend = CascadeBackend(lines, 40.0)
+    backend.detect_script = lambda image: ("Tamil", 5.0)
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    receipt_processor.process_receipt_image(image, merchant="Corner  Store")
+    assert backend.calls[-1][1] == "eng+tam"
+    assert memo.get("corner store") == "eng+tam"
+
+    # The next receipt given that name skips detection
+    backend = CascadeBackend(lines, 40.0)
+    backend.detect_script = None
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+    receipt_processor.process_receipt_image(image, merchant="CORNER STORE")
+    assert backend.calls[-1][1] == "eng+tam"
+
+def test_plan_strips_cut_between_lines():
+    """Test that strips overlap and never cut through a text line"""
+    image = np.full((3000, 600), 255, np.uint8)
+    for line in range(60):
+        cv2.putText(image, f"ITEM {line:02d}", (40, 60 + line * 48), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 0, 2)
+    
+    planned = plan_strips(image.shape[0], find_line_gaps(image), 3)
+    assert len(planned) == 3
+    assert planned[0][0] == 0 and planned[-1][1] == image.shape[0]
+    for (_, bottom), (top, _) in zip(planned[:-1], planned[1:]):
+        assert top < bottom
+    for top, bottom in planned:
+        assert image[top].min() == 255
+        assert image[bottom - 1].min() == 255
+
+def test_stitch_text():
+    """Test that lines repeated by the strip overlap are kept once"""
+    assert stitch_text(["STORE\nMilk 4.99\nBread 2.50", "bread  2.50\nEggs 3.10", "Total 10.59"]) == \
+        "STORE\nMilk 4.99\nBread 2.50\nEggs 3.10\nTotal 10.59"
+    # Identical lines that are not at the seam are kept
+    assert stitch_text(["Milk 4.99\nTax 0.10", "Milk 4.99"]) == "Milk 4.99\nTax 0.10\nMilk 4.99"
+
+def test_extract_text_in_strips(monkeypatch):
+    """Test that tall receipts are OCRed in strips and stitched back together"""
+    monkeypatch.setattr(strips, "STRIP_MIN_HEIGHT", 500)
+    monkeypatch.setattr(strips, "STRIP_THREADS", 3)
+    backend = FakeBackend()
+    text = extract_text(synthetic_receipt(0.0), backend=backend)
+    
+    assert len(backend.calls) == 3
+    assert text == "GROCERY STORE\nTotal 22.50"
+    
+    # Short receipts are OCRed whole
+    backend = FakeBackend()
+    extract_text(np.full((400, 600), 255, np.uint8), backend=backend)
+    assert backend.calls == [((400, 600), OCR_LANGUAGES)]
@@ -1,6 +1,7 @@
 import pytest
 import os
 import sys
+import numpy as np
 from pathlib import Path
 
 # Add the parent directory to the path so we can import our modules
@@ -59,3 +60,54 @@ def test_property_tax_calculation():
     assert result.total_tax > 0
     assert result.effective_rate > 0
     assert len(result.breakdown) == 1  # Property tax
+
+def test_compiled_brackets():
+    """Test bracket lookups at, between and past the bracket thresholds"""
+    from tax.brackets import compile_brackets
+    table = compile_brackets([(0, 100, 0.1), (101, 200, 0.2), (201, float('inf'), 0.3)])
+    assert table.thresholds == (0.0, 100.0, 200.0)
+    assert table.base_tax == (0.0, 10.0, 30.0)
+    assert table.lookup(-5) == (0.0, 0.1, 0)
+    assert table.lookup(0) == (0.0, 0.1, 0)
+    assert table.lookup(100) == (10.0, 0.1, 0)
+    # Income in the published $1 gap between brackets is taxed at the upper rate
+    assert table.lookup(100.5) == (10.0 + 0.5 * 0.2, 0.2, 1)
+    assert table.lookup(300) == (30.0 + 100 * 0.3, 0.3, 2)
+
+    taxes, rates, brackets = table.lookup_many(np.array([-5, 0, 100, 100.5, 300]))
+    assert taxes.tolist() == [0.0, 0.0, 10.0, 10.0 + 0.5 * 0.2, 60.0]
+    assert rates.tolist() == [0.1, 0.1, 0.1, 0.2, 0.3]
+    assert brackets.tolist() == [0, 0, 0, 1, 2]
+    with pytest.raises(ValueError):
+        table.threshold_array[0] = 1
+
+def test_income_tax_marginal_rate():
+    """Test that income tax results report the federal marginal rate"""
+    from tax.calculator import federal_tax_bracket
+    lookup = federal_tax_bracket(75000, FilingStatus.SINGLE, 12950)
+    assert lookup.bracket == 2
+    assert lookup.tax == 1027.5 + 3780.0 + (75000 - 12950 - 41775) * 0.22
+    result = calculate_income_tax(75000, FilingStatus.SINGLE, "CA", DeductionType.STANDARD)
+    assert result.federal_tax == lookup.tax
+    assert result.marginal_rate == 22.0
+
+def test_county_property_tax_rates():
+    """Test that county rates come from the rate table, whatever the spelling"""
+    from tax.counties import CountyRateIndex, normalize_county
+    from tax.tables import tax_tables
+    assert normalize_county("Miami-Dade County") == "miami dade"
+    assert normalize_county("St. Louis County") == "saint louis"
+    index = CountyRateIndex([("fl", "Miami-Dade", 0.0097), ("FL", "Orange", 0.0096), ("CA", "Orange County", 0.007)])
+    assert len(index) == 3
+    assert index.rate("FL", "miami dade county") == 0.0097
+    assert index.rate("CA", "orange") == 0.007
+    assert index.rate("TX", "Orange") is None
+
+    assert tax_tables.get().county_property_tax_rates.rate("CA", "Los Angeles County") == 0.0075
+    result = calculate_property_tax(property_value=500000, state="CA", county="Los Angeles County")
+    assert result.total_tax == 500000 * 0.0075
+    # Counties not in the table use the state's rate
+    assert calculate_property_tax(500000, "CA", "Alpine").total_tax == calculate_property_tax(500000, "CA").total_tax
+    # The state is normalized for the county and the state rates alike
+    assert calculate_property_tax(500000, " ca", "Los Angeles").total_tax == 500000 * 0.0075
+    assert calculate_property_tax(500000, "ca", "Alpine").total_tax == calculate_property_tax(500000, "CA").total_tax
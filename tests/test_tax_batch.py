@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.models import DeductionType, FilingStatus
+from tax.batch import calculate_income_tax_batch
+from tax.calculator import FEDERAL_TAX_BRACKETS, calculate_income_tax
+
+def bracket_edge_incomes():
+    """Incomes at and around every bracket boundary, including the $1 gaps between brackets"""
+    incomes = set()
+    for brackets in FEDERAL_TAX_BRACKETS.values():
+        for lower, upper, _ in brackets:
+            for bound in (lower, upper):
+                if bound != float('inf'):
+                    incomes.update(bound + offset for offset in (-1, -0.5, 0, 0.5, 1))
+    return sorted(incomes)
+
+def test_batch_matches_scalar():
+    """Test that every batch result equals calculate_income_tax exactly"""
+    scenarios = []
+    for income in bracket_edge_incomes() + [0, -100, 75000, 147000, 2500000.75]:
+        for status in FilingStatus:
+            scenarios.append((income, status, "CA", DeductionType.ITEMIZED, 0))
+            scenarios.append((income + 12950, status, "TX", DeductionType.STANDARD, None))
+            scenarios.append((income, status, "ZZ", DeductionType.ITEMIZED, None))
+            scenarios.append((income + 5000.5, status, "NY", DeductionType.ITEMIZED, 5000.5))
+
+    batch = calculate_income_tax_batch(*zip(*scenarios))
+    assert len(batch) == len(scenarios)
+    for row, scenario in enumerate(scenarios):
+        expected = calculate_income_tax(*scenario)
+        assert batch.result(row) == expected
+        assert batch.total_tax[row] == expected.total_tax
+
+def test_batch_accepts_plain_values():
+    """Test that filing statuses and deduction types can be given as strings"""
+    batch = calculate_income_tax_batch(
+        np.array([75000.0, 150000.0]), ["single", "married-joint"], ["CA", "WA"], ["standard", "itemized"],
+        [None, np.nan]
+    )
+    assert batch.result(0) == calculate_income_tax(75000, FilingStatus.SINGLE, "CA", DeductionType.STANDARD)
+    assert batch.result(1) == calculate_income_tax(150000, FilingStatus.MARRIED_JOINT, "WA", DeductionType.ITEMIZED)
+
+def test_batch_empty_and_mismatched():
+    """Test empty batches and columns of different lengths"""
+    assert len(calculate_income_tax_batch([], [], [], [])) == 0
+    with pytest.raises(ValueError):
+        calculate_income_tax_batch([1000, 2000], ["single"], ["CA", "CA"], ["standard", "standard"])
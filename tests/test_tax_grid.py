@@ -0,0 +1,81 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.models import DeductionType, FilingStatus, IncomeRange
+from tax.calculator import calculate_income_tax
+from tax.grid import GRID_COLUMNS, TaxGridError, evaluate_grid, income_axis, stream_grid_float32, stream_grid_json
+
+STATES = ["CA", "TX", "ZZ"]
+
+def test_income_axis():
+    """Test that incomes come from a list or an inclusive range"""
+    assert income_axis([1000, 2000], None).tolist() == [1000, 2000]
+    assert income_axis(None, IncomeRange(start=0, stop=100000, step=25000)).tolist() == [0, 25000, 50000, 75000, 100000]
+    with pytest.raises(TaxGridError):
+        income_axis(None, None)
+    with pytest.raises(TaxGridError):
+        income_axis(None, IncomeRange(stop=100, step=0))
+    with pytest.raises(TaxGridError):
+        income_axis(None, IncomeRange(stop=10 ** 9, step=1), max_cells=1000)
+    # Inclusive ranges keep their last value despite float rounding
+    assert len(income_axis(None, IncomeRange(start=0, stop=0.3, step=0.1))) == 4
+    assert len(income_axis(None, IncomeRange(start=0, stop=0.35, step=0.1))) == 4
+    for income_range in (IncomeRange(stop=float("inf"), step=1), IncomeRange(stop=100, step=float("nan")),
+                         IncomeRange(stop=1e308, step=1e-300)):
+        with pytest.raises(TaxGridError):
+            income_axis(None, income_range)
+    with pytest.raises(TaxGridError):
+        income_axis([1000, float("inf")], None)
+
+def test_grid_matches_scalar():
+    """Test that every grid cell equals calculate_income_tax for its combination"""
+    incomes = income_axis(None, IncomeRange(start=0, stop=300000, step=37500))
+    grid = evaluate_grid(incomes, list(FilingStatus), STATES, list(DeductionType), 8000)
+    assert grid.shape == [len(incomes), 4, 3, 2]
+    assert list(grid.columns) == list(GRID_COLUMNS)
+    for cell in np.ndindex(*grid.shape):
+        income, status, state, deduction_type = (grid.axes[axis][i] for axis, i in zip(grid.axes, cell))
+        expected = calculate_income_tax(income, FilingStatus(status), state, DeductionType(deduction_type), 8000)
+        row = np.ravel_multi_index(cell, grid.shape)
+        assert grid.columns["total_tax"][row] == expected.total_tax
+        assert grid.columns["federal_tax"][row] == expected.federal_tax
+        assert grid.columns["effective_rate"][row] == expected.effective_rate
+        assert grid.columns["marginal_rate"][row] == expected.marginal_rate
+
+def test_grid_limits():
+    """Test column selection and the cap on grid size"""
+    grid = evaluate_grid([50000], ["single"], ["CA"], ["standard"], columns=["total_tax"])
+    assert list(grid.columns) == ["total_tax"]
+    with pytest.raises(TaxGridError):
+        evaluate_grid([50000], ["single"], ["CA"], ["standard"], columns=["refund"])
+    with pytest.raises(TaxGridError):
+        evaluate_grid([50000], ["single"], [], ["standard"])
+    with pytest.raises(TaxGridError):
+        evaluate_grid(np.arange(1000), list(FilingStatus), STATES, ["standard"], max_cells=10000)
+
+def test_streamed_formats():
+    """Test that the JSON and float32 streams hold the same columnar values"""
+    grid = evaluate_grid(np.arange(0, 200000, 1000), ["single", "head"], STATES, ["standard"],
+                         columns=["total_tax", "marginal_rate"])
+    cells = int(np.prod(grid.shape))
+
+    body = json.loads("".join(stream_grid_json(grid)))
+    assert body["shape"] == grid.shape
+    assert body["axes"]["state"] == STATES
+    assert body["values"]["total_tax"] == grid.columns["total_tax"].tolist()
+
+    stream = b"".join(stream_grid_float32(grid))
+    header_line, data = stream.split(b"\n", 1)
+    header = json.loads(header_line)
+    assert header["columns"] == ["total_tax", "marginal_rate"]
+    assert header["dtype"] == "<f4"
+    columns = np.frombuffer(data, "<f4").reshape(len(header["columns"]), cells)
+    assert np.array_equal(columns[1], grid.columns["marginal_rate"].astype(np.float32))
+    assert np.allclose(columns[0], grid.columns["total_tax"], rtol=1e-6)
@@ -0,0 +1,137 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from models.models import DeductionType, FilingStatus
+from tax.calculator import FEDERAL_TAX_BRACKETS, STANDARD_DEDUCTION, calculate_income_tax
+from tax.tables import TAX_TABLES_DIR, TaxTableRegistry, UnknownTaxYear
+
+def base_tables():
+    with open(os.path.join(TAX_TABLES_DIR, "2023.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+def write_year(directory, year, data, mtime=None):
+    data = dict(data, year=year)
+    path = directory / f"{year}.json"
+    path.write_text(json.dumps(data))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+def test_default_year_matches_shipped_tables():
+    """Test that the shipped 2023 file gives the tables the calculator exposes"""
+    tables = TaxTableRegistry().get()
+    assert tables.year == 2023
+    assert tables.federal_tax_brackets == FEDERAL_TAX_BRACKETS
+    assert tables.standard_deduction == STANDARD_DEDUCTION
+    assert tables.federal_tax_brackets[FilingStatus.SINGLE][-1][1] == float('inf')
+    with pytest.raises(UnknownTaxYear):
+        calculate_income_tax(75000, FilingStatus.SINGLE, "CA", DeductionType.STANDARD, tax_year=1990)
+
+def test_select_year(tmp_path):
+    """Test that each year's tables come from its own file"""
+    data = base_tables()
+    write_year(tmp_path, 2023, data)
+    data["standard_deduction"]["single"] = 13850
+    data["state_income_tax_rates"]["CA"] = 0.1
+    write_year(tmp_path, 2024, data)
+
+    registry = TaxTableRegistry(str(tmp_path), default_year=2023)
+    assert registry.available_years() == [2023, 2024]
+    assert registry.get().standard_deduction[FilingStatus.SINGLE] == 12950
+    assert registry.get(2024).standard_deduction[FilingStatus.SINGLE] == 13850
+    assert registry.get(2024).state_income_tax_rates["CA"] == 0.1
+    with pytest.raises(UnknownTaxYear):
+        registry.get(2025)
+    assert registry.stats()["loaded_years"] == [2023, 2024]
+
+def test_hot_reload(tmp_path):
+    """Test that changed files are swapped in while held tables stay unchanged"""
+    data = base_tables()
+    path = write_year(tmp_path, 2023, data, mtime=1000)
+    registry = TaxTableRegistry(str(tmp_path), default_year=2023, check_interval=0)
+    held = registry.get()
+
+    data["sales_tax_rates"]["CA"] = 0.08
+    write_year(tmp_path, 2023, data, mtime=2000)
+    assert registry.get().sales_tax_rates["CA"] == 0.08
+    # A calculation that already had the old tables still sees them
+    assert held.sales_tax_rates["CA"] == 0.0725
+
+    # A bad edit keeps the last good tables
+    path.write_text("{not json")
+    os.utime(path, (3000, 3000))
+    assert registry.get().sales_tax_rates["CA"] == 0.08
+    assert registry.stats()["reload_errors"] == 1
+
+    data["sales_tax_rates"]["CA"] = 0.09
+    write_year(tmp_path, 2023, data, mtime=4000)
+    registry.check_interval = 3600
+    assert registry.get().sales_tax_rates["CA"] == 0.08
+    assert registry.reload() == 1
+    assert registry.get().sales_tax_rates["CA"] == 0.09
+    assert registry.stats()["reloads"] == 2
+
+def test_county_rates_per_year(tmp_path):
+    """Test that county rates come from each year's own file and are reloaded with it"""
+    data = base_tables()
+    write_year(tmp_path, 2023, data)
+    write_year(tmp_path, 2024, data)
+    counties = tmp_path / "2024_counties.csv"
+    counties.write_text("state,county,rate\nCA,Los Angeles,0.008\n")
+    registry = TaxTableRegistry(str(tmp_path), default_year=2023, check_interval=0)
+    # A year without a county file has no county rates
+    assert len(registry.get().county_property_tax_rates) == 0
+    assert registry.get(2024).county_property_tax_rates.rate("CA", "Los Angeles County") == 0.008
+
+    counties.write_text("state,county,rate\nCA,Los Angeles,0.0085\nCA,Orange,0.007\n")
+    assert registry.get(2024).county_property_tax_rates.rate("CA", "Los Angeles") == 0.0085
+    assert registry.stats()["reloads"] == 1
+
+def test_reload_within_one_mtime_tick(tmp_path):
+    """Test that an edit keeping the file's modification time is still picked up"""
+    data = base_tables()
+    write_year(tmp_path, 2023, data, mtime=1000)
+    registry = TaxTableRegistry(str(tmp_path), default_year=2023, check_interval=0)
+    assert registry.get().sales_tax_rates["CA"] == 0.0725
+
+    data["sales_tax_rates"]["CA"] = 0.075
+    write_year(tmp_path, 2023, data, mtime=1000)
+    assert registry.get().sales_tax_rates["CA"] == 0.075
+
+def test_import_without_default_tables(tmp_path):
+    """Test that the calculator imports when the default year has no tables, and fails when they are used"""
+    script = (
+        "import tax.calculator as calculator\n"
+        "from tax.tables import UnknownTaxYear\n"
+        "try:\n"
+        "    calculator.STANDARD_DEDUCTION\n"
+        "except UnknownTaxYear:\n"
+        "    print('missing')\n"
+    )
+    env = dict(os.environ, TAX_TABLES_DIR=str(tmp_path), TAX_DEFAULT_YEAR="2023")
+    result = subprocess.run([sys.executable, "-c", script], cwd=Path(__file__).parent.parent, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "missing"
+
+def test_idle_years_evicted(tmp_path):
+    """Test that unused years other than the default are dropped"""
+    data = base_tables()
+    write_year(tmp_path, 2023, data)
+    write_year(tmp_path, 2022, data)
+    registry = TaxTableRegistry(str(tmp_path), default_year=2023, idle_seconds=0)
+    registry.get(2022)
+    registry.get()
+    stats = registry.stats()
+    assert stats["loaded_years"] == [2023]
+    assert stats["evictions"] == 1
+    # An evicted year loads again when asked for
+    assert registry.get(2022).year == 2022
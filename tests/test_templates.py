@@ -0,0 +1,119 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr import receipt_processor
+from ocr.layout import WordBoxes
+from ocr.receipt_processor import OCRBackend, process_with_template
+from ocr.templates import Region, TemplateRegistry, learn_template
+from tests.test_layout import RECEIPT, receipt_tsv
+
+class ScriptedBackend(OCRBackend):
+    """Returns the next scripted TSV on every call and records the image sizes"""
+    def __init__(self, tsvs):
+        self.tsvs = list(tsvs)
+        self.shapes = []
+
+    def image_to_tsv(self, image, languages="eng", oem=3, tessdata_dir=None):
+        self.shapes.append(image.shape)
+        return self.tsvs.pop(0)
+
+def learned_template():
+    samples = []
+    for extra_items in range(3):
+        lines = RECEIPT[:2] + [f"Tea {i} 20.00" for i in range(extra_items)] + RECEIPT[2:]
+        samples.append((WordBoxes.from_tsv(receipt_tsv(lines)), 520, 40 + 30 * len(lines)))
+    return learn_template("SHARMA KIRANA STORE", samples)
+
+def test_region_pixels():
+    """Test that regions are measured from the edge they are anchored to"""
+    assert Region("top", 0.1, 0.2).pixels(500, 2000) == (50, 100, 0, 500)
+    assert Region("bottom", 0.4, 0.1).pixels(500, 2000) == (1800, 1950, 0, 500)
+    assert Region("span", 0.2, 0.4).pixels(500, 2000) == (100, 1800, 0, 500)
+    image = np.zeros((2000, 500), np.uint8)
+    assert Region("span", 0.2, 0.4).crop(image).shape == (1700, 500)
+    assert Region("top", 0.1, 0.1).crop(image) is None
+
+def test_learn_template():
+    """Test learning regions that cover receipts with different item counts"""
+    template = learned_template()
+    assert template.samples == 3
+    assert template.names == ["sharma kirana store"]
+    assert template.regions["items"].anchor == "span"
+
+    # Every sample's date, items and totals fall inside the learned regions
+    for extra_items in range(3):
+        height = 40 + 30 * (len(RECEIPT) + extra_items)
+        date_top, date_bottom, _, _ = template.regions["date"].pixels(520, height)
+        assert date_top <= 60 and date_bottom >= 80
+        total_top, total_bottom, _, _ = template.regions["total"].pixels(520, height)
+        assert total_top <= height - 40 - 30 * 3 and total_bottom >= height - 40 + 20
+
+    assert learn_template("SHARMA KIRANA STORE", []) is None
+
+def test_registry(tmp_path):
+    """Test saving, loading and matching templates"""
+    registry = TemplateRegistry(str(tmp_path))
+    registry.add(learned_template())
+    assert (tmp_path / "sharma-kirana-store.json").exists()
+
+    loaded = TemplateRegistry(str(tmp_path))
+    assert len(loaded) == 1
+    assert loaded.get("Sharma Kirana Store").regions == learned_template().regions
+
+    template, score = loaded.match("Welcome\nSHARMA KIRANA STORE\nPune")
+    assert template.merchant == "SHARMA KIRANA STORE" and score == 1.0
+    template, score = loaded.match("SHARMA KlRANA ST0RE")
+    assert 0.85 < score < 1.0
+    assert loaded.match("APOLLO PHARMACY") is None
+
+def test_process_with_template(monkeypatch):
+    """Test reading a receipt from the template's regions only"""
+    registry = TemplateRegistry()
+    registry.add(learned_template())
+    monkeypatch.setattr(receipt_processor, "get_template_registry", lambda: registry)
+    backend = ScriptedBackend([
+        receipt_tsv(["SHARMA KIRANA STORE", "Pune"]),
+        receipt_tsv(["Bill No 1042 Date 14/05/2025"]),
+        receipt_tsv(RECEIPT[2:5]),
+        receipt_tsv(RECEIPT[5:]),
+    ])
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", backend)
+
+    image = np.full((400, 520), 255, np.uint8)
+    receipt = process_with_template(image)
+    assert receipt.ocr_tier == "template"
+    assert receipt.merchant == "SHARMA KIRANA STORE"
+    assert receipt.date_format == "%d/%m/%Y"
+    assert receipt.total == 572.26
+    assert receipt.subtotal == 545.0
+    assert receipt.tax == 27.26
+    assert [item.name for item in receipt.items] == ["Milk", "Atta 5kg", "Paneer"]
+    # Only the header band and the three regions were OCR'd
+    assert len(backend.shapes) == 4
+    assert all(shape[0] < 400 for shape in backend.shapes)
+
+def test_process_with_template_fallback(monkeypatch):
+    """Test that unknown merchants and unreadable regions fall back to full OCR"""
+    registry = TemplateRegistry()
+    registry.add(learned_template())
+    monkeypatch.setattr(receipt_processor, "get_template_registry", lambda: registry)
+    image = np.full((400, 520), 255, np.uint8)
+
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", ScriptedBackend([receipt_tsv(["APOLLO PHARMACY"])]))
+    assert process_with_template(image) is None
+
+    # A known merchant is not looked up from the header, but no total is found
+    monkeypatch.setattr(receipt_processor, "_ocr_backend", ScriptedBackend([
+        receipt_tsv(["Date 14/05/2025"]),
+        receipt_tsv(RECEIPT[2:5]),
+        receipt_tsv(["Thank you"]),
+    ]))
+    assert process_with_template(image, merchant="Sharma Kirana Store") is None
+
+    monkeypatch.setattr(receipt_processor, "get_template_registry", lambda: TemplateRegistry())
+    assert process_with_template(image) is None
@@ -0,0 +1,69 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.dates import DateFormatMemo, find_receipt_date, parse_line_date
+from ocr.text_parser import scan_receipt_text
+from tests.receipt_texts import matches_legacy, synthetic_texts
+
+def test_matches_legacy_parser():
+    """Test that the single-pass parser extracts the same fields as the old one"""
+    texts = synthetic_texts(2000, seed=7) + [
+        "",
+        "RECEIPT",
+        "Bill\nShop 12/13/2024\n5 Jan 24\n01.02.2024",
+        "Total 0.00\nRs. 45",
+        "Total: Rs.1,00,000.50\nMilk 2 x 45.00",
+    ]
+    for text in texts:
+        assert matches_legacy(text), text
+
+def test_subtotal_and_tax():
+    """Test reading the subtotal and GST lines"""
+    parsed = scan_receipt_text(
+        "TAX INVOICE\nSHARMA STORE\nGSTIN: 29ABCDE1234F1Z5\n"
+        "Sub Total 1,000.00\nCGST @ 9% 45.00\nSGST @ 9% 45.00\nGrand Total 1,090.00"
+    )
+    assert parsed.merchant == "SHARMA STORE"
+    assert parsed.subtotal == 1000.0
+    assert parsed.tax == 90.0
+
+    # A tax total line wins over its parts
+    parsed = scan_receipt_text("Store\nCGST 45.00\nSGST 45.00\nTotal GST 90.00\nTotal incl. of taxes 590.00")
+    assert parsed.tax == 90.0
+    assert parsed.subtotal is None
+
+def test_parse_line_date():
+    """Test reading numeric and month-name dates without strptime"""
+    assert parse_line_date("Date: 14/05/2025").date == datetime(2025, 5, 14)
+    assert parse_line_date("Bill dt 5-6-24").format == "%d-%m-%y"
+    assert parse_line_date("2025.05.14 10.45.30").date == datetime(2025, 5, 14)
+    assert parse_line_date("05/14/2025").format == "%m/%d/%Y"
+    assert parse_line_date("14th Sept, 25").date == datetime(2025, 9, 14)
+    assert parse_line_date("May 4 2025").date == datetime(2025, 5, 4)
+    assert parse_line_date("29/02/2024").date == datetime(2024, 2, 29)
+    assert parse_line_date("29/02/2023") is None
+    assert parse_line_date("1/2-2024") is None
+    assert parse_line_date("Tel 080-2345-6789") is None
+
+def test_merchant_date_format_memo():
+    """Test that a merchant's date order settles its ambiguous dates"""
+    memo = DateFormatMemo(max_merchants=2)
+    assert find_receipt_date(["05/06/2025"], "Corner Deli", memo).date == datetime(2025, 6, 5)
+    assert len(memo) == 0
+    
+    # An unambiguous US date teaches the merchant's order
+    assert find_receipt_date(["05/14/2025"], "Corner Deli", memo).date == datetime(2025, 5, 14)
+    date = find_receipt_date(["05/06/25"], "corner  deli", memo)
+    assert date.date == datetime(2025, 5, 6)
+    assert date.ambiguous
+    assert memo.get("Corner Deli") == "%m/%d/%Y"
+    
+    # The memo is bounded
+    find_receipt_date(["25/12/2024"], "Store A", memo)
+    find_receipt_date(["2024-12-25"], "Store B", memo)
+    assert len(memo) == 2
+    assert memo.get("Corner Deli") is None
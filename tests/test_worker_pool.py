@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+from ocr.worker_pool import OCRWorkerPool, OCRPoolSaturated, OCRPoolUnavailable, OCRJobTimeout
+
+def square(x):
+    return x * x
+
+def sleep_for(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def crash():
+    os._exit(1)
+
+def test_pool_runs_jobs():
+    """Test that jobs run in worker processes and return their results"""
+    pool = OCRWorkerPool(max_workers=2, max_queue=2, job_timeout=10, max_jobs_per_worker=2)
+    pool.start()
+    try:
+        async def run_all():
+            return await asyncio.gather(*(pool.run(square, i) for i in range(4)))
+        assert asyncio.run(run_all()) == [0, 1, 4, 9]
+        
+        # Eight jobs on two workers with two jobs per worker recycles once
+        asyncio.run(run_all())
+        stats = pool.stats()
+        assert stats["completed"] == 8
+        assert stats["recycled"] == 1
+        assert stats["pending"] == 0
+    finally:
+        pool.shutdown()
+
+def test_pool_rejects_when_saturated():
+    """Test that the pool rejects jobs beyond its queue depth"""
+    pool = OCRWorkerPool(max_workers=1, max_queue=1, job_timeout=10)
+    pool.start()
+    try:
+        async def overload():
+            return await asyncio.gather(*(pool.run(sleep_for, 0.2) for _ in range(3)), return_exceptions=True)
+        results = asyncio.run(overload())
+        assert sum(isinstance(r, OCRPoolSaturated) for r in results) == 1
+        assert pool.stats()["rejected"] == 1
+    finally:
+        pool.shutdown()
+
+def test_pool_timeout_and_unavailable():
+    """Test job timeouts and submitting to a stopped pool"""
+    pool = OCRWorkerPool(max_workers=1, max_queue=0, job_timeout=0.1)
+    with pytest.raises(OCRPoolUnavailable):
+        asyncio.run(pool.run(square, 2))
+    
+    pool.start()
+    try:
+        with pytest.raises(OCRJobTimeout):
+            asyncio.run(pool.run(sleep_for, 1))
+        assert pool.stats()["timed_out"] == 1
+    finally:
+        pool.shutdown(wait=False)
+
+def test_pool_recovers_from_worker_crash():
+    """Test that a dead worker fails only its own job and the pool keeps running"""
+    pool = OCRWorkerPool(max_workers=2, max_queue=2, job_timeout=10)
+    pool.start()
+    try:
+        async def scenario():
+            with pytest.raises(OCRPoolUnavailable):
+                await pool.run(crash)
+            return await asyncio.gather(*(pool.run(square, i) for i in range(4)))
+        assert asyncio.run(scenario()) == [0, 1, 4, 9]
+        stats = pool.stats()
+        # The crashing job is retried once before it fails
+        assert stats["crashed"] == 2
+        assert stats["failed"] == 1
+        assert stats["completed"] == 4
+        assert stats["pending"] == 0
+        assert stats["running"]
+    finally:
+        pool.shutdown()
+
+def test_pool_timeout_counts_running_time_only():
+    """Test that time spent queued does not count toward a job's timeout"""
+    pool = OCRWorkerPool(max_workers=1, max_queue=3, job_timeout=1.0)
+    pool.start()
+    try:
+        async def queued():
+            return await asyncio.gather(*(pool.run(sleep_for, 0.4) for _ in range(4)))
+        assert asyncio.run(queued()) == [0.4] * 4
+        assert pool.stats()["timed_out"] == 0
+        assert pool.stats()["recycled"] == 0
+    finally:
+        pool.shutdown()
+
+def test_pool_bounds_retired_executors():
+    """Test that stuck jobs keep counting as pending and retired executors are capped"""
+    pool = OCRWorkerPool(max_workers=1, max_queue=2, job_timeout=0.2, max_retired=1)
+    pool.start()
+    try:
+        async def stuck():
+            return await asyncio.gather(*(pool.run(sleep_for, 5) for _ in range(3)), return_exceptions=True)
+        results = asyncio.run(stuck())
+        assert all(isinstance(result, OCRJobTimeout) for result in results)
+        stats = pool.stats()
+        assert stats["timed_out"] == 3
+        assert stats["retired_executors"] <= 1
+        # Jobs still running on a retired executor hold their place in the queue
+        assert 1 <= stats["pending"] <= 3
+    finally:
+        pool.shutdown(wait=False)
@@ -0,0 +1,63 @@
+"""
+Synthetic transactions, keyword lists grown with random words, and the
+categorizer from before the keyword index as a reference to check it
+against. Used by the categorization tests and benchmarks.
+"""
+from categorization.categorizer import CATEGORY_KEYWORDS
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+MERCHANTS = ["Starbucks", "Kroger", "City Power & Light", "Comcast", "ACME Corp", "Uber", "Netflix",
+             "Apollo Pharmacy", "Home Depot", "Chipotle", "Shell", "Landlord LLC"]
+DESCRIPTIONS = ["", "Coffee", "Weekly grocery shopping", "Monthly electric bill", "Internet bill",
+                "Direct Deposit - Salary", "Ride to airport", "Rent payment", "Prescription refill",
+                "Lunch with team", "Membership fee"]
+
+def legacy_categorize_transaction(category_keywords, merchant, amount, description=""):
+    """
+    The categorizer before the keyword index, taking the keyword lists as an argument.
+    """
+    text = f"{merchant} {description}".lower()
+
+    if amount > 500 and any(word in text for word in ["salary", "deposit", "payroll", "income", "direct deposit"]):
+        return "Income"
+
+    max_matches = 0
+    best_category = "Other"
+
+    for category, keywords in category_keywords.items():
+        matches = sum(1 for keyword in keywords if keyword.lower() in text)
+        if matches > max_matches:
+            max_matches = matches
+            best_category = category
+
+    if any(bill_word in text for bill_word in ["bill", "payment", "monthly", "subscription"]):
+        if any(utility in text for utility in ["electric", "water", "gas", "power", "energy"]):
+            return "Utilities"
+        if any(housing in text for housing in ["rent", "mortgage", "lease", "hoa"]):
+            return "Housing"
+
+    return best_category
+
+def grow_keywords(size, rng):
+    """
+    Copy CATEGORY_KEYWORDS with random words added until there are ``size`` keywords.
+    """
+    keywords = {category: list(words) for category, words in CATEGORY_KEYWORDS.items()}
+    categories = list(keywords)
+    total = sum(len(words) for words in keywords.values())
+    while total < size:
+        word = "".join(rng.choice(LETTERS) for _ in range(rng.randint(4, 10)))
+        keywords[rng.choice(categories)].append(word)
+        total += 1
+    return keywords
+
+def synthetic_transactions(count, keywords, rng):
+    words = [word for category_words in keywords.values() for word in category_words]
+    transactions = []
+    for _ in range(count):
+        merchant = rng.choice(MERCHANTS)
+        description = rng.choice(DESCRIPTIONS)
+        if rng.random() < 0.5:
+            description = f"{description} {rng.choice(words)}".strip()
+        transactions.append((merchant, round(rng.uniform(1, 5000), 2), description))
+    return transactions